@@ -0,0 +1,81 @@
+"""
+Service utilities:
+
+    uv run python -m app --profile-startup [--top 15]
+    uv run python -m app --calibrate-bcrypt [--target-ms 250]
+
+--profile-startup prints the import time of app.main by package and the
+duration of each lifespan startup phase, against the configured database
+and SMTP server, then shuts the app down again.
+
+--calibrate-bcrypt times bcrypt at increasing costs on this machine and
+recommends the highest PASSWORD_BCRYPT_ROUNDS whose hash fits the target.
+"""
+
+import argparse
+import logging
+import sys
+
+from app.config import settings
+from app.profiling import profile_startup
+from app.services.password_hasher import calibrate_rounds
+
+# OWASP's floor for bcrypt; below it the recommendation comes with a warning.
+_MIN_RECOMMENDED_ROUNDS = 10
+
+
+def _calibrate(target_ms: float) -> str:
+    best, measurements = calibrate_rounds(target_ms / 1000)
+    lines = ["cost        ms   hashes/s/core"]
+    for rounds, seconds in measurements:
+        marker = "  <- recommended" if rounds == best else ""
+        lines.append(f"{rounds:>4} {seconds * 1000:>9.1f} {1 / seconds:>15.1f}{marker}")
+    lines.append("")
+    lines.append(
+        f"PASSWORD_BCRYPT_ROUNDS={best} "
+        f"(target {target_ms:.0f} ms, configured {settings.password_bcrypt_rounds})"
+    )
+    if best < _MIN_RECOMMENDED_ROUNDS:
+        lines.append(
+            f"warning: costs below {_MIN_RECOMMENDED_ROUNDS} are weak; "
+            "raise the target or add hasher capacity instead"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app", description="Service utilities"
+    )
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print an import-time and lifespan-phase breakdown",
+    )
+    action.add_argument(
+        "--calibrate-bcrypt",
+        action="store_true",
+        help="recommend a bcrypt cost for a target hash latency",
+    )
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250.0,
+        help="bcrypt latency budget per hash, for --calibrate-bcrypt",
+    )
+    args = parser.parse_args(argv)
+    if args.calibrate_bcrypt:
+        print(_calibrate(args.target_ms))
+        return 0
+    if not args.profile_startup:
+        parser.print_help()
+        return 2
+    logging.basicConfig(level=logging.WARNING)
+    print(profile_startup(args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Admission control.
+
+Without a limit, a burst of registrations queues up in front of the hasher
+and the connection pool until clients time out, and every queued request
+still costs memory and a slot once it gets there. AdmissionControlMiddleware
+caps the requests being handled, in total and per route. A request that
+finds its limit full waits a short, bounded time for a slot; past that, or
+when too many are already waiting, it gets an immediate 503 with
+Retry-After, which clients and load balancers can act on.
+
+Draining requests on shutdown is uvicorn's job, not this module's: on
+SIGTERM it closes its listeners and idle keep-alive connections, answers
+in-flight requests with `Connection: close` and waits for them (up to
+SERVE_GRACEFUL_SHUTDOWN_SECONDS) before the lifespan shutdown starts.
+"""
+
+import asyncio
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+from app.responses import json_response
+
+_TOTAL = "total"
+
+
+class _Limit:
+    """A semaphore with a bounded number of waiters."""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int) -> None:
+        self.name = name
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._max_queue = max_queue
+        self._waiting = 0
+
+    async def acquire(self, timeout: float) -> str | None:
+        """Take a slot; on failure return why ("queue_full", "queue_timeout")."""
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return None
+        if self._waiting >= self._max_queue:
+            return "queue_full"
+        self._waiting += 1
+        try:
+            async with asyncio.timeout(max(timeout, 0.0)):
+                await self._slots.acquire()
+        except TimeoutError:
+            return "queue_timeout"
+        finally:
+            self._waiting -= 1
+        return None
+
+    def release(self) -> None:
+        self._slots.release()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int = settings.admission_max_in_flight,
+        route_limits: dict[str, int] = settings.admission_route_limits,
+        max_queue: int = settings.admission_max_queue,
+        queue_timeout: float = settings.admission_queue_timeout,
+        retry_after: int = settings.admission_retry_after_seconds,
+    ) -> None:
+        self._total = _Limit(_TOTAL, max_in_flight, max_queue)
+        self._routes = {
+            route: _Limit(route, limit, max_queue)
+            for route, limit in route_limits.items()
+        }
+        self._queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    async def admit(self, method: str, path: str) -> list[_Limit] | str:
+        """Take the slots a request needs.
+
+        Returns the limits to release afterwards, or the reason the request
+        was refused. The queue timeout covers the wait for all of them.
+        """
+        started = time.monotonic()
+        deadline = started + self._queue_timeout
+        taken: list[_Limit] = []
+        route = self._routes.get(f"{method} {path}")
+        for limit in (route, self._total):
+            if limit is None:
+                continue
+            reason = await limit.acquire(deadline - time.monotonic())
+            if reason is not None:
+                for held in taken:
+                    held.release()
+                ADMISSION_REJECTED.inc(limit.name, reason)
+                return reason
+            taken.append(limit)
+
+        ADMISSION_QUEUE_WAIT.observe(time.monotonic() - started)
+        self.in_flight += 1
+        return taken
+
+    def release(self, taken: list[_Limit]) -> None:
+        for limit in taken:
+            limit.release()
+        self.in_flight -= 1
+
+
+class AdmissionControlMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        exempt_paths: list[str] = settings.admission_exempt_paths,
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self._exempt = frozenset(exempt_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self._exempt:
+            await self.app(scope, receive, send)
+            return
+
+        taken = await self.controller.admit(scope["method"], scope["path"])
+        if isinstance(taken, str):
+            response = json_response(
+                {"detail": "Service is busy, please try again later"},
+                status_code=503,
+                headers={"Retry-After": str(self.controller.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(taken)
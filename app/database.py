@@ -5,61 +5,321 @@ Migrations are plain SQL files in the migrations/ directory, named with a
 numeric prefix (e.g. 001_initial.sql, 002_add_column.sql). The runner
 keeps track of applied migrations in a `schema_migrations` table and only
 executes files that have not been applied yet, in order.
+
+Several processes may start at once (uvicorn --workers, replicas). The runner
+first checks, without locking, whether anything is pending; only then does it
+take a Postgres advisory lock, so one process applies the files while the
+others wait and find nothing left to do. Production can instead run
+`python -m app.migrate` once before a rollout and start the app with
+DATABASE_RUN_MIGRATIONS_ON_STARTUP=false.
+
+A file containing the line `-- migrate: no-transaction` is run outside a
+transaction, one statement at a time, for statements Postgres refuses to run
+in one: CREATE INDEX CONCURRENTLY builds an index without blocking writes.
+Each completed statement is recorded in `schema_migrations.statements_done`
+(`applied_at` stays NULL until the last one), so a failed or interrupted
+run resumes where it stopped. A concurrent index build that fails leaves an
+INVALID index behind, which is dropped before the build is retried.
 """
 
+import asyncio
 import logging
 import os
+import re
 
 import asyncpg
 
 from app.config import settings
+from app.repositories import statements
 
 logger = logging.getLogger(__name__)
 
+# Arbitrary application-wide key for pg_advisory_lock.
+_MIGRATION_LOCK_ID = 7_246_118_539_120_001
+
+# How often a process waiting for the migration lock asks for it again.
+_LOCK_POLL_INTERVAL = 0.2
+
+# applied_at is NULL while a no-transaction migration is part-way through.
 _CREATE_MIGRATIONS_TABLE = """
 CREATE TABLE IF NOT EXISTS schema_migrations (
     version     TEXT        PRIMARY KEY,
     applied_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
+ALTER TABLE schema_migrations
+    ALTER COLUMN applied_at DROP NOT NULL,
+    ADD COLUMN IF NOT EXISTS statements_done INTEGER;
 """
 
+_NO_TRANSACTION = re.compile(r"^\s*--\s*migrate:\s*no-transaction\s*$", re.M | re.I)
+_DOLLAR_QUOTE = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+_CONCURRENT_INDEX = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+"
+    r"(?:IF\s+NOT\s+EXISTS\s+)?((?:\"[^\"]+\"|[\w$]+)(?:\.(?:\"[^\"]+\"|[\w$]+))?)",
+    re.I,
+)
 
-async def create_pool() -> asyncpg.Pool:
+
+async def create_pool(
+    dsn: str | None = None, max_size: int = settings.database_pool_max_size
+) -> asyncpg.Pool:
+    """Create the application pool (or, given `dsn`, the replica pool).
+
+    Registered statements (see app.repositories.statements) are prepared
+    through asyncpg's statement cache, once per connection, and stay cached
+    for the connection's lifetime.
+    """
+    cache_size = settings.database_statement_cache_size
+    if 0 < cache_size < statements.registered_count():
+        logger.warning(
+            "DATABASE_STATEMENT_CACHE_SIZE=%d is below the %d registered "
+            "statements; they will be evicted and prepared again",
+            cache_size,
+            statements.registered_count(),
+        )
     return await asyncpg.create_pool(
-        dsn=settings.database_url,
-        min_size=2,
-        max_size=10,
+        dsn=dsn or settings.database_url,
+        min_size=min(settings.database_pool_min_size, max_size),
+        max_size=max_size,
+        max_inactive_connection_lifetime=(
+            settings.database_max_inactive_connection_lifetime
+        ),
+        statement_cache_size=cache_size,
+        max_cached_statement_lifetime=0,
+        command_timeout=settings.database_command_timeout,
     )
 
 
-async def run_migrations(pool: asyncpg.Pool, migrations_dir: str = "migrations") -> None:
-    """Apply all pending SQL migration files in alphabetical order."""
+def _migration_files(migrations_dir: str) -> list[str]:
+    return sorted(f for f in os.listdir(migrations_dir) if f.endswith(".sql"))
+
+
+async def _applied_versions(conn: asyncpg.Connection) -> set[str]:
+    rows = await conn.fetch(
+        "SELECT version FROM schema_migrations WHERE applied_at IS NOT NULL"
+    )
+    return {row["version"] for row in rows}
+
+
+async def pending_migrations(
+    conn: asyncpg.Connection, migrations_dir: str = "migrations"
+) -> list[str]:
+    """Return the migration files not yet recorded in schema_migrations."""
+    exists = await conn.fetchval("SELECT to_regclass('schema_migrations')")
+    applied = await _applied_versions(conn) if exists else set()
+    return [f for f in _migration_files(migrations_dir) if f not in applied]
+
+
+async def run_migrations(
+    pool: asyncpg.Pool, migrations_dir: str = "migrations"
+) -> list[str]:
+    """Apply all pending SQL migration files in alphabetical order.
+
+    Returns the file names applied by this call (empty when another process
+    applied them first). When it is not empty, callers should recycle pooled
+    connections (`pool.expire_connections()`) so no connection keeps statements
+    cached against the old schema.
+    """
     async with pool.acquire() as conn:
-        # Ensure the tracking table exists (idempotent)
-        await conn.execute(_CREATE_MIGRATIONS_TABLE)
+        return await _run_migrations(conn, migrations_dir)
 
-        applied: set[str] = {
-            row["version"]
-            for row in await conn.fetch("SELECT version FROM schema_migrations")
-        }
 
-        files = sorted(
-            f for f in os.listdir(migrations_dir) if f.endswith(".sql")
-        )
+async def run_migrations_standalone(
+    dsn: str | None = None, migrations_dir: str = "migrations"
+) -> list[str]:
+    """run_migrations() on a dedicated connection rather than a pooled one.
 
-        for filename in files:
-            if filename in applied:
-                logger.debug("Migration already applied: %s", filename)
-                continue
+    Lets startup migrate while the pool is still opening its connections.
+    """
+    conn = await asyncpg.connect(dsn or settings.database_url)
+    try:
+        return await _run_migrations(conn, migrations_dir)
+    finally:
+        await conn.close()
+
+
+async def _run_migrations(conn: asyncpg.Connection, migrations_dir: str) -> list[str]:
+    # Common case on every boot after the first: nothing to do, no lock.
+    if not await pending_migrations(conn, migrations_dir):
+        return []
+
+    await _acquire_migration_lock(conn)
+    try:
+        return await _apply_pending(conn, migrations_dir)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", _MIGRATION_LOCK_ID)
+
+
+async def _acquire_migration_lock(conn: asyncpg.Connection) -> None:
+    # Polled rather than waited for in pg_advisory_lock: a statement blocked
+    # there holds a snapshot, and CREATE INDEX CONCURRENTLY in the process
+    # holding the lock waits for every older snapshot to go away.
+    async with asyncio.timeout(settings.database_migration_lock_timeout):
+        while not await conn.fetchval(
+            "SELECT pg_try_advisory_lock($1)", _MIGRATION_LOCK_ID
+        ):
+            await asyncio.sleep(_LOCK_POLL_INTERVAL)
+
+
+async def _apply_pending(conn: asyncpg.Connection, migrations_dir: str) -> list[str]:
+    # Ensure the tracking table exists (idempotent)
+    await conn.execute(_CREATE_MIGRATIONS_TABLE)
+    # Re-read under the lock: the previous holder may have applied everything.
+    applied = await _applied_versions(conn)
+
+    newly_applied: list[str] = []
+    for filename in _migration_files(migrations_dir):
+        if filename in applied:
+            logger.debug("Migration already applied: %s", filename)
+            continue
 
-            path = os.path.join(migrations_dir, filename)
-            with open(path) as f:
-                sql = f.read()
+        path = os.path.join(migrations_dir, filename)
+        with open(path) as f:
+            sql = f.read()
 
+        if _NO_TRANSACTION.search(sql):
+            await _apply_without_transaction(conn, filename, sql)
+        else:
             async with conn.transaction():
-                await conn.execute(sql)
+                await conn.execute(sql, timeout=settings.database_migration_timeout)
                 await conn.execute(
                     "INSERT INTO schema_migrations (version) VALUES ($1)", filename
                 )
 
-            logger.info("Applied migration: %s", filename)
+        logger.info("Applied migration: %s", filename)
+        newly_applied.append(filename)
+
+    return newly_applied
+
+
+async def _apply_without_transaction(
+    conn: asyncpg.Connection, filename: str, sql: str
+) -> None:
+    statements = split_statements(sql)
+    done = (
+        await conn.fetchval(
+            "SELECT statements_done FROM schema_migrations WHERE version = $1",
+            filename,
+        )
+        or 0
+    )
+    if done:
+        logger.info(
+            "Resuming migration %s at statement %d/%d",
+            filename,
+            done + 1,
+            len(statements),
+        )
+
+    for number, statement in enumerate(statements[done:], start=done + 1):
+        await _execute_statement(conn, statement)
+        await conn.execute(
+            """
+            INSERT INTO schema_migrations (version, applied_at, statements_done)
+            VALUES ($1, NULL, $2)
+            ON CONFLICT (version)
+            DO UPDATE SET statements_done = EXCLUDED.statements_done
+            """,
+            filename,
+            number,
+        )
+        logger.info("%s: statement %d/%d done", filename, number, len(statements))
+
+    await conn.execute(
+        """
+        INSERT INTO schema_migrations (version, statements_done)
+        VALUES ($1, $2)
+        ON CONFLICT (version) DO UPDATE SET applied_at = NOW()
+        """,
+        filename,
+        len(statements),
+    )
+
+
+async def _execute_statement(conn: asyncpg.Connection, statement: str) -> None:
+    match = _CONCURRENT_INDEX.match(statement)
+    if match is None:
+        await conn.execute(statement, timeout=settings.database_migration_timeout)
+        return
+
+    index = match.group(1)
+    retries = settings.database_migration_index_retries
+    for attempt in range(retries + 1):
+        # IF NOT EXISTS would silently keep an index whose build failed.
+        await _drop_invalid_index(conn, index)
+        try:
+            await conn.execute(
+                statement, timeout=settings.database_migration_timeout
+            )
+            return
+        except (asyncpg.PostgresError, TimeoutError):
+            await _drop_invalid_index(conn, index)
+            if attempt == retries:
+                raise
+            logger.warning(
+                "Concurrent build of index %s failed, retrying (%d/%d)",
+                index,
+                attempt + 1,
+                retries,
+                exc_info=True,
+            )
+
+
+async def _drop_invalid_index(conn: asyncpg.Connection, index: str) -> None:
+    invalid = await conn.fetchval(
+        "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)",
+        index,
+    )
+    if invalid:
+        logger.warning("Dropping invalid index %s left by a failed build", index)
+        await conn.execute(
+            f"DROP INDEX CONCURRENTLY IF EXISTS {index}",
+            timeout=settings.database_migration_timeout,
+        )
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split SQL text into statements at top-level semicolons.
+
+    Semicolons inside quoted strings and identifiers, dollar-quoted bodies
+    and comments do not end a statement. Statements that are only comments
+    are dropped.
+    """
+    statements: list[str] = []
+    start = 0
+    has_code = False
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end + 1
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end == -1 else end + 2
+            continue
+
+        if char == ";":
+            if has_code:
+                statements.append(sql[start:i].strip())
+            start, has_code = i + 1, False
+        elif not char.isspace() and not has_code:
+            start, has_code = i, True
+
+        if char in "'\"":
+            # A doubled quote is an escaped one, which the loop re-enters.
+            end = sql.find(char, i + 1)
+            i = len(sql) if end == -1 else end + 1
+            continue
+        if char == "$" and (i == 0 or not (sql[i - 1].isalnum() or sql[i - 1] == "_")):
+            tag = _DOLLAR_QUOTE.match(sql, i)
+            if tag is not None:
+                end = sql.find(tag.group(), tag.end())
+                i = len(sql) if end == -1 else end + len(tag.group())
+                continue
+        i += 1
+
+    if has_code:
+        statements.append(sql[start:].strip())
+    return statements
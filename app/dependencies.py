@@ -1,20 +1,66 @@
-from typing import AsyncGenerator
+import secrets
 
 import asyncpg
-import httpx
-from fastapi import Depends, Request
+from fastapi import Header, Request
+
+from app.config import settings
+from app.exceptions.base import AdminAccessDeniedError
+from app.repositories.unit_of_work import UnitOfWork
+from app.services.activation_tokens import ActivationTokenSigner
+from app.services.credential_cache import VerifiedCredentialCache
+from app.services.email_filter import RegisteredEmailFilter
+from app.services.export_service import ExportService
+from app.services.idempotency import RequestCoalescer
+from app.services.password_hasher import PasswordHasher
+from app.services.password_rehasher import PasswordRehasher
+from app.services.rate_limiter import RateLimiter
 
 
 async def get_pool(request: Request) -> asyncpg.Pool:
     return request.app.state.pool
 
 
-async def get_db(
-    pool: asyncpg.Pool = Depends(get_pool),
-) -> AsyncGenerator[asyncpg.Connection, None]:
-    async with pool.acquire() as connection:
-        yield connection
+async def get_unit_of_work(request: Request) -> UnitOfWork:
+    return request.app.state.unit_of_work
+
+
+async def get_password_hasher(request: Request) -> PasswordHasher:
+    return request.app.state.password_hasher
+
+
+async def get_password_rehasher(request: Request) -> PasswordRehasher:
+    return request.app.state.password_rehasher
+
+
+async def get_activation_tokens(request: Request) -> ActivationTokenSigner | None:
+    return request.app.state.activation_tokens
+
+
+async def get_credential_cache(request: Request) -> VerifiedCredentialCache | None:
+    return request.app.state.credential_cache
+
+
+async def get_email_filter(request: Request) -> RegisteredEmailFilter | None:
+    return request.app.state.email_filter
+
+
+async def get_rate_limiter(request: Request) -> RateLimiter:
+    return request.app.state.rate_limiter
+
+
+async def get_request_coalescer(request: Request) -> RequestCoalescer:
+    return request.app.state.request_coalescer
+
+
+async def get_export_service(request: Request) -> ExportService:
+    return request.app.state.export_service
 
 
-async def get_http_client(request: Request) -> httpx.AsyncClient:
-    return request.app.state.http_client
+async def require_admin_token(
+    x_admin_token: str | None = Header(default=None),
+) -> None:
+    expected = settings.admin_api_token
+    if not expected or not x_admin_token:
+        raise AdminAccessDeniedError()
+    if not secrets.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise AdminAccessDeniedError()
@@ -18,19 +18,48 @@ class InvalidCredentialsError(AppException):
         super().__init__("Invalid credentials", status.HTTP_401_UNAUTHORIZED)
 
 
+class AdminAccessDeniedError(AppException):
+    def __init__(self) -> None:
+        super().__init__("Admin token required", status.HTTP_403_FORBIDDEN)
+
+
 class InvalidCodeError(AppException):
     def __init__(self, reason: str = "Invalid or expired code") -> None:
         super().__init__(reason, status.HTTP_422_UNPROCESSABLE_CONTENT)
 
 
+class IdempotencyKeyReusedError(AppException):
+    def __init__(self) -> None:
+        super().__init__(
+            "Idempotency-Key was already used for a different request",
+            status.HTTP_422_UNPROCESSABLE_CONTENT,
+        )
+
+
 class UserAlreadyActiveError(AppException):
     def __init__(self) -> None:
         super().__init__("Account is already active", status.HTTP_409_CONFLICT)
 
 
-class EmailDeliveryError(AppException):
-    def __init__(self) -> None:
+class ServiceOverloadedError(AppException):
+    def __init__(self, retry_after: int = 1) -> None:
         super().__init__(
-            "Failed to send email, please try again later",
+            "Service is busy, please try again later",
             status.HTTP_503_SERVICE_UNAVAILABLE,
         )
+        self.retry_after = retry_after
+
+
+class TooManyRequestsError(AppException):
+    def __init__(self, retry_after: int = 1) -> None:
+        super().__init__(
+            "Too many attempts, please try again later",
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+        self.retry_after = retry_after
+
+
+class ResendCooldownError(TooManyRequestsError):
+    def __init__(self, retry_after: int = 1) -> None:
+        super().__init__(retry_after)
+        self.message = "Activation code was sent recently, please try again later"
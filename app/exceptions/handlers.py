@@ -1,8 +1,16 @@
+from typing import Sequence
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
-from app.exceptions.base import AppException, InvalidCredentialsError
+from app.exceptions.base import (
+    AppException,
+    InvalidCredentialsError,
+    ServiceOverloadedError,
+    TooManyRequestsError,
+)
+from app.responses import json_response
 
 
 def register_exception_handlers(app: FastAPI) -> None:
@@ -13,9 +21,11 @@ def register_exception_handlers(app: FastAPI) -> None:
         headers = {}
         if isinstance(exc, InvalidCredentialsError):
             headers["WWW-Authenticate"] = "Basic"
-        return JSONResponse(
+        if isinstance(exc, (ServiceOverloadedError, TooManyRequestsError)):
+            headers["Retry-After"] = str(exc.retry_after)
+        return json_response(
+            {"detail": exc.message},
             status_code=exc.status_code,
-            content={"detail": exc.message},
             headers=headers or None,
         )
 
@@ -23,15 +33,25 @@ def register_exception_handlers(app: FastAPI) -> None:
     async def validation_exception_handler(
         request: Request, exc: RequestValidationError
     ) -> JSONResponse:
-        # Pydantic v2 stores the original Exception object in error['ctx']['error'],
-        # which is not JSON serializable — convert it to string.
-        errors = []
-        for error in exc.errors():
-            err = dict(error)
-            if "ctx" in err:
-                err["ctx"] = {
+        return json_response({"detail": format_validation_errors(exc.errors())}, 422)
+
+
+def format_validation_errors(errors: Sequence[dict]) -> list[dict]:
+    """Make pydantic errors JSON-serializable.
+
+    Pydantic v2 stores the original Exception object in error['ctx']['error'],
+    which is not JSON serializable — convert it to string. Only errors that
+    carry a ctx are copied; the rest are passed through as they are.
+    """
+    formatted = list(errors)
+    for i, error in enumerate(formatted):
+        ctx = error.get("ctx")
+        if ctx and any(isinstance(v, Exception) for v in ctx.values()):
+            formatted[i] = {
+                **error,
+                "ctx": {
                     k: str(v) if isinstance(v, Exception) else v
-                    for k, v in err["ctx"].items()
-                }
-            errors.append(err)
-        return JSONResponse(status_code=422, content={"detail": errors})
+                    for k, v in ctx.items()
+                },
+            }
+    return formatted
@@ -1,25 +1,150 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
-import httpx
+import asyncpg
 from fastapi import FastAPI
 
-from app.database import create_pool, run_migrations
+from app.admission import AdmissionControlMiddleware, AdmissionController
+from app.config import settings
+from app.database import create_pool, run_migrations_standalone
 from app.exceptions.handlers import register_exception_handlers
-from app.routers import users
+from app.metrics import LoopLagMonitor, MetricsMiddleware
+from app.profiling import PhaseTimer
+from app.repositories.replica import ReplicaMonitor
+from app.repositories.unit_of_work import UnitOfWork
+from app.responses import DefaultJSONResponse
+from app.routers import metrics, users
+from app.services.activation_tokens import ActivationTokenSigner
+from app.services.credential_cache import VerifiedCredentialCache
+from app.services.email_dispatcher import EmailDispatcher
+from app.services.email_filter import RegisteredEmailFilter
+from app.services.email_service import EmailService
+from app.services.export_service import ExportService
+from app.services.idempotency import RequestCoalescer
+from app.services.password_hasher import PasswordHasher
+from app.services.password_rehasher import PasswordRehasher
+from app.services.rate_limiter import RateLimiter
+from app.services.reapers import CodeReaper, IdempotencyKeyReaper, OutboxReaper
+from app.services.smtp_pool import SMTPConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+async def _skipped() -> None:
+    return None
+
+
+async def _open_database(
+    timer: PhaseTimer,
+) -> tuple[asyncpg.Pool, asyncpg.Pool | None]:
+    """Open the pools and apply migrations side by side.
+
+    Opening a pool connects `min_size` connections and prepares the
+    statement registry on each; the migration check needs its own
+    round trips. Neither waits for the other. On the rare boot that does
+    apply migrations, the pools' connections are recycled afterwards so
+    statements get prepared against the new schema.
+    """
+    replica_url = settings.database_replica_url
+    pool, replica_pool, applied = await asyncio.gather(
+        timer.measure("database pool", create_pool()),
+        timer.measure(
+            "replica pool",
+            create_pool(replica_url, settings.database_replica_pool_max_size),
+        )
+        if replica_url
+        else _skipped(),
+        timer.measure("migrations", run_migrations_standalone())
+        if settings.database_run_migrations_on_startup
+        else _skipped(),
+    )
+    if applied:
+        await pool.expire_connections()
+        if replica_pool is not None:
+            await replica_pool.expire_connections()
+    return pool, replica_pool
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # STARTUP
-    app.state.pool = await create_pool()
-    await run_migrations(app.state.pool)
-    app.state.http_client = httpx.AsyncClient(timeout=5.0)
+    # First: a token-mode deployment without a secret must not get further.
+    app.state.activation_tokens = ActivationTokenSigner.from_settings()
+    timer = app.state.startup_timer = PhaseTimer()
+    app.state.pool, replica_pool = await _open_database(timer)
+    app.state.replica_monitor = None
+    if replica_pool is not None:
+        app.state.replica_monitor = ReplicaMonitor(replica_pool)
+        await timer.measure("replica check", app.state.replica_monitor.check())
+        app.state.replica_monitor.start()
+    app.state.unit_of_work = UnitOfWork(
+        app.state.pool, replica=app.state.replica_monitor
+    )
+    app.state.export_service = ExportService(app.state.unit_of_work)
+    app.state.email_filter = None
+    if settings.email_filter_enabled:
+        app.state.email_filter = RegisteredEmailFilter(app.state.pool)
+        await timer.measure("email filter", app.state.email_filter.refresh())
+        app.state.email_filter.start()
+    # Constructors only: connections and worker threads start on first use.
+    with timer.phase("services"):
+        app.state.password_hasher = PasswordHasher.from_settings()
+        app.state.password_rehasher = PasswordRehasher(
+            app.state.unit_of_work, app.state.password_hasher
+        )
+        app.state.credential_cache = (
+            VerifiedCredentialCache() if settings.credential_cache_enabled else None
+        )
+        app.state.rate_limiter = RateLimiter.from_settings()
+        app.state.request_coalescer = RequestCoalescer()
+        app.state.smtp_pool = SMTPConnectionPool()
+        app.state.smtp_pool.start()
+        app.state.email_dispatcher = EmailDispatcher(
+            app.state.pool, EmailService(app.state.smtp_pool)
+        )
+        if settings.email_dispatcher_enabled:
+            app.state.email_dispatcher.start()
+        app.state.code_reaper = CodeReaper(app.state.pool)
+        if settings.code_reaper_enabled:
+            app.state.code_reaper.start()
+        app.state.outbox_reaper = OutboxReaper(app.state.pool)
+        if settings.outbox_reaper_enabled:
+            app.state.outbox_reaper.start()
+        app.state.idempotency_reaper = IdempotencyKeyReaper(app.state.pool)
+        if settings.idempotency_reaper_enabled:
+            app.state.idempotency_reaper.start()
+        app.state.loop_lag_monitor = LoopLagMonitor()
+        if settings.metrics_enabled:
+            app.state.loop_lag_monitor.start()
+    logger.info("Started in %.0f ms (%s)", timer.elapsed * 1000, timer.summary())
 
     yield
 
     # SHUTDOWN
+    # uvicorn only gets here once in-flight requests have finished (or
+    # SERVE_GRACEFUL_SHUTDOWN_SECONDS ran out). Finish the work they left
+    # behind, rehashes and due emails, within one time budget before
+    # anything it depends on is closed.
+    loop = asyncio.get_running_loop()
+    drain_deadline = loop.time() + settings.shutdown_drain_timeout
+    await app.state.password_rehasher.drain(drain_deadline - loop.time())
+    if settings.email_dispatcher_enabled:
+        await app.state.email_dispatcher.drain(drain_deadline - loop.time())
+    await app.state.loop_lag_monitor.stop()
+    await app.state.idempotency_reaper.stop()
+    await app.state.outbox_reaper.stop()
+    await app.state.code_reaper.stop()
+    await app.state.email_dispatcher.stop()
+    if app.state.email_filter:
+        await app.state.email_filter.stop()
+    await app.state.smtp_pool.close()
+    if app.state.replica_monitor:
+        await app.state.replica_monitor.stop()
+        await app.state.replica_monitor.pool.close()
     await app.state.pool.close()
-    await app.state.http_client.aclose()
+    await app.state.rate_limiter.close()
+    app.state.password_hasher.close()
 
 
 def create_app() -> FastAPI:
@@ -28,9 +153,18 @@ def create_app() -> FastAPI:
         description="Dailymotion user registration with email verification",
         version="0.1.0",
         lifespan=lifespan,
+        default_response_class=DefaultJSONResponse,
     )
     register_exception_handlers(app)
     app.include_router(users.router, prefix="/users", tags=["users"])
+    if settings.admission_enabled:
+        app.add_middleware(
+            AdmissionControlMiddleware, controller=AdmissionController()
+        )
+    # Added last so it is outermost: latency includes the admission wait.
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
     return app
 
 
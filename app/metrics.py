@@ -0,0 +1,290 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+A deliberately small registry (counters, gauges, histograms with fixed label
+names) so the service does not need prometheus_client. Metrics are defined
+once below and updated from the hot paths; GET /metrics renders them. With
+METRICS_ENABLED=false every update is a single attribute check, the HTTP
+middleware and the loop-lag monitor are not installed, and /metrics is not
+routed.
+"""
+
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from typing import Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.services.background import BackgroundTask
+
+# Seconds; tuned for a service whose slowest step is a ~250 ms bcrypt call.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)  # fmt: skip
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r'\"').replace("\n", r"\n")
+
+
+def _format_labels(
+    names: Sequence[str], values: Sequence[str], extra: str = ""
+) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+class Registry:
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._metrics: list["_Metric"] = []
+
+    def add(self, metric: "_Metric") -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics:
+            metric.reset()
+
+
+REGISTRY = Registry(enabled=settings.metrics_enabled)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._registry = registry
+        self.reset()
+        registry.add(self)
+
+    def reset(self) -> None:
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} "
+            f"{_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if self._registry.enabled:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        if self._registry.enabled:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self._buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels, registry)
+
+    def reset(self) -> None:
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self._buckets) + 1), 0.0]
+        series[0][bisect_left(self._buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self._buckets, math.inf), counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.label_names, key, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route handler and status code.",
+    labels=("method", "handler", "status"),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Latency of registered SQL statements.",
+    labels=("statement",),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection.",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database pool connections by state, sampled at scrape time.",
+    labels=("state",),
+)
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "1 while lag-tolerant reads are routed to the replica, 0 otherwise.",
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag measured by the last replica health check.",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt work time on the hasher pool, excluding queueing.",
+    labels=("operation",),
+)
+PASSWORD_HASH_QUEUE = Histogram(
+    "password_hash_queue_seconds",
+    "Time a bcrypt job waited for a hasher worker.",
+    labels=("operation",),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "bcrypt jobs refused because the hasher pool was saturated.",
+)
+PASSWORD_REHASHES = Counter(
+    "password_rehashes_total",
+    "Background rehashes to the configured bcrypt cost, by result.",
+    labels=("result",),
+)
+CREDENTIAL_CACHE_LOOKUPS = Counter(
+    "credential_cache_lookups_total",
+    "Verified-credential cache lookups by result (hit skips bcrypt).",
+    labels=("result",),
+)
+EMAIL_FILTER_CHECKS = Counter(
+    "email_filter_checks_total",
+    "Registered-email Bloom filter lookups; negatives skip the database.",
+    labels=("result",),
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests refused by a rate limit, by limit scope.",
+    labels=("scope",),
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_seconds",
+    "Time a request waited for an admission slot before being handled.",
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed by admission control, by limit and reason.",
+    labels=("limit", "reason"),
+)
+SMTP_SEND_DURATION = Histogram(
+    "smtp_send_duration_seconds",
+    "Time to hand one email to the SMTP server.",
+    labels=("outcome",),
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late a periodic timer fired on the event loop.",
+)
+
+
+class MetricsMiddleware:
+    """Record HTTP latency per route.
+
+    Routes are labelled by handler name rather than URL so path parameters
+    don't explode the label set; the router stores the matched endpoint in
+    the scope. Unrouted requests share the "unmatched" label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            handler = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, scope["method"], handler, str(status)
+            )
+
+
+class LoopLagMonitor(BackgroundTask):
+    """Sleep for a fixed interval and record how late the wake-up was."""
+
+    name = "loop-lag-monitor"
+
+    def __init__(self, interval: float = settings.metrics_loop_lag_interval) -> None:
+        super().__init__()
+        self._interval = interval
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            lag = time.perf_counter() - started - self._interval
+            EVENT_LOOP_LAG.observe(max(lag, 0.0))
@@ -0,0 +1,50 @@
+"""
+Apply pending migrations and exit.
+
+Run once per deployment, before the new version starts, so that app
+processes can boot with DATABASE_RUN_MIGRATIONS_ON_STARTUP=false:
+
+    uv run python -m app.migrate [--check] [--dir migrations]
+
+With --check nothing is applied; the exit status is 1 when migrations are
+pending, which makes it usable as a readiness gate.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+import asyncpg
+
+from app.config import settings
+from app.database import pending_migrations, run_migrations
+
+
+async def main(migrations_dir: str = "migrations", check: bool = False) -> int:
+    pool = await asyncpg.create_pool(settings.database_url, min_size=1, max_size=1)
+    try:
+        if check:
+            async with pool.acquire() as conn:
+                pending = await pending_migrations(conn, migrations_dir)
+            for filename in pending:
+                print(f"pending: {filename}")
+            return 1 if pending else 0
+
+        applied = await run_migrations(pool, migrations_dir)
+        for filename in applied:
+            print(f"applied: {filename}")
+        if not applied:
+            print("schema is up to date")
+        return 0
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dir", default="migrations")
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main(args.dir, args.check)))
@@ -0,0 +1,119 @@
+"""
+Startup timing.
+
+`main.lifespan` records how long each startup phase takes in a PhaseTimer
+and logs the breakdown once the app is ready. `python -m app
+--profile-startup` adds the import cost of `app.main`, measured in a fresh
+interpreter with `python -X importtime`, and prints both.
+"""
+
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class Phase:
+    name: str
+    # Seconds since the timer was created
+    started: float
+    duration: float
+
+
+@dataclass
+class PhaseTimer:
+    phases: list[Phase] = field(default_factory=list)
+    _origin: float = field(default_factory=time.perf_counter)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            self.phases.append(
+                Phase(name, started - self._origin, finished - started)
+            )
+
+    async def measure(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Await `awaitable` as one phase; phases measured this way may overlap."""
+        with self.phase(name):
+            return await awaitable
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def summary(self) -> str:
+        return ", ".join(f"{p.name} {p.duration * 1000:.0f} ms" for p in self.phases)
+
+
+def import_times(module: str = "app.main") -> dict[str, float]:
+    """Seconds spent importing `module`, by top-level package (self time).
+
+    Runs in a fresh interpreter so modules already loaded here don't hide
+    their cost.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    totals: dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1_000_000
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def _row(label: str, seconds: float, note: str = "") -> str:
+    return f"  {label:<28} {seconds * 1000:9.1f} ms  {note}".rstrip()
+
+
+async def _profile_lifespan() -> list[str]:
+    started = time.perf_counter()
+    from app.main import create_app
+
+    imported = time.perf_counter()
+    app = create_app()
+    lines = [
+        _row("import app.main", imported - started, "(this process)"),
+        _row("create_app()", time.perf_counter() - imported),
+        "",
+    ]
+    lines.append("Lifespan startup (offset from start, duration)")
+    async with app.router.lifespan_context(app):
+        timer: PhaseTimer = app.state.startup_timer
+        for phase in timer.phases:
+            lines.append(
+                _row(phase.name, phase.duration, f"@ +{phase.started * 1000:.1f} ms")
+            )
+        lines.append(_row("ready after", timer.elapsed))
+        stopping = time.perf_counter()
+    lines.append("")
+    lines.append(_row("shutdown", time.perf_counter() - stopping))
+    return lines
+
+
+def profile_startup(top: int = 15) -> str:
+    """Render the import and lifespan breakdown as a small report."""
+    import asyncio
+
+    imports = import_times()
+    lines = ["Imports of app.main (self time by top-level package)"]
+    for package, seconds in list(imports.items())[:top]:
+        lines.append(_row(package, seconds))
+    lines.append(_row("total", sum(imports.values())))
+    lines.append("")
+    lines.extend(asyncio.run(_profile_lifespan()))
+    return "\n".join(lines)
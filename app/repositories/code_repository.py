@@ -3,6 +3,62 @@ from uuid import UUID
 
 from asyncpg import Connection, Record
 
+from app.repositories import statements
+
+_CREATE_FOR_USER = statements.register(
+    "codes.create_for_user",
+    """
+    INSERT INTO activation_codes (user_id, code, expires_at)
+    VALUES ($1, $2, NOW() + INTERVAL '1 minute')
+    """,
+)
+
+_CREATE_MANY = statements.register(
+    "codes.create_many",
+    """
+    INSERT INTO activation_codes (user_id, code, expires_at)
+    SELECT user_id, code, NOW() + INTERVAL '1 minute'
+    FROM unnest($1::uuid[], $2::text[]) AS t(user_id, code)
+    """,
+)
+
+# The latest unused code of a user, with whether it is valid for at least
+# another $2 seconds and how long is left of the $3-second resend cooldown.
+_LATEST_FOR_RESEND = statements.register(
+    "codes.latest_for_resend",
+    """
+    SELECT id,
+           code,
+           expires_at > NOW() + make_interval(secs => $2) AS reusable,
+           EXTRACT(
+               EPOCH FROM last_sent_at + make_interval(secs => $3) - NOW()
+           )::float8 AS cooldown_remaining
+    FROM activation_codes
+    WHERE user_id = $1 AND used_at IS NULL
+    ORDER BY created_at DESC
+    LIMIT 1
+    """,
+)
+
+_MARK_SENT = statements.register(
+    "codes.mark_sent",
+    "UPDATE activation_codes SET last_sent_at = NOW() WHERE id = $1",
+)
+
+_DELETE_EXPIRED = statements.register(
+    "codes.delete_expired",
+    """
+    DELETE FROM activation_codes
+    WHERE id IN (
+        SELECT id
+        FROM activation_codes
+        WHERE expires_at < NOW() - make_interval(secs => $1)
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    """,
+)
+
 
 def _generate_code() -> str:
     """Generate a cryptographically secure 4-digit code (zero-padded)."""
@@ -19,38 +75,46 @@ class CodeRepository:
         expiry is computed DB-side to avoid clock drift between app instances.
         """
         code = _generate_code()
-        await self._conn.execute(
-            """
-            INSERT INTO activation_codes (user_id, code, expires_at)
-            VALUES ($1, $2, NOW() + INTERVAL '1 minute')
-            """,
-            user_id,
-            code,
-        )
+        await statements.execute(self._conn, _CREATE_FOR_USER, user_id, code)
         return code
 
-    async def get_lastest_valid(self, user_id: UUID, code: str) -> Record | None:
-        """Return the most recent unused, non-expired code record matching user + code.
+    async def create_many(self, user_ids: list[UUID]) -> dict[UUID, str]:
+        """Insert one activation code per user and return them by user id."""
+        codes = {user_id: _generate_code() for user_id in user_ids}
+        await statements.execute(
+            self._conn, _CREATE_MANY, list(codes), list(codes.values())
+        )
+        return codes
+
+    async def latest_for_resend(
+        self, user_id: UUID, min_validity_seconds: float, cooldown_seconds: float
+    ) -> Record | None:
+        """Return the user's latest unused code as (id, code, reusable,
+        cooldown_remaining), or None when there is none.
 
-        Returns None if no such record exists (wrong code, expired, or already used).
+        `reusable` means it stays valid for `min_validity_seconds` more; a
+        positive `cooldown_remaining` means it was sent too recently.
         """
-        return await self._conn.fetchrow(
-            """
-            SELECT id, user_id, code, expires_at, used_at
-            FROM activation_codes
-            WHERE user_id   = $1
-              AND code       = $2
-              AND expires_at > NOW()
-              AND used_at   IS NULL
-            ORDER BY created_at DESC
-            LIMIT 1
-            """,
+        return await statements.fetchrow(
+            self._conn,
+            _LATEST_FOR_RESEND,
             user_id,
-            code,
+            min_validity_seconds,
+            cooldown_seconds,
         )
 
-    async def mark_used(self, code_id: UUID) -> None:
-        await self._conn.execute(
-            "UPDATE activation_codes SET used_at = NOW() WHERE id = $1",
-            code_id,
+    async def mark_sent(self, code_id: UUID) -> None:
+        await statements.execute(self._conn, _MARK_SENT, code_id)
+
+    async def delete_expired(self, older_than_seconds: float, limit: int) -> int:
+        """Delete up to `limit` codes that expired more than `older_than_seconds`
+        ago and return how many rows were removed.
+
+        Every code expires shortly after creation, so used codes are caught by
+        the same predicate once they age out. SKIP LOCKED keeps the reaper
+        from waiting on rows an activation is currently holding.
+        """
+        status = await statements.execute(
+            self._conn, _DELETE_EXPIRED, older_than_seconds, limit
         )
+        return int(status.split()[-1])
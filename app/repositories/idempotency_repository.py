@@ -0,0 +1,66 @@
+from asyncpg import Connection, Record
+
+from app.repositories import statements
+
+_GET = statements.register(
+    "idempotency.get",
+    """
+    SELECT fingerprint, response
+    FROM idempotency_keys
+    WHERE key = $1
+      AND created_at > NOW() - make_interval(secs => $2)
+    """,
+)
+
+# An expired row that the reaper has not removed yet is taken over; a live
+# one is left alone and reported as not saved.
+_SAVE = statements.register(
+    "idempotency.save",
+    """
+    INSERT INTO idempotency_keys (key, fingerprint, response)
+    VALUES ($1, $2, $3::jsonb)
+    ON CONFLICT (key) DO UPDATE
+    SET fingerprint = EXCLUDED.fingerprint,
+        response    = EXCLUDED.response,
+        created_at  = NOW()
+    WHERE idempotency_keys.created_at <= NOW() - make_interval(secs => $4)
+    """,
+)
+
+_DELETE_EXPIRED = statements.register(
+    "idempotency.delete_expired",
+    """
+    DELETE FROM idempotency_keys
+    WHERE key IN (
+        SELECT key
+        FROM idempotency_keys
+        WHERE created_at < NOW() - make_interval(secs => $1)
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    """,
+)
+
+
+class IdempotencyRepository:
+    def __init__(self, conn: Connection) -> None:
+        self._conn = conn
+
+    async def get(self, key: str, ttl_seconds: float) -> Record | None:
+        """Return the live (fingerprint, response JSON text) stored for key."""
+        return await statements.fetchrow(self._conn, _GET, key, ttl_seconds)
+
+    async def save(
+        self, key: str, fingerprint: str, response: str, ttl_seconds: float
+    ) -> bool:
+        """Store a response; False if a live entry already holds the key."""
+        status = await statements.execute(
+            self._conn, _SAVE, key, fingerprint, response, ttl_seconds
+        )
+        return status.split()[-1] == "1"
+
+    async def delete_expired(self, older_than_seconds: float, limit: int) -> int:
+        status = await statements.execute(
+            self._conn, _DELETE_EXPIRED, older_than_seconds, limit
+        )
+        return int(status.split()[-1])
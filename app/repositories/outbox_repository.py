@@ -0,0 +1,158 @@
+from uuid import UUID
+
+from asyncpg import Connection, Record
+
+from app.repositories import statements
+
+_ENQUEUE = statements.register(
+    "outbox.enqueue",
+    """
+    INSERT INTO email_outbox (recipient, subject, body)
+    VALUES ($1, $2, $3)
+    """,
+)
+
+_CLAIM_BATCH = statements.register(
+    "outbox.claim_batch",
+    """
+    UPDATE email_outbox
+    SET attempts        = attempts + 1,
+        next_attempt_at = NOW() + make_interval(secs => $3)
+    WHERE id IN (
+        SELECT id
+        FROM email_outbox
+        WHERE sent_at IS NULL
+          AND failed_at IS NULL
+          AND next_attempt_at <= NOW()
+          AND attempts < $2
+        ORDER BY next_attempt_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, recipient, subject, body, attempts
+    """,
+)
+
+_MARK_SENT = statements.register(
+    "outbox.mark_sent",
+    """
+    UPDATE email_outbox
+    SET sent_at = NOW(), last_error = NULL
+    WHERE id = ANY($1::uuid[])
+    """,
+)
+
+_MARK_FAILED = statements.register(
+    "outbox.mark_failed",
+    """
+    UPDATE email_outbox
+    SET last_error      = $2,
+        next_attempt_at = NOW() + make_interval(secs => $3)
+    WHERE id = $1
+    """,
+)
+
+_MARK_DEAD = statements.register(
+    "outbox.mark_dead",
+    """
+    UPDATE email_outbox
+    SET last_error = $2, failed_at = NOW()
+    WHERE id = $1
+    """,
+)
+
+_FAIL_ABANDONED = statements.register(
+    "outbox.fail_abandoned",
+    """
+    UPDATE email_outbox
+    SET failed_at  = NOW(),
+        last_error = COALESCE(last_error, 'lease expired on the final attempt')
+    WHERE sent_at IS NULL
+      AND failed_at IS NULL
+      AND next_attempt_at <= NOW()
+      AND attempts >= $1
+    """,
+)
+
+_DELETE_FINISHED = statements.register(
+    "outbox.delete_finished",
+    """
+    DELETE FROM email_outbox
+    WHERE id IN (
+        SELECT id
+        FROM email_outbox
+        WHERE (sent_at IS NOT NULL OR failed_at IS NOT NULL)
+          AND COALESCE(sent_at, failed_at) < NOW() - make_interval(secs => $1)
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    """,
+)
+
+
+class OutboxRepository:
+    def __init__(self, conn: Connection) -> None:
+        self._conn = conn
+
+    async def enqueue(self, recipient: str, subject: str, body: str) -> None:
+        """Queue an email for delivery.
+
+        Call inside the transaction that creates the data the email refers to,
+        so the message exists if and only if that transaction commits.
+        """
+        await statements.execute(self._conn, _ENQUEUE, recipient, subject, body)
+
+    async def enqueue_many(self, messages: list[tuple[str, str, str]]) -> None:
+        """Queue (recipient, subject, body) messages with a single COPY."""
+        await self._conn.copy_records_to_table(
+            "email_outbox",
+            records=messages,
+            columns=["recipient", "subject", "body"],
+        )
+
+    async def claim_batch(
+        self, limit: int, max_attempts: int, lease_seconds: float
+    ) -> list[Record]:
+        """Claim up to `limit` due messages and return them.
+
+        Claimed rows are pushed `lease_seconds` into the future so that other
+        dispatchers skip them; if this process dies mid-send they become due
+        again once the lease expires. SKIP LOCKED lets several dispatchers
+        claim disjoint batches concurrently without blocking each other.
+        """
+        return await statements.fetch(
+            self._conn, _CLAIM_BATCH, limit, max_attempts, lease_seconds
+        )
+
+    async def mark_sent(self, ids: list[UUID]) -> None:
+        await statements.execute(self._conn, _MARK_SENT, ids)
+
+    async def mark_failed(
+        self, message_id: UUID, error: str, retry_in_seconds: float
+    ) -> None:
+        await statements.execute(
+            self._conn, _MARK_FAILED, message_id, error, retry_in_seconds
+        )
+
+    async def mark_dead(self, message_id: UUID, error: str) -> None:
+        """Stop retrying a message; it is kept for inspection until reaped."""
+        await statements.execute(self._conn, _MARK_DEAD, message_id, error)
+
+    async def fail_abandoned(self, max_attempts: int) -> int:
+        """Mark messages whose final attempt was never reported as dead.
+
+        A dispatcher that dies after claiming a message on its last attempt
+        leaves it with no attempts to spare; once the lease expires nothing
+        would claim it again. Return how many messages were given up on.
+        """
+        status = await statements.execute(self._conn, _FAIL_ABANDONED, max_attempts)
+        return int(status.split()[-1])
+
+    async def delete_finished(self, older_than_seconds: float, limit: int) -> int:
+        """Delete up to `limit` sent or dead messages that finished more than
+        `older_than_seconds` ago and return how many rows were removed.
+        """
+        status = await statements.execute(
+            self._conn, _DELETE_FINISHED, older_than_seconds, limit
+        )
+        return int(status.split()[-1])
@@ -0,0 +1,91 @@
+"""
+Health tracking for the optional read-replica pool.
+
+Reads that tolerate replication lag (pre-transaction lookups, availability
+checks) go to the replica while it is reachable and no further behind than
+`max_lag_seconds`; otherwise they go to the primary. ReplicaMonitor probes
+the replica in the background so routing decisions cost a flag check.
+"""
+
+import asyncio
+import logging
+
+import asyncpg
+
+from app.config import settings
+from app.metrics import DB_REPLICA_HEALTHY, DB_REPLICA_LAG
+from app.services.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Zero when everything received has been replayed: an idle primary generates
+# no WAL, so the age of the last replayed transaction alone would read as lag.
+# Also zero when pointed at a primary (pg_is_in_recovery() is false).
+_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0
+    )
+END::float8
+"""
+
+# Errors meaning "the replica is unusable right now", as opposed to a bug.
+REPLICA_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+)
+
+
+class ReplicaMonitor(BackgroundTask):
+    name = "replica-monitor"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        max_lag_seconds: float = settings.database_replica_max_lag_seconds,
+        interval: float = settings.database_replica_check_interval,
+    ) -> None:
+        super().__init__()
+        self.pool = pool
+        self._max_lag_seconds = max_lag_seconds
+        self._interval = interval
+        self.healthy = False
+        self.lag_seconds: float | None = None
+
+    async def check(self) -> bool:
+        try:
+            async with self.pool.acquire(timeout=self._interval) as conn:
+                lag = await conn.fetchval(_LAG_QUERY, timeout=self._interval)
+        except REPLICA_ERRORS as exc:
+            self.lag_seconds = None
+            self._set_healthy(False, f"unreachable: {exc!r}")
+        else:
+            self.lag_seconds = lag
+            DB_REPLICA_LAG.set(lag)
+            self._set_healthy(
+                lag <= self._max_lag_seconds, f"{lag:.1f}s behind the primary"
+            )
+        return self.healthy
+
+    def mark_down(self, reason: str) -> None:
+        """Stop routing to the replica until the next successful check."""
+        self._set_healthy(False, reason)
+
+    def _set_healthy(self, healthy: bool, reason: str) -> None:
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Routing reads to the replica again (%s)", reason)
+            else:
+                logger.warning("Routing reads to the primary: replica %s", reason)
+        self.healthy = healthy
+        DB_REPLICA_HEALTHY.set(1 if healthy else 0)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self._interval)
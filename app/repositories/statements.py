@@ -0,0 +1,61 @@
+"""
+Registry of named SQL statements prepared once per pooled connection.
+
+Repositories register their SQL at import time with `register()` and run it
+through the helpers below, which time each call under the statement's name.
+The helpers always send the registered SQL text: asyncpg's per-connection
+statement cache parses and plans it on first use and reuses the server-side
+statement on every later checkout of that connection, so each call only binds
+parameters and executes. The pool's cache must therefore hold at least every
+registered statement (see database.create_pool).
+"""
+
+import time
+
+from asyncpg import Connection, Record
+
+from app.metrics import DB_QUERY_DURATION
+
+_STATEMENTS: dict[str, str] = {}
+
+
+def register(name: str, sql: str) -> str:
+    """Add a statement to the registry and return its name."""
+    if name in _STATEMENTS and _STATEMENTS[name] != sql:
+        raise ValueError(f"Statement {name!r} is already registered")
+    _STATEMENTS[name] = sql
+    return name
+
+
+def registered_count() -> int:
+    """Return how many statements the repositories have registered."""
+    return len(_STATEMENTS)
+
+
+async def fetch(conn: Connection, name: str, *args) -> list[Record]:
+    started = time.perf_counter()
+    result = await conn.fetch(_STATEMENTS[name], *args)
+    DB_QUERY_DURATION.observe(time.perf_counter() - started, name)
+    return result
+
+
+async def fetchrow(conn: Connection, name: str, *args) -> Record | None:
+    started = time.perf_counter()
+    result = await conn.fetchrow(_STATEMENTS[name], *args)
+    DB_QUERY_DURATION.observe(time.perf_counter() - started, name)
+    return result
+
+
+async def fetchval(conn: Connection, name: str, *args):
+    started = time.perf_counter()
+    result = await conn.fetchval(_STATEMENTS[name], *args)
+    DB_QUERY_DURATION.observe(time.perf_counter() - started, name)
+    return result
+
+
+async def execute(conn: Connection, name: str, *args) -> str:
+    """Run a statement and return its command status (e.g. "DELETE 3")."""
+    started = time.perf_counter()
+    status = await conn.execute(_STATEMENTS[name], *args)
+    DB_QUERY_DURATION.observe(time.perf_counter() - started, name)
+    return status
@@ -0,0 +1,118 @@
+"""
+Short-lived connection scopes for services.
+
+Services used to receive one pooled connection for the whole request, holding
+it through bcrypt and anything else slow. UnitOfWork checks a connection out
+only around each database phase, so with a small pool the number of
+concurrent requests is bounded by time spent in SQL, not by request duration.
+
+Every acquisition is timed. Time spent waiting for a free connection is the
+earliest sign of pool saturation, well before acquires start timing out.
+
+When a read replica is configured, `read_connection()` serves lookups that
+tolerate replication lag from it, falling back to the primary while the
+replica is unhealthy or unreachable.
+"""
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import asyncpg
+from asyncpg import Connection
+
+from app.config import settings
+from app.metrics import DB_POOL_WAIT
+from app.repositories.replica import REPLICA_ERRORS, ReplicaMonitor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolWaitStats:
+    acquisitions: int = 0
+    waiting: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    slow_acquisitions: int = 0
+
+    def record(self, wait: float, slow: bool) -> None:
+        self.acquisitions += 1
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        if slow:
+            self.slow_acquisitions += 1
+
+
+class UnitOfWork:
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        slow_wait_seconds: float = settings.database_pool_slow_wait_seconds,
+        replica: ReplicaMonitor | None = None,
+    ) -> None:
+        self.pool = pool
+        self.replica = replica
+        self._slow_wait_seconds = slow_wait_seconds
+        self.stats = PoolWaitStats()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Connection]:
+        """Check out a primary connection for one database phase."""
+        conn = await self._acquire(self.pool)
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+
+    @asynccontextmanager
+    async def read_connection(self) -> AsyncIterator[Connection]:
+        """Check out a connection for a read that tolerates replication lag.
+
+        Uses the replica when one is configured and healthy, the primary
+        otherwise. Anything whose result decides a write must use
+        connection() or transaction() instead.
+        """
+        replica = self.replica
+        pool = self.pool
+        if replica is not None and replica.healthy:
+            try:
+                conn = await self._acquire(replica.pool)
+                pool = replica.pool
+            except REPLICA_ERRORS as exc:
+                replica.mark_down(f"unreachable: {exc!r}")
+                conn = await self._acquire(self.pool)
+        else:
+            conn = await self._acquire(self.pool)
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Connection]:
+        """Check out a primary connection and run the block in one transaction."""
+        async with self.connection() as conn, conn.transaction():
+            yield conn
+
+    async def _acquire(self, pool: asyncpg.Pool) -> Connection:
+        self.stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            conn = await pool.acquire()
+        finally:
+            self.stats.waiting -= 1
+        wait = time.perf_counter() - started
+        slow = wait > self._slow_wait_seconds
+        self.stats.record(wait, slow)
+        DB_POOL_WAIT.observe(wait)
+        if slow:
+            logger.warning(
+                "Waited %.0f ms for a database connection (%d in use of %d)",
+                wait * 1000,
+                pool.get_size() - pool.get_idle_size(),
+                pool.get_max_size(),
+            )
+        return conn
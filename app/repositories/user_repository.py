@@ -1,7 +1,158 @@
+from datetime import datetime
+from typing import AsyncIterator
 from uuid import UUID
 
 from asyncpg import Connection, Record
 
+from app.repositories import statements
+
+_CREATE = statements.register(
+    "users.create",
+    """
+    INSERT INTO users (email, password_hash)
+    VALUES ($1, $2)
+    RETURNING id, email, is_active, created_at
+    """,
+)
+
+_GET_BY_EMAIL = statements.register(
+    "users.get_by_email",
+    "SELECT id, email, password_hash, is_active FROM users WHERE email = $1",
+)
+
+_LOCK = statements.register(
+    "users.lock",
+    "SELECT is_active FROM users WHERE id = $1 FOR UPDATE",
+)
+
+_REPLACE_PASSWORD_HASH = statements.register(
+    "users.replace_password_hash",
+    "UPDATE users SET password_hash = $3 WHERE id = $1 AND password_hash = $2",
+)
+
+_EXISTING_EMAILS = statements.register(
+    "users.existing_emails",
+    "SELECT email FROM users WHERE email = ANY($1::text[])",
+)
+
+# Streamed through a server-side cursor, which needs SQL text.
+_ALL_EMAILS = "SELECT email, created_at FROM users"
+_EMAILS_SINCE = "SELECT email, created_at FROM users WHERE created_at >= $1"
+
+# Users with the state of their latest activation code, in keyset order.
+# Predicates are appended by export_cursor, so each filter combination gets
+# its own plan instead of one generic plan full of "$n IS NULL OR ..." tests.
+_EXPORT = """
+    SELECT
+        u.id, u.email, u.is_active, u.created_at, u.updated_at,
+        CASE
+            WHEN ac.used_at IS NOT NULL THEN 'used'
+            WHEN ac.expires_at > NOW() THEN 'pending'
+            WHEN ac.expires_at IS NOT NULL THEN 'expired'
+            ELSE 'none'
+        END AS code_status,
+        ac.created_at AS code_created_at,
+        ac.expires_at AS code_expires_at,
+        ac.used_at AS code_used_at
+    FROM users u
+    LEFT JOIN LATERAL (
+        SELECT created_at, expires_at, used_at
+        FROM activation_codes
+        WHERE user_id = u.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) ac ON TRUE
+    WHERE {where}
+    ORDER BY u.created_at, u.id
+"""
+
+EXPORT_COLUMNS = (
+    "id",
+    "email",
+    "is_active",
+    "created_at",
+    "updated_at",
+    "code_status",
+    "code_created_at",
+    "code_expires_at",
+    "code_used_at",
+)
+
+# Bulk inserts go through a per-connection temp table loaded with COPY. The
+# table does not exist when the pool prepares statements, so these two are
+# sent as plain SQL rather than registered.
+_CREATE_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS users_staging (
+        email         VARCHAR(254) NOT NULL,
+        password_hash TEXT         NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+_INSERT_FROM_STAGING = """
+    INSERT INTO users (email, password_hash)
+    SELECT email, password_hash FROM users_staging
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id, email, is_active, created_at
+"""
+
+_ACTIVATE_WITH_CODE = statements.register(
+    "users.activate_with_code",
+    """
+    WITH target AS (
+        SELECT id, is_active
+        FROM users
+        WHERE id = $1
+        FOR UPDATE
+    ),
+    valid_code AS (
+        SELECT ac.id
+        FROM activation_codes ac
+        JOIN target t ON t.id = ac.user_id
+        WHERE NOT t.is_active
+          AND ac.code       = $2
+          AND ac.expires_at > NOW()
+          AND ac.used_at   IS NULL
+        ORDER BY ac.created_at DESC
+        LIMIT 1
+        FOR UPDATE OF ac
+    ),
+    used_code AS (
+        UPDATE activation_codes
+        SET used_at = NOW()
+        WHERE id = (SELECT id FROM valid_code)
+        RETURNING user_id
+    ),
+    activated AS (
+        UPDATE users
+        SET is_active = TRUE, updated_at = NOW()
+        WHERE id = (SELECT user_id FROM used_code)
+        RETURNING id
+    )
+    SELECT
+        EXISTS (SELECT 1 FROM target)                   AS user_found,
+        COALESCE((SELECT is_active FROM target), FALSE) AS already_active,
+        EXISTS (SELECT 1 FROM activated)                AS code_valid
+    """,
+)
+
+
+# Activation without a code: the row is only flipped while still inactive,
+# which makes the (stateless) token single use.
+_ACTIVATE = statements.register(
+    "users.activate",
+    """
+    WITH activated AS (
+        UPDATE users
+        SET is_active = TRUE, updated_at = NOW()
+        WHERE id = $1 AND NOT is_active
+        RETURNING id
+    )
+    SELECT
+        EXISTS (SELECT 1 FROM users WHERE id = $1) AS user_found,
+        EXISTS (SELECT 1 FROM activated)           AS activated
+    """,
+)
+
 
 class UserRepository:
     def __init__(self, conn: Connection) -> None:
@@ -13,30 +164,116 @@ class UserRepository:
         Raises asyncpg.UniqueViolationError if the email already exists.
         The caller is responsible for mapping this to a domain exception.
         """
-        record = await self._conn.fetchrow(
-            """
-            INSERT INTO users (email, password_hash)
-            VALUES ($1, $2)
-            RETURNING id, email, is_active, created_at
-            """,
-            email,
-            password_hash,
+        record = await statements.fetchrow(
+            self._conn, _CREATE, email, password_hash
         )
         assert record
         return record
 
+    async def create_many(self, users: list[tuple[str, str]]) -> list[Record]:
+        """Insert (email, password_hash) pairs and return the created records.
+
+        Rows are streamed into a temp staging table with COPY and inserted in
+        one statement; emails that already exist are skipped rather than
+        failing the batch, so callers diff the result against their input.
+        Must run inside a transaction: the staging rows are cleared on commit.
+        """
+        await self._conn.execute(_CREATE_STAGING)
+        await self._conn.copy_records_to_table(
+            "users_staging", records=users, columns=["email", "password_hash"]
+        )
+        return await self._conn.fetch(_INSERT_FROM_STAGING)
+
+    async def existing_emails(self, emails: list[str]) -> set[str]:
+        records = await statements.fetch(self._conn, _EXISTING_EMAILS, emails)
+        return {record["email"] for record in records}
+
+    def iter_emails_since(self, since: datetime | None) -> AsyncIterator[Record]:
+        """Stream (email, created_at) of users created at or after `since`
+        (all users when None). Must run inside a transaction."""
+        if since is None:
+            return self._conn.cursor(_ALL_EMAILS, prefetch=10_000)
+        return self._conn.cursor(_EMAILS_SINCE, since, prefetch=10_000)
+
+    def export_cursor(
+        self,
+        *,
+        is_active: bool | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        after: tuple[datetime, UUID] | None = None,
+        limit: int | None = None,
+        prefetch: int = 1_000,
+    ) -> AsyncIterator[Record]:
+        """Stream users (EXPORT_COLUMNS) ordered by (created_at, id).
+
+        `after` is the (created_at, id) of the last row already received, so
+        an interrupted export resumes where it stopped with an index range
+        scan instead of an OFFSET. Must run inside a transaction.
+        """
+        predicates = ["TRUE"]
+        args: list = []
+
+        def arg(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        if is_active is not None:
+            predicates.append(f"u.is_active = {arg(is_active)}")
+        if created_from is not None:
+            predicates.append(f"u.created_at >= {arg(created_from)}")
+        if created_to is not None:
+            predicates.append(f"u.created_at < {arg(created_to)}")
+        if after is not None:
+            predicates.append(
+                f"(u.created_at, u.id) > ({arg(after[0])}, {arg(after[1])})"
+            )
+        sql = _EXPORT.format(where=" AND ".join(predicates))
+        if limit is not None:
+            sql += f" LIMIT {arg(limit)}"
+        return self._conn.cursor(sql, *args, prefetch=prefetch)
+
     async def get_by_email(self, email: str) -> Record | None:
-        return await self._conn.fetchrow(
-            "SELECT id, email, password_hash, is_active FROM users WHERE email = $1",
-            email,
+        return await statements.fetchrow(self._conn, _GET_BY_EMAIL, email)
+
+    async def lock(self, user_id: UUID) -> bool | None:
+        """Lock the user row for the rest of the transaction.
+
+        Returns its `is_active`, or None when the user does not exist.
+        """
+        return await statements.fetchval(self._conn, _LOCK, user_id)
+
+    async def replace_password_hash(
+        self, user_id: UUID, old_hash: str, new_hash: str
+    ) -> bool:
+        """Swap in `new_hash` only if the stored hash is still `old_hash`.
+
+        Returns whether the row was updated.
+        """
+        status = await statements.execute(
+            self._conn, _REPLACE_PASSWORD_HASH, user_id, old_hash, new_hash
         )
+        return status == "UPDATE 1"
+
+    async def activate(self, user_id: UUID) -> Record:
+        """Activate the user if it is still inactive.
+
+        The record has `user_found` and `activated` (false when the user was
+        already active, including when a concurrent call won).
+        """
+        return await statements.fetchrow(self._conn, _ACTIVATE, user_id)
 
-    async def activate(self, user_id: UUID) -> None:
-        await self._conn.execute(
-            """
-            UPDATE users
-            SET is_active = TRUE, updated_at = NOW()
-            WHERE id = $1
-            """,
-            user_id,
+    async def activate_with_code(self, user_id: UUID, code: str) -> Record:
+        """Consume `code` and activate the user in a single round trip.
+
+        One data-modifying CTE locks the user row, picks the latest unused,
+        non-expired matching code, marks it used and flips `is_active`. The
+        returned record has three booleans the caller maps to domain errors:
+        `user_found`, `already_active` and `code_valid` (the code was
+        consumed and the user activated).
+        """
+        record = await statements.fetchrow(
+            self._conn, _ACTIVATE_WITH_CODE, user_id, code
         )
+        assert record
+        return record
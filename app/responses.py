@@ -0,0 +1,51 @@
+"""
+JSON response encoding.
+
+With JSON_RESPONSE_BACKEND=orjson (the default) responses are rendered by
+orjson, which is several times faster than the stdlib encoder and handles
+UUID and datetime natively. Handlers can then return plain dicts built from
+asyncpg records without a pydantic round trip. "stdlib" falls back to
+Starlette's encoder, after jsonable_encoder for the same UUID/datetime
+support.
+"""
+
+import uuid
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+
+def _default(value):
+    # asyncpg returns its own uuid.UUID subclass, which orjson does not
+    # recognise as a UUID.
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class StdlibJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return super().render(jsonable_encoder(content))
+
+
+DefaultJSONResponse: type[JSONResponse] = (
+    ORJSONResponse if settings.json_response_backend == "orjson" else StdlibJSONResponse
+)
+
+
+def json_response(
+    content, status_code: int = 200, headers: dict[str, str] | None = None
+) -> JSONResponse:
+    return DefaultJSONResponse(content, status_code=status_code, headers=headers)
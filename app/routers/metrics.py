@@ -0,0 +1,30 @@
+import asyncpg
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.dependencies import get_pool, get_unit_of_work
+from app.metrics import DB_POOL_CONNECTIONS, REGISTRY
+from app.repositories.unit_of_work import UnitOfWork
+
+router = APIRouter()
+
+
+@router.get(
+    "",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    include_in_schema=False,
+)
+async def metrics(
+    pool: asyncpg.Pool = Depends(get_pool),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> PlainTextResponse:
+    # Pool gauges are sampled here rather than kept up to date on every
+    # checkout: nothing reads them between scrapes.
+    DB_POOL_CONNECTIONS.set(pool.get_size(), "open")
+    DB_POOL_CONNECTIONS.set(pool.get_idle_size(), "idle")
+    DB_POOL_CONNECTIONS.set(pool.get_max_size(), "max")
+    DB_POOL_CONNECTIONS.set(uow.stats.waiting, "waiting")
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
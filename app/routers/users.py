@@ -1,21 +1,142 @@
-import asyncpg
-from fastapi import APIRouter, Depends, status
+from typing import Annotated
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    Path,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from pydantic import EmailStr, ValidationError
 
-from app.dependencies import get_db, get_http_client
-from app.schemas.user import ActivateRequest, MessageResponse, UserCreate, UserResponse
-from app.services.email_service import EmailService
+from app.config import settings
+from app.dependencies import (
+    get_activation_tokens,
+    get_credential_cache,
+    get_email_filter,
+    get_export_service,
+    get_password_hasher,
+    get_password_rehasher,
+    get_rate_limiter,
+    get_request_coalescer,
+    get_unit_of_work,
+    require_admin_token,
+)
+from app.repositories.unit_of_work import UnitOfWork
+from app.responses import json_response
+from app.schemas.user import (
+    ActivateRequest,
+    BulkUserCreate,
+    BulkUserResponse,
+    BulkUserResult,
+    EmailAvailability,
+    MessageResponse,
+    UserCreate,
+    UserExportQuery,
+    UserResponse,
+    user_payload,
+)
+from app.services.activation_tokens import ActivationTokenSigner
+from app.services.credential_cache import VerifiedCredentialCache
+from app.services.email_filter import RegisteredEmailFilter
+from app.services.export_service import MEDIA_TYPES, ExportService
+from app.services.idempotency import RequestCoalescer
+from app.services.password_hasher import PasswordHasher
+from app.services.password_rehasher import PasswordRehasher
+from app.services.rate_limiter import RateLimit, RateLimiter
 from app.services.user_service import UserService
 
 router = APIRouter()
 security = HTTPBasic()
 
+_ACTIVATE_PER_IP = RateLimit(
+    settings.rate_limit_activate_ip_capacity,
+    settings.rate_limit_activate_ip_per_second,
+)
+_ACTIVATE_PER_EMAIL = RateLimit(
+    settings.rate_limit_activate_email_capacity,
+    settings.rate_limit_activate_email_per_second,
+)
+
+
+def _resend_link_limit(cooldown_seconds: float) -> RateLimit | None:
+    """One link resend per email per cooldown; None when there is no cooldown."""
+    if cooldown_seconds <= 0:
+        return None
+    return RateLimit(1, 1 / cooldown_seconds)
+
+
+# Link resends have no code row to carry the cooldown.
+_RESEND_LINK_PER_EMAIL = _resend_link_limit(
+    settings.activation_resend_cooldown_seconds
+)
+
 
 def get_user_service(
-    conn: asyncpg.Connection = Depends(get_db),
-    http_client=Depends(get_http_client),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+    password_hasher: PasswordHasher = Depends(get_password_hasher),
+    credential_cache: VerifiedCredentialCache | None = Depends(get_credential_cache),
+    email_filter: RegisteredEmailFilter | None = Depends(get_email_filter),
+    coalescer: RequestCoalescer = Depends(get_request_coalescer),
+    rehasher: PasswordRehasher = Depends(get_password_rehasher),
+    activation_tokens: ActivationTokenSigner | None = Depends(
+        get_activation_tokens
+    ),
 ) -> UserService:
-    return UserService(conn, EmailService())
+    return UserService(
+        uow,
+        password_hasher,
+        credential_cache,
+        email_filter,
+        coalescer,
+        rehasher,
+        activation_tokens,
+        settings.activation_mode,
+    )
+
+
+@router.get(
+    "/availability",
+    response_model=EmailAvailability,
+    summary="Check whether an email can still be registered",
+)
+async def check_email_availability(
+    email: EmailStr = Query(),
+    service: UserService = Depends(get_user_service),
+) -> EmailAvailability:
+    return EmailAvailability(
+        email=email, available=await service.is_email_available(email)
+    )
+
+
+@router.get(
+    "/export",
+    summary="Stream all users with their activation state (admin)",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media: {} for media in MEDIA_TYPES.values()}}},
+    dependencies=[Depends(require_admin_token)],
+)
+async def export_users(
+    query: Annotated[UserExportQuery, Query()],
+    exporter: ExportService = Depends(get_export_service),
+) -> StreamingResponse:
+    after = None
+    if query.after_created_at is not None and query.after_id is not None:
+        after = (query.after_created_at, query.after_id)
+    body = exporter.stream(
+        query.format,
+        is_active=query.is_active,
+        created_from=query.created_from,
+        created_to=query.created_to,
+        after=after,
+        limit=query.limit,
+    )
+    return StreamingResponse(body, media_type=MEDIA_TYPES[query.format])
 
 
 @router.post(
@@ -27,9 +148,117 @@ def get_user_service(
 async def register_user(
     body: UserCreate,
     service: UserService = Depends(get_user_service),
-) -> UserResponse:
-    user = await service.register(body.email, body.password)
-    return UserResponse(id=user["id"], email=user["email"], is_active=user["is_active"])
+    idempotency_key: str | None = Header(
+        default=None, min_length=1, max_length=settings.idempotency_key_max_length
+    ),
+) -> Response:
+    # Returning a Response skips response_model validation; the schema still
+    # documents the body.
+    if idempotency_key is None:
+        user = await service.register(body.email, body.password)
+        return json_response(user_payload(user), status_code=status.HTTP_201_CREATED)
+
+    payload, replayed = await service.register_idempotent(
+        idempotency_key, body.email, body.password
+    )
+    return json_response(
+        payload,
+        status_code=status.HTTP_201_CREATED,
+        headers={"Idempotent-Replayed": "true"} if replayed else None,
+    )
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkUserResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Register many users, reporting the outcome of each row",
+)
+async def register_users_bulk(
+    body: BulkUserCreate,
+    service: UserService = Depends(get_user_service),
+) -> BulkUserResponse:
+    results: list[BulkUserResult] = []
+    valid: list[tuple[int, UserCreate]] = []
+    for index, row in enumerate(body.users):
+        try:
+            valid.append((index, UserCreate.model_validate(row)))
+        except ValidationError as exc:
+            email = row.get("email")
+            results.append(
+                BulkUserResult(
+                    index=index,
+                    email=email if isinstance(email, str) else None,
+                    status="invalid",
+                    errors=[error["msg"] for error in exc.errors()],
+                )
+            )
+
+    users = await service.register_many(
+        [(user.email, user.password) for _, user in valid]
+    )
+    for (index, row), user in zip(valid, users):
+        if user is None:
+            results.append(
+                BulkUserResult(index=index, email=row.email, status="duplicate")
+            )
+        else:
+            results.append(
+                BulkUserResult(
+                    index=index, email=row.email, status="created", id=user["id"]
+                )
+            )
+
+    results.sort(key=lambda result: result.index)
+    return BulkUserResponse(
+        created=sum(result.status == "created" for result in results),
+        results=results,
+    )
+
+
+async def throttle_activation(
+    request: Request,
+    credentials: HTTPBasicCredentials = Depends(security),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+) -> None:
+    """Charge the attempt to the client IP and the target email before any
+    bcrypt or SQL work happens."""
+    client_ip = request.client.host if request.client else "unknown"
+    await limiter.check("activate-ip", client_ip, _ACTIVATE_PER_IP)
+    await limiter.check(
+        "activate-email", credentials.username.lower(), _ACTIVATE_PER_EMAIL
+    )
+
+
+async def throttle_resend(
+    request: Request,
+    credentials: HTTPBasicCredentials = Depends(security),
+    limiter: RateLimiter = Depends(get_rate_limiter),
+) -> None:
+    """Charge the resend to the client IP before bcrypt runs. The per-user
+    limit is the cooldown enforced by the service, or in token mode a
+    per-email bucket holding one resend per cooldown."""
+    client_ip = request.client.host if request.client else "unknown"
+    await limiter.check("resend-ip", client_ip, _ACTIVATE_PER_IP)
+    if settings.activation_mode == "token" and _RESEND_LINK_PER_EMAIL is not None:
+        await limiter.check(
+            "resend-email", credentials.username.lower(), _RESEND_LINK_PER_EMAIL
+        )
+
+
+@router.post(
+    "/activate/resend",
+    response_model=MessageResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Email the activation code again (Basic Auth)",
+    dependencies=[Depends(throttle_resend)],
+)
+async def resend_activation_code(
+    credentials: HTTPBasicCredentials = Depends(security),
+    service: UserService = Depends(get_user_service),
+) -> MessageResponse:
+    await service.resend_activation_code(credentials)
+    return MessageResponse(message="Activation code sent")
 
 
 @router.post(
@@ -37,13 +266,27 @@ async def register_user(
     response_model=MessageResponse,
     status_code=status.HTTP_200_OK,
     summary="Activate account using Basic Auth + 4-digit code",
+    dependencies=[Depends(throttle_activation)],
 )
 async def activate_user(
     body: ActivateRequest,
     credentials: HTTPBasicCredentials = Depends(security),
-    conn: asyncpg.Connection = Depends(get_db),
     service: UserService = Depends(get_user_service),
 ) -> MessageResponse:
-    async with conn.transaction():
-        await service.activate(credentials, body.code)
+    # No explicit transaction: the final step is a single atomic statement.
+    await service.activate(credentials, body.code)
+    return MessageResponse(message="Account activated successfully")
+
+
+@router.get(
+    "/activate/{token}",
+    response_model=MessageResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Activate account from an emailed link",
+)
+async def activate_user_with_link(
+    token: str = Path(max_length=128),
+    service: UserService = Depends(get_user_service),
+) -> MessageResponse:
+    await service.activate_with_token(token)
     return MessageResponse(message="Account activated successfully")
@@ -1,6 +1,18 @@
+from datetime import datetime
+from typing import Any, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
+from asyncpg import Record
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    field_validator,
+    model_validator,
+)
+
+from app.config import settings
 
 
 class UserCreate(BaseModel):
@@ -32,6 +44,59 @@ class UserResponse(BaseModel):
     is_active: bool
 
 
+def user_payload(record: Record) -> dict[str, Any]:
+    """UserResponse fields taken straight from a users row.
+
+    Skips building and re-validating a UserResponse: the row already has
+    the declared types, and the response class encodes UUIDs itself.
+    """
+    return {field: record[field] for field in UserResponse.model_fields}
+
+
+class EmailAvailability(BaseModel):
+    email: str
+    available: bool
+
+
+class BulkUserCreate(BaseModel):
+    # Rows are validated one by one so a bad row is reported, not fatal.
+    users: list[dict[str, Any]] = Field(
+        min_length=1, max_length=settings.bulk_register_max_rows
+    )
+
+
+class BulkUserResult(BaseModel):
+    index: int
+    email: str | None
+    status: Literal["created", "duplicate", "invalid"]
+    id: UUID | None = None
+    errors: list[str] | None = None
+
+
+class BulkUserResponse(BaseModel):
+    created: int
+    results: list[BulkUserResult]
+
+
+class UserExportQuery(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    format: Literal["ndjson", "csv"] = "ndjson"
+    is_active: bool | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    # Keyset cursor: created_at and id of the last row already received.
+    after_created_at: datetime | None = None
+    after_id: UUID | None = None
+    limit: int | None = Field(default=None, ge=1)
+
+    @model_validator(mode="after")
+    def cursor_is_complete(self) -> "UserExportQuery":
+        if (self.after_created_at is None) != (self.after_id is None):
+            raise ValueError("after_created_at and after_id must be given together")
+        return self
+
+
 class ActivateRequest(BaseModel):
     code: str
 
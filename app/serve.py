@@ -0,0 +1,293 @@
+"""
+Production entry point: uvicorn with one worker process per available CPU.
+
+    uv run python -m app.serve
+
+Everything comes from Settings (SERVE_*): worker count, uvloop and
+httptools, listen backlog and keep-alive. Each worker is a fresh interpreter
+with its own event loop, pools and hasher threads, so the shares computed
+here reach them through the environment:
+
+- DATABASE_POOL_MAX_SIZE is DATABASE_CONNECTION_BUDGET divided by the worker
+  count (never more than configured), so the workers' pools together stay
+  within the budget. A worker that migrates at startup also opens one
+  connection of its own, which its share leaves room for.
+- PASSWORD_HASHER_WORKERS, unless set, is the CPUs divided by the worker
+  count, so bcrypt threads do not oversubscribe the cores.
+
+With SERVE_REUSE_PORT every worker listens on its own SO_REUSEPORT socket
+and the kernel spreads connections across them evenly; otherwise they share
+one socket. The port is checked before any worker starts. A worker that dies
+after it started serving is restarted, with a growing delay if it keeps
+crashing; one that dies before it started means every worker would, so the
+whole server exits. SIGTERM and SIGINT are passed on to the workers, which
+finish in-flight requests and drain before exiting.
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing.synchronize import Event
+
+import asyncpg
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger("app.serve")
+
+# uvicorn's exit status for a worker whose lifespan startup failed.
+_STARTUP_FAILURE = 3
+_SUPERVISE_INTERVAL = 0.5
+# Restart delay after a crash doubles up to the maximum, and starts over once
+# a worker has stayed up for the reset period.
+_RESTART_DELAY_MAX = 30.0
+_RESTART_DELAY_RESET = 60.0
+
+
+@dataclass(frozen=True)
+class WorkerPlan:
+    workers: int
+    pool_max_size: int
+    hasher_workers: int
+
+    def environment(self) -> dict[str, str]:
+        env = {"DATABASE_POOL_MAX_SIZE": str(self.pool_max_size)}
+        if settings.password_hasher_workers is None:
+            env["PASSWORD_HASHER_WORKERS"] = str(self.hasher_workers)
+        return env
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on: its affinity mask, capped by a cgroup
+    v2 CPU quota (a container's --cpus) when there is one."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        return cpus
+    if quota == "max":
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+def plan_workers(
+    cpus: int,
+    connection_budget: int,
+    workers: int | None = settings.serve_workers,
+    pool_max_size: int = settings.database_pool_max_size,
+) -> WorkerPlan:
+    workers = workers or cpus
+    # The startup migration check opens a connection outside the pool.
+    reserved = 1 if settings.database_run_migrations_on_startup else 0
+    share = connection_budget // workers - reserved
+    if share < 1:
+        raise SystemExit(
+            f"{workers} workers need at least {workers * (reserved + 1)} "
+            f"database connections, but the budget is {connection_budget}: "
+            "lower SERVE_WORKERS or raise DATABASE_CONNECTION_BUDGET"
+        )
+    return WorkerPlan(
+        workers=workers,
+        pool_max_size=min(pool_max_size, share),
+        hasher_workers=max(1, cpus // workers),
+    )
+
+
+async def server_connection_budget(dsn: str = settings.database_url) -> int:
+    """max_connections minus the slots Postgres keeps for superusers and
+    reserved roles."""
+    conn = await asyncpg.connect(dsn)
+    try:
+        return await conn.fetchval(
+            """
+            SELECT current_setting('max_connections')::int
+                 - current_setting('superuser_reserved_connections')::int
+                 - COALESCE(
+                       current_setting('reserved_connections', true)::int, 0
+                   )
+            """
+        )
+    finally:
+        await conn.close()
+
+
+def _bind(reuse_port: bool, listen: bool = True) -> socket.socket:
+    host = settings.serve_host
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, settings.serve_port))
+        if listen:
+            sock.listen(settings.serve_backlog)
+    except OSError:
+        sock.close()
+        raise
+    sock.set_inheritable(True)
+    return sock
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that tells the supervisor once it is serving."""
+
+    def __init__(self, config: uvicorn.Config, started: Event) -> None:
+        super().__init__(config)
+        self._started_event = started
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets)
+        if self.started:
+            self._started_event.set()
+
+
+def _run_worker(shared: socket.socket | None, started: Event) -> None:
+    """Body of a worker process; `shared` is None with SO_REUSEPORT."""
+    config = uvicorn.Config(
+        "app.main:app",
+        host=settings.serve_host,
+        port=settings.serve_port,
+        loop=settings.serve_loop,
+        http=settings.serve_http,
+        backlog=settings.serve_backlog,
+        timeout_keep_alive=settings.serve_keep_alive_seconds,
+        timeout_graceful_shutdown=settings.serve_graceful_shutdown_seconds,
+    )
+    server = _WorkerServer(config, started)
+    server.run(sockets=[shared or _bind(reuse_port=True)])
+    if not server.started:
+        sys.exit(_STARTUP_FAILURE)
+
+
+class _Slot:
+    """One worker position: the process in it and its restart history."""
+
+    def __init__(self, context: multiprocessing.context.SpawnContext) -> None:
+        self._context = context
+        self.process: multiprocessing.process.BaseProcess | None = None
+        self.started: Event | None = None
+        self.started_at = 0.0
+        self.crashes = 0
+        self.restart_at = 0.0
+
+    def start(self, shared: socket.socket | None) -> None:
+        self.started = self._context.Event()
+        self.process = self._context.Process(
+            target=_run_worker, args=(shared, self.started)
+        )
+        self.process.start()
+        self.started_at = time.monotonic()
+
+    def schedule_restart(self) -> float:
+        """Record a crash of a worker that had started; return the delay."""
+        now = time.monotonic()
+        if now - self.started_at >= _RESTART_DELAY_RESET:
+            self.crashes = 0
+        delay = min(_SUPERVISE_INTERVAL * 2**self.crashes, _RESTART_DELAY_MAX)
+        self.crashes += 1
+        self.restart_at = now + delay
+        self.process = None
+        return delay
+
+
+def serve() -> int:
+    budget = settings.database_connection_budget
+    if budget is None:
+        budget = asyncio.run(server_connection_budget())
+    plan = plan_workers(available_cpus(), budget)
+    # Workers are spawned, so they read their settings from this environment.
+    os.environ.update(plan.environment())
+
+    # Fail here, once, rather than in every worker. With SO_REUSEPORT the
+    # probe is never listened on, so it cannot take connections.
+    reuse_port = settings.serve_reuse_port
+    try:
+        shared: socket.socket | None = _bind(reuse_port, listen=not reuse_port)
+    except OSError as exc:
+        raise SystemExit(
+            f"Cannot listen on {settings.serve_host}:{settings.serve_port}: {exc}"
+        ) from exc
+    if reuse_port:
+        shared.close()
+        shared = None
+
+    logger.info(
+        "Starting %d workers on %s:%d (pool max %d, hasher threads %d each)",
+        plan.workers,
+        settings.serve_host,
+        settings.serve_port,
+        plan.pool_max_size,
+        plan.hasher_workers,
+    )
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def stop(signum: int, frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    slots = [_Slot(context) for _ in range(plan.workers)]
+    for slot in slots:
+        slot.start(shared)
+    status = 0
+    while not stopping:
+        for slot in slots:
+            process = slot.process
+            if process is None:
+                if time.monotonic() >= slot.restart_at:
+                    slot.start(shared)
+                continue
+            if process.is_alive():
+                continue
+            if slot.started is None or not slot.started.is_set():
+                logger.error(
+                    "Worker %d exited with %s before it started serving; stopping",
+                    process.pid,
+                    process.exitcode,
+                )
+                stopping, status = True, 1
+                break
+            delay = slot.schedule_restart()
+            logger.warning(
+                "Worker %d exited with %s; restarting in %.1f s",
+                process.pid,
+                process.exitcode,
+                delay,
+            )
+        time.sleep(_SUPERVISE_INTERVAL)
+
+    processes = [slot.process for slot in slots if slot.process is not None]
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + (
+        settings.serve_graceful_shutdown_seconds + settings.shutdown_drain_timeout
+    )
+    for process in processes:
+        process.join(max(deadline - time.monotonic(), 0))
+        if process.is_alive():
+            logger.warning("Worker %d did not stop in time; killing", process.pid)
+            process.kill()
+            process.join()
+    return status
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    sys.exit(serve())
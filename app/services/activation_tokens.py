@@ -0,0 +1,84 @@
+"""
+Signed, expiring activation tokens for magic-link activation.
+
+With ACTIVATION_MODE=token, registration emails a link carrying a token
+instead of storing a 4-digit code. The token is the user id and an expiry
+time, authenticated with an HMAC under ACTIVATION_TOKEN_SECRET. Checking it
+needs no database read, so activation skips the activation_codes table.
+It is single use because activation only flips users that are still
+inactive. The secret must be the same on every instance; rotating it
+invalidates every link still outstanding.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import time
+from uuid import UUID
+
+from app.config import settings
+
+# Part of every MAC, so nothing else ever signed with the same secret can
+# pass for an activation token.
+_PURPOSE = b"user-activation:v1\0"
+_MAC_BYTES = 16
+_EXPIRY = struct.Struct(">Q")
+_TOKEN_BYTES = 16 + _EXPIRY.size + _MAC_BYTES
+
+
+class ActivationTokenSigner:
+    def __init__(
+        self,
+        secret: str,
+        ttl_seconds: float = settings.activation_token_ttl_seconds,
+    ) -> None:
+        self._key = secret.encode()
+        self._ttl = ttl_seconds
+
+    @classmethod
+    def from_settings(cls) -> "ActivationTokenSigner | None":
+        """The signer for ACTIVATION_TOKEN_SECRET, or None without one.
+
+        Token mode cannot work without a secret, so that is refused here
+        rather than on the first registration.
+        """
+        if settings.activation_token_secret is None:
+            if settings.activation_mode == "token":
+                raise RuntimeError(
+                    "ACTIVATION_MODE=token needs ACTIVATION_TOKEN_SECRET"
+                )
+            return None
+        return cls(settings.activation_token_secret)
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._ttl
+
+    def _mac(self, body: bytes) -> bytes:
+        return hmac.new(self._key, _PURPOSE + body, hashlib.sha256).digest()[
+            :_MAC_BYTES
+        ]
+
+    def issue(self, user_id: UUID, now: float | None = None) -> str:
+        expires = int((time.time() if now is None else now) + self._ttl)
+        body = user_id.bytes + _EXPIRY.pack(expires)
+        token = base64.urlsafe_b64encode(body + self._mac(body))
+        return token.rstrip(b"=").decode()
+
+    def verify(self, token: str, now: float | None = None) -> UUID | None:
+        """Return the user id of a genuine, unexpired token, else None."""
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except (binascii.Error, ValueError):
+            return None
+        if len(raw) != _TOKEN_BYTES:
+            return None
+        body, mac = raw[:-_MAC_BYTES], raw[-_MAC_BYTES:]
+        if not hmac.compare_digest(mac, self._mac(body)):
+            return None
+        (expires,) = _EXPIRY.unpack(body[16:])
+        if expires < (time.time() if now is None else now):
+            return None
+        return UUID(bytes=body[:16])
@@ -0,0 +1,28 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+
+class BackgroundTask(ABC):
+    """Base class for loops started in main.lifespan and stopped on shutdown."""
+
+    name = "background-task"
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    @abstractmethod
+    async def _run(self) -> None:
+        """The loop body; runs until cancelled by stop()."""
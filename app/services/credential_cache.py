@@ -0,0 +1,72 @@
+"""
+Short-lived memory of credentials that recently passed bcrypt.
+
+Activation is often retried with the same Basic Auth credentials (a mistyped
+or expired code), and each retry would otherwise pay for a full bcrypt check.
+Successful verifications are remembered for `ttl_seconds` under an HMAC of
+the username, the password and the stored hash. The HMAC key is random per
+process, so entries reveal nothing if memory is dumped and cannot be
+precomputed. Because the stored hash is part of the key, a password change
+invalidates every entry for the old hash without any explicit eviction.
+"""
+
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+from app.metrics import CREDENTIAL_CACHE_LOOKUPS
+
+
+@dataclass
+class CredentialCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class VerifiedCredentialCache:
+    def __init__(
+        self,
+        ttl_seconds: float = settings.credential_cache_ttl_seconds,
+        max_entries: int = settings.credential_cache_max_entries,
+    ) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._secret = os.urandom(32)
+        # key -> monotonic expiry, least recently used first
+        self._entries: OrderedDict[bytes, float] = OrderedDict()
+        self.stats = CredentialCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, username: str, password: str, password_hash: str) -> bytes:
+        message = "\0".join((username, password, password_hash)).encode()
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def is_verified(self, key: bytes) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is not None and expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            CREDENTIAL_CACHE_LOOKUPS.inc("hit")
+            return True
+        if expires_at is not None:
+            del self._entries[key]
+        self.stats.misses += 1
+        CREDENTIAL_CACHE_LOOKUPS.inc("miss")
+        return False
+
+    def remember(self, key: bytes) -> None:
+        self._entries[key] = time.monotonic() + self._ttl_seconds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
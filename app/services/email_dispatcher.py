@@ -0,0 +1,151 @@
+"""
+Background delivery of queued emails.
+
+Request handlers only write rows to `email_outbox` (see OutboxRepository);
+this dispatcher claims due rows in batches, sends them concurrently and
+reschedules failures with exponential backoff. Several dispatchers (one per
+app process) can run against the same table: claims use FOR UPDATE SKIP
+LOCKED, so each message is picked up by a single dispatcher at a time.
+"""
+
+import asyncio
+import logging
+
+import asyncpg
+from asyncpg import Record
+
+from app.config import settings
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.background import BackgroundTask
+from app.services.email_service import EmailService
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDispatcher(BackgroundTask):
+    name = "email-dispatcher"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        email_service: EmailService,
+        batch_size: int = settings.email_dispatcher_batch_size,
+        concurrency: int = settings.email_dispatcher_concurrency,
+        poll_interval: float = settings.email_dispatcher_poll_interval,
+        max_attempts: int = settings.email_dispatcher_max_attempts,
+        lease_seconds: float = settings.email_dispatcher_lease_seconds,
+        backoff_base: float = settings.email_dispatcher_backoff_base,
+        backoff_max: float = settings.email_dispatcher_backoff_max,
+    ) -> None:
+        super().__init__()
+        self._pool = pool
+        self._email_service = email_service
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._poll_interval = poll_interval
+        self._max_attempts = max_attempts
+        self._lease_seconds = lease_seconds
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        # Held by the polling loop while a batch is out, so drain() can stop
+        # it between batches instead of abandoning claimed messages.
+        self._batch_lock = asyncio.Lock()
+
+    async def run_once(self) -> int:
+        """Claim and deliver one batch. Return the number of claimed messages."""
+        async with self._pool.acquire() as conn:
+            outbox = OutboxRepository(conn)
+            abandoned = await outbox.fail_abandoned(self._max_attempts)
+            if abandoned:
+                logger.error(
+                    "Giving up on %d emails whose final attempt never finished",
+                    abandoned,
+                )
+            messages = await outbox.claim_batch(
+                self._batch_size, self._max_attempts, self._lease_seconds
+            )
+        if not messages:
+            return 0
+
+        # Spread the batch over `concurrency` SMTP sessions, each of which
+        # sends its share back to back without reconnecting.
+        chunks = [
+            messages[i :: self._concurrency]
+            for i in range(min(self._concurrency, len(messages)))
+        ]
+        results = await asyncio.gather(*(self._deliver(chunk) for chunk in chunks))
+        delivered = [
+            (message, error)
+            for chunk, errors in zip(chunks, results)
+            for message, error in zip(chunk, errors)
+        ]
+
+        async with self._pool.acquire() as conn:
+            outbox = OutboxRepository(conn)
+            sent = [message["id"] for message, error in delivered if error is None]
+            if sent:
+                await outbox.mark_sent(sent)
+            for message, error in delivered:
+                if error is not None:
+                    await self._reschedule(outbox, message, error)
+        return len(messages)
+
+    async def drain(self, timeout: float) -> int:
+        """Stop polling, then send everything due now; return the count.
+
+        Used on shutdown. Messages waiting out a retry backoff stay queued
+        for the other instances. If the timeout hits mid-batch, the claimed
+        messages are retried by whichever dispatcher sees their lease expire.
+        """
+        drained = 0
+        try:
+            async with asyncio.timeout(max(timeout, 0.0)):
+                async with self._batch_lock:
+                    await self.stop()
+                while claimed := await self.run_once():
+                    drained += claimed
+        except TimeoutError:
+            logger.warning("Email drain timed out after sending %d", drained)
+            await self.stop()
+        return drained
+
+    async def _deliver(self, chunk: list[Record]) -> list[str | None]:
+        """Send a chunk of messages and return an error description for each."""
+        try:
+            errors = await self._email_service.send_many(
+                [(m["recipient"], m["subject"], m["body"]) for m in chunk]
+            )
+        except Exception as exc:
+            logger.exception("Unexpected error sending %d emails", len(chunk))
+            return [repr(exc)] * len(chunk)
+        return [None if error is None else str(error) for error in errors]
+
+    async def _reschedule(
+        self, outbox: OutboxRepository, message: Record, error: str
+    ) -> None:
+        attempts = message["attempts"]
+        if attempts >= self._max_attempts:
+            logger.error(
+                "Giving up on email %s to %s after %d attempts",
+                message["id"],
+                message["recipient"],
+                attempts,
+            )
+            await outbox.mark_dead(message["id"], error)
+            return
+        delay = min(self._backoff_base * 2 ** (attempts - 1), self._backoff_max)
+        await outbox.mark_failed(message["id"], error, delay)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self._batch_lock:
+                    claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email dispatcher iteration failed")
+                claimed = 0
+            # A full batch means more work is probably waiting: loop immediately.
+            if claimed < self._batch_size:
+                await asyncio.sleep(self._poll_interval)
@@ -0,0 +1,116 @@
+"""
+In-process Bloom filter of registered emails.
+
+A negative answer is definite for every user the filter has seen, so most
+availability checks and registrations of new emails need no lookup at all;
+only a positive answer (registered, or a false positive at `error_rate`) is
+confirmed with UserRepository.get_by_email.
+
+The filter is loaded from `users` at startup and updated on every insert
+made by this process. Users created by other workers or instances are
+picked up by a periodic incremental refresh, so for up to
+`refresh_interval` seconds this process may report such an email as
+available. Registration stays correct regardless: the unique constraint is
+the final check.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+from datetime import datetime, timedelta
+
+import asyncpg
+
+from app.config import settings
+from app.metrics import EMAIL_FILTER_CHECKS
+from app.repositories.user_repository import UserRepository
+from app.services.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# created_at is the inserting transaction's start time, so a row can become
+# visible after rows with a later created_at. Each refresh re-reads this much
+# history; re-adding an email is harmless.
+_REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(8, math.ceil(bits))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> list[int]:
+        # Double hashing (Kirsch–Mitzenmacher): k positions from one digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RegisteredEmailFilter(BackgroundTask):
+    name = "email-filter-refresh"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        capacity: int = settings.email_filter_capacity,
+        error_rate: float = settings.email_filter_error_rate,
+        refresh_interval: float = settings.email_filter_refresh_interval,
+    ) -> None:
+        super().__init__()
+        self._pool = pool
+        self._capacity = capacity
+        self._refresh_interval = refresh_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._watermark: datetime | None = None
+
+    def might_contain(self, email: str) -> bool:
+        found = email in self._bloom
+        EMAIL_FILTER_CHECKS.inc("positive" if found else "negative")
+        return found
+
+    def add(self, email: str) -> None:
+        self._bloom.add(email)
+        if self._bloom.count == self._capacity + 1:
+            logger.warning(
+                "Email filter is over capacity (%d); false positives will rise "
+                "until EMAIL_FILTER_CAPACITY is raised",
+                self._capacity,
+            )
+
+    async def refresh(self) -> int:
+        """Add users created since the last refresh (all users on the first
+        call) and return how many rows were read."""
+        since = self._watermark - _REFRESH_OVERLAP if self._watermark else None
+        rows = 0
+        async with self._pool.acquire() as conn, conn.transaction():
+            async for record in UserRepository(conn).iter_emails_since(since):
+                self.add(record["email"])
+                created_at = record["created_at"]
+                if self._watermark is None or created_at > self._watermark:
+                    self._watermark = created_at
+                rows += 1
+        return rows
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Email filter refresh failed: %s", exc)
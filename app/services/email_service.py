@@ -1,41 +1,103 @@
 import logging
+import time
 from email.mime.text import MIMEText
+from typing import TYPE_CHECKING, Sequence
 
-from aiosmtplib import SMTPException, send
+from app.metrics import SMTP_SEND_DURATION
+from app.services.smtp_pool import SMTPConnectionPool
 
-from app.config import settings
-from app.exceptions.base import EmailDeliveryError
+if TYPE_CHECKING:
+    # Imported lazily at run time, like in smtp_pool.
+    from aiosmtplib import SMTP, SMTPException
 
 logger = logging.getLogger(__name__)
 
 _FROM_ADDRESS = "noreply@dailymotion.com"
 
+# (recipient, subject, body)
+OutgoingEmail = tuple[str, str, str]
+
+
+def render_activation_email(code: str) -> tuple[str, str]:
+    """Return the (subject, body) of the activation code email."""
+    return (
+        "Your Dailymotion activation code",
+        f"Your Dailymotion activation code is: {code}\n"
+        "This code expires in 1 minute.",
+    )
+
+
+def render_activation_link_email(link: str, ttl_seconds: float) -> tuple[str, str]:
+    """Return the (subject, body) of the activation link email."""
+    minutes = max(1, round(ttl_seconds / 60))
+    return (
+        "Activate your Dailymotion account",
+        f"Open this link to activate your Dailymotion account:\n{link}\n"
+        f"This link expires in {minutes} minute{'s' if minutes > 1 else ''}.",
+    )
+
+
+def _build_message(to_email: str, subject: str, body: str) -> MIMEText:
+    message = MIMEText(body)
+    message["From"] = _FROM_ADDRESS
+    message["To"] = to_email
+    message["Subject"] = subject
+    return message
+
 
 class EmailService:
-    def __init__(
-        self,
-        smtp_host: str = settings.mailhog_smtp_host,
-        smtp_port: int = settings.mailhog_smtp_port,
-    ) -> None:
-        self._smtp_host = smtp_host
-        self._smtp_port = smtp_port
-
-    async def send_activation_code(self, to_email: str, code: str) -> None:
-        message = MIMEText(
-            f"Your Dailymotion activation code is: {code}\n"
-            "This code expires in 1 minute."
-        )
-        message["From"] = _FROM_ADDRESS
-        message["To"] = to_email
-        message["Subject"] = "Your Dailymotion activation code"
+    def __init__(self, smtp_pool: SMTPConnectionPool) -> None:
+        self._smtp_pool = smtp_pool
+
+    async def send_many(
+        self, emails: Sequence[OutgoingEmail]
+    ) -> list["SMTPException | None"]:
+        """Send several emails over a single pooled SMTP session.
+
+        Returns one entry per email: None when it was accepted by the server,
+        otherwise the exception that made it fail. A failure does not stop the
+        remaining emails from being sent.
+        """
+        from aiosmtplib import SMTPException
 
         try:
-            await send(
-                message,
-                hostname=self._smtp_host,
-                port=self._smtp_port,
-            )  # Can be easily changed for a real third party service
-            logger.info("Activation code sent to %s", to_email)
+            async with self._smtp_pool.acquire() as session:
+                return [await self._send_one(session, *email) for email in emails]
         except SMTPException as exc:
-            logger.error("Failed to send activation email to %s: %s", to_email, exc)
-            raise EmailDeliveryError() from exc
+            logger.error("Could not open an SMTP session: %s", exc)
+            return [exc] * len(emails)
+
+    async def _send_one(
+        self, session: "SMTP", to_email: str, subject: str, body: str
+    ) -> "SMTPException | None":
+        message = _build_message(to_email, subject, body)
+        started = time.perf_counter()
+        error = await self._deliver(session, to_email, message)
+        SMTP_SEND_DURATION.observe(
+            time.perf_counter() - started, "ok" if error is None else "error"
+        )
+        return error
+
+    async def _deliver(
+        self, session: "SMTP", to_email: str, message: MIMEText
+    ) -> "SMTPException | None":
+        from aiosmtplib import SMTPException, SMTPServerDisconnected
+
+        retried = False
+        while True:
+            try:
+                if not session.is_connected:
+                    await session.connect()
+                await session.send_message(message)
+            except SMTPServerDisconnected as exc:
+                # The server dropped a pooled session: reconnect and retry once.
+                if retried:
+                    logger.error("Failed to send email to %s: %s", to_email, exc)
+                    return exc
+                retried = True
+            except SMTPException as exc:
+                logger.error("Failed to send email to %s: %s", to_email, exc)
+                return exc
+            else:
+                logger.info("Email sent to %s", to_email)
+                return None
@@ -0,0 +1,129 @@
+"""
+Streaming export of users and their activation state.
+
+Rows come from a server-side cursor and are encoded and sent one batch at a
+time, so memory stays at roughly `batch_size` rows however large the table
+is. The export reads through UnitOfWork.read_connection(), i.e. from the
+replica when one is healthy, in a read-only REPEATABLE READ transaction so
+the whole file reflects one snapshot.
+
+Each running export holds one pooled connection until the client has read
+everything. At most `max_concurrent` run at once; further requests get a
+fast 503 instead of draining the pool that registrations and activations
+share.
+"""
+
+import asyncio
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Literal
+
+from asyncpg import Record
+
+from app.config import settings
+from app.exceptions.base import ServiceOverloadedError
+from app.repositories.unit_of_work import UnitOfWork
+from app.repositories.user_repository import EXPORT_COLUMNS, UserRepository
+from app.responses import dumps
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class _CSVEncoder:
+    def __init__(self) -> None:
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def header(self) -> bytes:
+        self._writer.writerow(EXPORT_COLUMNS)
+        return self._flush()
+
+    def rows(self, records: list[Record]) -> bytes:
+        self._writer.writerows(
+            [_csv_value(record[column]) for column in EXPORT_COLUMNS]
+            for record in records
+        )
+        return self._flush()
+
+    def _flush(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def _ndjson_rows(records: list[Record]) -> bytes:
+    return b"".join(dumps(dict(record)) + b"\n" for record in records)
+
+
+class ExportService:
+    def __init__(
+        self,
+        uow: UnitOfWork,
+        batch_size: int = settings.export_batch_size,
+        max_concurrent: int = settings.export_max_concurrent,
+    ) -> None:
+        self._uow = uow
+        self._batch_size = batch_size
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    def stream(
+        self,
+        format: ExportFormat = "ndjson",
+        **filters,
+    ) -> AsyncIterator[bytes]:
+        """Return the export body; `filters` go to UserRepository.export_cursor.
+
+        Raises ServiceOverloadedError up front, before any response has been
+        started, when every export slot is taken.
+        """
+        if self._slots.locked():
+            raise ServiceOverloadedError(retry_after=5)
+        return self._stream(format, filters)
+
+    async def _stream(
+        self, format: ExportFormat, filters: dict
+    ) -> AsyncIterator[bytes]:
+        # The slot is taken once the body starts streaming; a request that
+        # slipped past the check in stream() waits here rather than exceeding
+        # the connection budget.
+        async with self._slots:
+            csv_encoder = _CSVEncoder() if format == "csv" else None
+            if csv_encoder is not None:
+                yield csv_encoder.header()
+            async with self._uow.read_connection() as conn, conn.transaction(
+                isolation="repeatable_read", readonly=True
+            ):
+                cursor = UserRepository(conn).export_cursor(
+                    prefetch=self._batch_size, **filters
+                )
+                batch: list[Record] = []
+                async for record in cursor:
+                    batch.append(record)
+                    if len(batch) >= self._batch_size:
+                        yield self._encode(batch, csv_encoder)
+                        batch = []
+                if batch:
+                    yield self._encode(batch, csv_encoder)
+
+    @staticmethod
+    def _encode(records: list[Record], csv_encoder: _CSVEncoder | None) -> bytes:
+        if csv_encoder is not None:
+            return csv_encoder.rows(records)
+        return _ndjson_rows(records)
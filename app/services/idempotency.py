@@ -0,0 +1,87 @@
+"""
+Idempotent handling of retried POST /users requests.
+
+A client that timed out retries with the same Idempotency-Key. The first
+successful execution stores its response in `idempotency_keys`, in the same
+transaction as the user, and later requests with that key get the stored
+response back: no bcrypt, no second code, no second email.
+
+Requests that arrive while the first execution is still running would miss
+the stored response, so RequestCoalescer makes them wait for that execution
+instead of starting their own. It only sees its own process; duplicates that
+land on different workers both run, and the loser's unique violation is
+turned into a replay by UserService. Activation-code resends share the same
+coalescer under their own key prefix, keyed by an HMAC of the credentials
+under a random per-process key (see `keyed_digest`).
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+from typing import Awaitable, Callable, TypeVar
+
+from app.exceptions.base import IdempotencyKeyReusedError
+
+T = TypeVar("T")
+
+
+def request_fingerprint(email: str) -> str:
+    """Identify a registration request for Idempotency-Key reuse checks.
+
+    Only the email is covered. A fast hash of the password stored next to
+    the bcrypt hash would undo the point of bcrypt, and a retry from the
+    same client with the same key and email is the same registration.
+    """
+    return hashlib.sha256(email.encode()).hexdigest()
+
+
+class RequestCoalescer:
+    def __init__(self) -> None:
+        # key -> (fingerprint, running execution)
+        self._in_flight: dict[str, tuple[str, asyncio.Task]] = {}
+        self._secret = os.urandom(32)
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def keyed_digest(self, *parts: str) -> str:
+        """HMAC `parts` under this process's random key, for coalescing keys
+        derived from secrets. Unlike a plain hash, the result can't be checked
+        against password guesses without the key.
+        """
+        message = "\0".join(parts).encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        fn: Callable[[], Awaitable[T]],
+    ) -> tuple[T, bool]:
+        """Run `fn` for `key`, or join the execution already running for it.
+
+        Returns fn's result and whether this caller joined an execution
+        started by another one. Raises IdempotencyKeyReusedError if the
+        running execution belongs to a request with a different fingerprint.
+        """
+        entry = self._in_flight.get(key)
+        if entry is not None:
+            if entry[0] != fingerprint:
+                raise IdempotencyKeyReusedError()
+            return await asyncio.shield(entry[1]), True
+
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = (fingerprint, task)
+        task.add_done_callback(lambda done: self._finished(key, done))
+        # Shielded so a client disconnecting does not cancel the execution
+        # the other callers are waiting on.
+        return await asyncio.shield(task), False
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        entry = self._in_flight.get(key)
+        if entry is not None and entry[1] is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the error as retrieved even if every caller went away.
+            task.exception()
@@ -0,0 +1,189 @@
+"""
+Password hashing on a bounded worker pool.
+
+bcrypt is deliberately slow (hundreds of milliseconds per call), so calling it
+from a request handler blocks the event loop for every other request served by
+the same worker. Hashing and verification are submitted to a thread or process
+pool instead, and the number of jobs waiting for a worker is capped: when the
+pool is saturated callers get a fast 503 rather than an ever-growing queue.
+
+The cost of new hashes comes from PASSWORD_BCRYPT_ROUNDS; calibrate_rounds()
+measures which cost fits a latency budget on the current machine.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+import bcrypt
+
+from app.config import settings
+from app.exceptions.base import ServiceOverloadedError
+from app.metrics import (
+    PASSWORD_HASH_DURATION,
+    PASSWORD_HASH_QUEUE,
+    PASSWORD_HASH_REJECTED,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# bcrypt's limits on the cost parameter.
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check_password(password: bytes, password_hash: bytes) -> bool:
+    # bcrypt.checkpw is constant-time — prevents timing attacks
+    return bcrypt.checkpw(password, password_hash)
+
+
+def hash_rounds(password_hash: str) -> int | None:
+    """Return the cost recorded in a bcrypt hash ("$2b$12$..." -> 12)."""
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def calibrate_rounds(
+    target_seconds: float, max_rounds: int = 20
+) -> tuple[int, list[tuple[int, float]]]:
+    """Time one bcrypt hash per cost, from the minimum upwards.
+
+    Stops at the first cost slower than `target_seconds` (or at
+    `max_rounds`) and returns the highest cost within the target along
+    with every (cost, seconds) measured. Timings are for one core; the
+    hasher pool runs one hash per worker at a time.
+    """
+    measurements = []
+    best = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, max_rounds + 1):
+        _, seconds = _timed(_hash_password, b"calibration-password", rounds)
+        measurements.append((rounds, seconds))
+        if seconds > target_seconds:
+            break
+        best = rounds
+    return best, measurements
+
+
+def _timed(fn: Callable[..., T], *args) -> tuple[T, float]:
+    """Run fn in the worker and report how long the work itself took."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+@dataclass
+class HashingStats:
+    calls: int = 0
+    rejected: int = 0
+    wait_seconds: float = 0.0
+    run_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, wait: float, run: float) -> None:
+        self.calls += 1
+        self.wait_seconds += wait
+        self.run_seconds += run
+        self.max_seconds = max(self.max_seconds, wait + run)
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        executor: Executor,
+        max_pending: int,
+        rounds: int = settings.password_bcrypt_rounds,
+    ) -> None:
+        if not MIN_ROUNDS <= rounds <= MAX_ROUNDS:
+            raise ValueError(
+                f"bcrypt rounds must be between {MIN_ROUNDS} and {MAX_ROUNDS}"
+            )
+        self._executor = executor
+        self._max_pending = max_pending
+        self.rounds = rounds
+        self._pending = 0
+        self.stats = HashingStats()
+
+    @classmethod
+    def from_settings(cls) -> "PasswordHasher":
+        workers = settings.password_hasher_workers or os.cpu_count() or 1
+        if settings.password_hasher_backend == "process":
+            # Imported here: multiprocessing adds ~15 ms to every cold start.
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor: Executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="password-hasher"
+            )
+        return cls(executor, settings.password_hasher_max_pending)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        password_hash = await self._submit(
+            "hash", _hash_password, password.encode(), self.rounds
+        )
+        return password_hash.decode()
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether `password_hash` was made with a cost other than ours."""
+        return hash_rounds(password_hash) != self.rounds
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._submit(
+            "verify", _check_password, password.encode(), password_hash.encode()
+        )
+
+    async def _submit(self, operation: str, fn: Callable[..., T], *args) -> T:
+        if self._pending >= self._max_pending:
+            self.stats.rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            logger.warning("Password hasher saturated (%d pending)", self._pending)
+            raise ServiceOverloadedError()
+
+        self._pending += 1
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        job = self._executor.submit(_timed, fn, *args)
+        # Release the slot when the job itself finishes (or is cancelled before
+        # it started), not when the caller stops waiting: a cancelled request
+        # leaves bcrypt running in the pool and the slot must stay taken.
+        job.add_done_callback(lambda _: self._job_done(loop))
+        result, run = await asyncio.wrap_future(job)
+
+        wait = max(time.perf_counter() - started - run, 0.0)
+        self.stats.record(wait=wait, run=run)
+        PASSWORD_HASH_QUEUE.observe(wait, operation)
+        PASSWORD_HASH_DURATION.observe(run, operation)
+        return result
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Runs in the worker thread (or the loop thread if the job was cancelled
+        # before starting); the counter is only ever touched on the loop.
+        try:
+            loop.call_soon_threadsafe(self._release_slot)
+        except RuntimeError:  # loop already closed during shutdown
+            pass
+
+    def _release_slot(self) -> None:
+        self._pending -= 1
+
+    def close(self) -> None:
+        # Called from the async lifespan: don't block the event loop on
+        # jobs that are still running.
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,87 @@
+"""
+Background upgrade of password hashes to the configured bcrypt cost.
+
+PASSWORD_BCRYPT_ROUNDS only applies to new hashes. Activation is the one
+moment the service holds a verified plaintext, so when the stored hash has
+another cost, PasswordRehasher hashes the password again off the request
+path and swaps the result in, provided the stored hash is still the one that
+was verified. A fleet-wide change of hashing cost then rolls out as users
+activate, without password resets.
+"""
+
+import asyncio
+import logging
+from uuid import UUID
+
+from app.config import settings
+from app.metrics import PASSWORD_REHASHES
+from app.repositories.unit_of_work import UnitOfWork
+from app.repositories.user_repository import UserRepository
+from app.services.password_hasher import PasswordHasher
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordRehasher:
+    def __init__(
+        self,
+        uow: UnitOfWork,
+        password_hasher: PasswordHasher,
+        max_pending: int = settings.password_rehash_max_pending,
+    ) -> None:
+        self._uow = uow
+        self._password_hasher = password_hasher
+        self._max_pending = max_pending
+        self._tasks: dict[UUID, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def schedule(self, user_id: UUID, password: str, password_hash: str) -> bool:
+        """Start rehashing if `password_hash` has another cost.
+
+        Returns whether a rehash was started. It is skipped when one is
+        already running for the user or `max_pending` are; the next
+        verification tries again.
+        """
+        if not self._password_hasher.needs_rehash(password_hash):
+            return False
+        if user_id in self._tasks or len(self._tasks) >= self._max_pending:
+            PASSWORD_REHASHES.inc("skipped")
+            return False
+        task = asyncio.create_task(
+            self._rehash(user_id, password, password_hash), name="password-rehash"
+        )
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+        return True
+
+    async def _rehash(self, user_id: UUID, password: str, old_hash: str) -> None:
+        try:
+            new_hash = await self._password_hasher.hash(password)
+            async with self._uow.connection() as conn:
+                replaced = await UserRepository(conn).replace_password_hash(
+                    user_id, old_hash, new_hash
+                )
+        except Exception:
+            # Includes a saturated hasher: rehashing must never compete with
+            # requests, and the next activation retries.
+            PASSWORD_REHASHES.inc("failed")
+            logger.warning("Rehash of user %s failed", user_id, exc_info=True)
+            return
+        # Not replaced: the hash changed meanwhile; the newer one wins.
+        PASSWORD_REHASHES.inc("replaced" if replaced else "stale")
+
+    async def drain(self, timeout: float) -> None:
+        """Wait up to `timeout` seconds for running rehashes, then cancel
+        the rest."""
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(
+            list(self._tasks.values()), timeout=max(timeout, 0)
+        )
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("Cancelled %d password rehashes", len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
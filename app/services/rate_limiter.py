@@ -0,0 +1,158 @@
+"""
+Token-bucket rate limiting for endpoints that are expensive to abuse.
+
+Each activation attempt costs a bcrypt verification and several queries, and
+the code space is only 10,000 values, so guessing is both a brute-force and a
+CPU denial-of-service risk. Attempts are charged against a per-IP and a
+per-email bucket before any of that work starts; a refused attempt costs a
+dict lookup (or one Redis round trip) instead of a bcrypt call.
+
+The in-memory backend is per process: with several workers each one enforces
+the limit separately. Use the Redis backend (`uv sync --extra redis`) to share
+buckets between workers and instances.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+from app.exceptions.base import TooManyRequestsError
+from app.metrics import RATE_LIMITED
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    capacity: float
+    per_second: float
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """Take one token from `key`'s bucket.
+
+        Returns 0 when the token was granted, otherwise the number of seconds
+        until one becomes available.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = settings.rate_limit_memory_max_keys) -> None:
+        self._max_keys = max_keys
+        # key -> (tokens, updated_at, full_at), least recently used first
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.pop(key, None)
+        if bucket is None or bucket[2] <= now:
+            tokens = limit.capacity
+        else:
+            refill = (now - bucket[1]) * limit.per_second
+            tokens = min(limit.capacity, bucket[0] + refill)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.per_second
+        full_at = now + (limit.capacity - tokens) / limit.per_second
+        self._buckets[key] = (tokens, now, full_at)
+        self._evict(now)
+        return wait
+
+    def _evict(self, now: float) -> None:
+        # A refilled bucket is indistinguishable from a missing one, so drop
+        # those from the cold end; past max_keys, drop the coldest regardless.
+        while self._buckets:
+            _, _, full_at = next(iter(self._buckets.values()))
+            if full_at > now and len(self._buckets) <= self._max_keys:
+                break
+            self._buckets.popitem(last=False)
+
+
+# Token bucket evaluated atomically on the Redis server, using its clock so
+# that instances with skewed clocks share one timeline.
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + (now - tonumber(state[2])) * rate)
+end
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    def __init__(self, url: str = settings.rate_limit_redis_url) -> None:
+        try:
+            from redis.asyncio import Redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis needs the redis extra: "
+                "uv sync --extra redis"
+            ) from exc
+        self._client = Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE)
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        wait = await self._script(
+            keys=[f"rate-limit:{key}"], args=[limit.capacity, limit.per_second]
+        )
+        return float(wait)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, enabled: bool = True) -> None:
+        self.backend = backend
+        self._enabled = enabled
+
+    @classmethod
+    def from_settings(cls) -> "RateLimiter":
+        if settings.rate_limit_backend == "redis":
+            backend: RateLimitBackend = RedisRateLimitBackend()
+        else:
+            backend = InMemoryRateLimitBackend()
+        return cls(backend, settings.rate_limit_enabled)
+
+    async def check(self, scope: str, identity: str, limit: RateLimit) -> None:
+        """Charge one attempt to `identity` within `scope`.
+
+        Raises TooManyRequestsError, carrying the time until the next token,
+        when the bucket is empty.
+        """
+        if not self._enabled:
+            return
+        wait = await self.backend.take(f"{scope}:{identity}", limit)
+        if wait > 0:
+            RATE_LIMITED.inc(scope)
+            raise TooManyRequestsError(retry_after=math.ceil(wait))
+
+    async def close(self) -> None:
+        await self.backend.close()
@@ -0,0 +1,126 @@
+"""
+Periodic deletion of rows that are no longer needed.
+
+Rows are deleted in small batches, each in its own short statement, so a
+reaper never holds many row locks or a long transaction while registrations
+and activations keep running.
+"""
+
+import asyncio
+import logging
+from abc import abstractmethod
+
+import asyncpg
+from asyncpg import Connection
+
+from app.config import settings
+from app.repositories.code_repository import CodeRepository
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+
+class BatchReaper(BackgroundTask):
+    # Human-readable name of the deleted rows, used in log messages
+    rows = "rows"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        retention_seconds: float,
+        batch_size: int,
+        interval: float,
+    ) -> None:
+        super().__init__()
+        self._pool = pool
+        self._retention_seconds = retention_seconds
+        self._batch_size = batch_size
+        self._interval = interval
+
+    @abstractmethod
+    async def _delete_batch(self, conn: Connection) -> int:
+        """Delete at most `self._batch_size` rows and return how many went."""
+
+    async def run_once(self) -> int:
+        """Delete every row past retention and return how many were removed."""
+        total = 0
+        while True:
+            async with self._pool.acquire() as conn:
+                deleted = await self._delete_batch(conn)
+            total += deleted
+            if deleted < self._batch_size:
+                break
+            # Let request handlers have the pool between batches.
+            await asyncio.sleep(0)
+
+        logger.info("%s removed %d %s", self.name, total, self.rows)
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s run failed", self.name)
+            await asyncio.sleep(self._interval)
+
+
+class CodeReaper(BatchReaper):
+    name = "code-reaper"
+    rows = "activation codes"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        retention_seconds: float = settings.code_reaper_retention_seconds,
+        batch_size: int = settings.code_reaper_batch_size,
+        interval: float = settings.code_reaper_interval,
+    ) -> None:
+        super().__init__(pool, retention_seconds, batch_size, interval)
+
+    async def _delete_batch(self, conn: Connection) -> int:
+        return await CodeRepository(conn).delete_expired(
+            self._retention_seconds, self._batch_size
+        )
+
+
+class OutboxReaper(BatchReaper):
+    name = "outbox-reaper"
+    rows = "outbox emails"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        retention_seconds: float = settings.outbox_reaper_retention_seconds,
+        batch_size: int = settings.outbox_reaper_batch_size,
+        interval: float = settings.outbox_reaper_interval,
+    ) -> None:
+        super().__init__(pool, retention_seconds, batch_size, interval)
+
+    async def _delete_batch(self, conn: Connection) -> int:
+        return await OutboxRepository(conn).delete_finished(
+            self._retention_seconds, self._batch_size
+        )
+
+
+class IdempotencyKeyReaper(BatchReaper):
+    name = "idempotency-reaper"
+    rows = "idempotency keys"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        retention_seconds: float = settings.idempotency_key_ttl_seconds,
+        batch_size: int = settings.idempotency_reaper_batch_size,
+        interval: float = settings.idempotency_reaper_interval,
+    ) -> None:
+        super().__init__(pool, retention_seconds, batch_size, interval)
+
+    async def _delete_batch(self, conn: Connection) -> int:
+        return await IdempotencyRepository(conn).delete_expired(
+            self._retention_seconds, self._batch_size
+        )
@@ -0,0 +1,137 @@
+"""
+Pool of long-lived SMTP sessions.
+
+aiosmtplib.send() opens a fresh connection for every message, paying TCP
+connect, greeting, EHLO (and STARTTLS when offered) and QUIT each time. The
+pool keeps up to `max_size` authenticated sessions open and hands them out to
+EmailService. Sessions idle for longer than `health_check_interval` are probed
+with NOOP before reuse, sessions idle for longer than `idle_timeout` are
+closed, and a session that raised during use is discarded rather than
+returned to the pool.
+
+aiosmtplib is imported on first use rather than at startup: the first
+session is only opened when the dispatcher has something to send.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from aiosmtplib import SMTP
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    def __init__(
+        self,
+        hostname: str = settings.mailhog_smtp_host,
+        port: int = settings.mailhog_smtp_port,
+        max_size: int = settings.smtp_pool_max_size,
+        idle_timeout: float = settings.smtp_pool_idle_timeout,
+        health_check_interval: float = settings.smtp_pool_health_check_interval,
+        timeout: float = settings.smtp_timeout,
+    ) -> None:
+        self._hostname = hostname
+        self._port = port
+        self._idle_timeout = idle_timeout
+        self._health_check_interval = health_check_interval
+        self._timeout = timeout
+        self._slots = asyncio.Semaphore(max_size)
+        # (session, monotonic time it was returned), most recently used last
+        self._idle: deque[tuple["SMTP", float]] = deque()
+        self._evictor: asyncio.Task | None = None
+        self._closed = False
+        self.connections_opened = 0
+
+    def start(self) -> None:
+        """Start closing sessions that stay idle past `idle_timeout`."""
+        self._evictor = asyncio.create_task(self._evict_idle(), name="smtp-evictor")
+
+    async def close(self) -> None:
+        # Sessions checked out right now are quit by acquire() when returned.
+        self._closed = True
+        if self._evictor is not None:
+            self._evictor.cancel()
+            try:
+                await self._evictor
+            except asyncio.CancelledError:
+                pass
+            self._evictor = None
+        while self._idle:
+            session, _ = self._idle.popleft()
+            await self._quit(session)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator["SMTP"]:
+        async with self._slots:
+            session = await self._checkout()
+            try:
+                yield session
+            except BaseException:
+                await self._quit(session)
+                raise
+            if self._closed:
+                await self._quit(session)
+            elif session.is_connected:
+                self._idle.append((session, time.monotonic()))
+
+    async def _checkout(self) -> "SMTP":
+        # Reuse the most recently returned session: it is the least likely to
+        # have been dropped by the server.
+        while self._idle:
+            session, returned_at = self._idle.pop()
+            idle_for = time.monotonic() - returned_at
+            if idle_for > self._idle_timeout or not session.is_connected:
+                await self._quit(session)
+                continue
+            if idle_for > self._health_check_interval and not await self._healthy(
+                session
+            ):
+                await self._quit(session)
+                continue
+            return session
+        return await self._connect()
+
+    async def _connect(self) -> "SMTP":
+        from aiosmtplib import SMTP
+
+        session = SMTP(hostname=self._hostname, port=self._port, timeout=self._timeout)
+        await session.connect()
+        self.connections_opened += 1
+        logger.debug("Opened SMTP session to %s:%s", self._hostname, self._port)
+        return session
+
+    async def _healthy(self, session: "SMTP") -> bool:
+        from aiosmtplib import SMTPException
+
+        try:
+            await session.noop()
+        except SMTPException:
+            return False
+        return True
+
+    async def _quit(self, session: "SMTP") -> None:
+        from aiosmtplib import SMTPException
+
+        if not session.is_connected:
+            return
+        try:
+            await session.quit()
+        except SMTPException:
+            session.close()
+
+    async def _evict_idle(self) -> None:
+        while True:
+            await asyncio.sleep(self._idle_timeout / 2)
+            now = time.monotonic()
+            # Oldest sessions sit at the left end of the deque.
+            while self._idle and now - self._idle[0][1] > self._idle_timeout:
+                session, _ = self._idle.popleft()
+                await self._quit(session)
@@ -1,57 +1,403 @@
-import bcrypt
+import asyncio
+import math
+from typing import Any, Literal, Mapping
+from uuid import UUID
+
+import orjson
 from asyncpg import Connection, Record, UniqueViolationError
 from fastapi.security import HTTPBasicCredentials
 
+from app.config import settings
 from app.exceptions.base import (
+    IdempotencyKeyReusedError,
     InvalidCodeError,
     InvalidCredentialsError,
+    ResendCooldownError,
     UserAlreadyActiveError,
     UserAlreadyExistsError,
 )
 from app.repositories.code_repository import CodeRepository
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.repositories.unit_of_work import UnitOfWork
 from app.repositories.user_repository import UserRepository
-from app.services.email_service import EmailService
+from app.responses import dumps
+from app.schemas.user import user_payload
+from app.services.activation_tokens import ActivationTokenSigner
+from app.services.credential_cache import VerifiedCredentialCache
+from app.services.email_filter import RegisteredEmailFilter
+from app.services.email_service import (
+    render_activation_email,
+    render_activation_link_email,
+)
+from app.services.idempotency import RequestCoalescer, request_fingerprint
+from app.services.password_hasher import PasswordHasher
+from app.services.password_rehasher import PasswordRehasher
 
 
 class UserService:
-    def __init__(self, conn: Connection, email_service: EmailService) -> None:
-        self._users_repo = UserRepository(conn)
-        self._codes_repo = CodeRepository(conn)
-        self._email_service = email_service
+    def __init__(
+        self,
+        uow: UnitOfWork,
+        password_hasher: PasswordHasher,
+        credential_cache: VerifiedCredentialCache | None = None,
+        email_filter: RegisteredEmailFilter | None = None,
+        coalescer: RequestCoalescer | None = None,
+        rehasher: PasswordRehasher | None = None,
+        activation_tokens: ActivationTokenSigner | None = None,
+        activation_mode: Literal["code", "token"] = settings.activation_mode,
+    ) -> None:
+        if activation_mode == "token" and activation_tokens is None:
+            raise ValueError("token activation needs an ActivationTokenSigner")
+        self._uow = uow
+        self._password_hasher = password_hasher
+        self._credential_cache = credential_cache
+        self._email_filter = email_filter
+        self._coalescer = coalescer
+        self._rehasher = rehasher
+        self._activation_tokens = activation_tokens
+        self._email_links = activation_mode == "token"
 
-    async def register(self, email: str, password: str) -> Record:
-        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    async def is_email_available(self, email: str) -> bool:
+        """Answer from the email filter when it can, else look the email up.
 
-        try:
-            user = await self._users_repo.create(email, password_hash)
-        except UniqueViolationError:
+        Advisory only: registration still enforces uniqueness itself.
+        """
+        if self._email_filter is not None and not self._email_filter.might_contain(
+            email
+        ):
+            return True
+        return not await self._email_exists(email)
+
+    async def _email_exists(self, email: str) -> bool:
+        # Users are never deleted, so a hit on a lagging replica is still true.
+        async with self._uow.read_connection() as conn:
+            return await UserRepository(conn).get_by_email(email) is not None
+
+    async def register(
+        self,
+        email: str,
+        password: str,
+        idempotency: tuple[str, str] | None = None,
+    ) -> Record:
+        """Create the user and queue its activation email.
+
+        With the email filter enabled, an email it flags is looked up and, if
+        taken, rejected before bcrypt runs. The password is hashed before a
+        connection is even checked out. The user, its code and the outbox row
+        are then committed together; delivery happens in EmailDispatcher.
+        `idempotency` is an (Idempotency-Key, fingerprint) pair whose
+        response is committed with them.
+        """
+        if self._email_filter is not None and not await self.is_email_available(
+            email
+        ):
             raise UserAlreadyExistsError()
+        password_hash = await self._password_hasher.hash(password)
+
+        async with self._uow.transaction() as conn:
+            try:
+                user = await UserRepository(conn).create(email, password_hash)
+            except UniqueViolationError:
+                raise UserAlreadyExistsError()
 
-        code = await self._codes_repo.create_for_user(user["id"])
-        await self._email_service.send_activation_code(email, code)
+            if self._email_links:
+                message = self._activation_link_email(user["id"])
+            else:
+                code = await CodeRepository(conn).create_for_user(user["id"])
+                message = render_activation_email(code)
+            await OutboxRepository(conn).enqueue(email, *message)
+            if idempotency is not None and not await IdempotencyRepository(
+                conn
+            ).save(
+                *idempotency,
+                dumps(user_payload(user)).decode(),
+                settings.idempotency_key_ttl_seconds,
+            ):
+                # Another request holding this key committed first.
+                raise IdempotencyKeyReusedError()
 
+        if self._email_filter is not None:
+            self._email_filter.add(email)
         return user
 
-    async def activate(self, credentials: HTTPBasicCredentials, code: str) -> None:
-        user = await self._users_repo.get_by_email(credentials.username)
+    async def register_idempotent(
+        self, key: str, email: str, password: str
+    ) -> tuple[Mapping[str, Any], bool]:
+        """Register once per Idempotency-Key.
+
+        Returns the response payload and whether it was replayed from an
+        earlier request rather than produced by this one. Raises
+        IdempotencyKeyReusedError when the key belongs to another email.
+        """
+        fingerprint = request_fingerprint(email)
+        stored = await self._stored_response(key, fingerprint)
+        if stored is not None:
+            return stored, True
+        if self._coalescer is None:
+            return await self._register_once(key, fingerprint, email, password)
+        (payload, replayed), joined = await self._coalescer.run(
+            f"register:{key}",
+            fingerprint,
+            lambda: self._register_once(key, fingerprint, email, password),
+        )
+        return payload, replayed or joined
+
+    async def _register_once(
+        self, key: str, fingerprint: str, email: str, password: str
+    ) -> tuple[Mapping[str, Any], bool]:
+        try:
+            user = await self.register(email, password, (key, fingerprint))
+        except UserAlreadyExistsError:
+            # Either a genuine duplicate, or the same request completed on
+            # another worker while this one was running.
+            stored = await self._stored_response(key, fingerprint)
+            if stored is None:
+                raise
+            return stored, True
+        return user_payload(user), False
+
+    async def _stored_response(
+        self, key: str, fingerprint: str
+    ) -> Mapping[str, Any] | None:
+        # Primary only: the first attempt may have committed moments ago.
+        async with self._uow.connection() as conn:
+            row = await IdempotencyRepository(conn).get(
+                key, settings.idempotency_key_ttl_seconds
+            )
+        if row is None:
+            return None
+        if row["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReusedError()
+        return orjson.loads(row["response"])
 
+    async def register_many(
+        self,
+        users: list[tuple[str, str]],
+        batch_size: int = settings.bulk_register_batch_size,
+        hash_concurrency: int = settings.bulk_register_hash_concurrency,
+    ) -> list[Record | None]:
+        """Create users from (email, password) pairs and queue their emails.
+
+        Returns one entry per input row: the created user, or None when the
+        email is already registered or repeats an earlier row. Known emails
+        are filtered out before hashing, since bcrypt dominates the cost.
+        Each batch is hashed, then committed in its own short transaction,
+        so a failure part-way leaves earlier batches in place; resubmitting
+        reports them as duplicates.
+        """
+        results: list[Record | None] = [None] * len(users)
+        first_rows: dict[str, int] = {}
+        for index, (email, _) in enumerate(users):
+            first_rows.setdefault(email, index)
+
+        # A stale replica only means fewer rows skipped: the insert itself
+        # ignores conflicts on the primary.
+        async with self._uow.read_connection() as conn:
+            existing = await UserRepository(conn).existing_emails(list(first_rows))
+        pending = [i for email, i in first_rows.items() if email not in existing]
+
+        slots = asyncio.Semaphore(hash_concurrency)
+
+        async def hash_one(password: str) -> str:
+            async with slots:
+                return await self._password_hasher.hash(password)
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            hashes = await asyncio.gather(*(hash_one(users[i][1]) for i in batch))
+            rows = [(users[i][0], h) for i, h in zip(batch, hashes)]
+
+            async with self._uow.transaction() as conn:
+                created = await UserRepository(conn).create_many(rows)
+                if self._email_links:
+                    messages = {
+                        user["id"]: self._activation_link_email(user["id"])
+                        for user in created
+                    }
+                else:
+                    codes = await CodeRepository(conn).create_many(
+                        [user["id"] for user in created]
+                    )
+                    messages = {
+                        user_id: render_activation_email(code)
+                        for user_id, code in codes.items()
+                    }
+                await OutboxRepository(conn).enqueue_many(
+                    [(user["email"], *messages[user["id"]]) for user in created]
+                )
+
+            for user in created:
+                results[first_rows[user["email"]]] = user
+                if self._email_filter is not None:
+                    self._email_filter.add(user["email"])
+
+        return results
+
+    async def activate(self, credentials: HTTPBasicCredentials, code: str) -> None:
+        user = await self._find_user(credentials.username)
         if user is None:
             raise InvalidCredentialsError()
 
-        # bcrypt.checkpw is constant-time — prevents timing attacks
-        password_valid = bcrypt.checkpw(
-            credentials.password.encode(),
-            user["password_hash"].encode(),
-        )
-        if not password_valid:
+        if not await self._verify_password(credentials, user["password_hash"]):
             raise InvalidCredentialsError()
 
         if user["is_active"]:
             raise UserAlreadyActiveError()
 
-        code_record = await self._codes_repo.get_lastest_valid(user["id"], code)
-        if code_record is None:
+        # Re-checked under the row lock: a concurrent request may have won.
+        async with self._uow.connection() as conn:
+            result = await UserRepository(conn).activate_with_code(user["id"], code)
+        if not result["user_found"]:
+            raise InvalidCredentialsError()
+        if result["already_active"]:
+            raise UserAlreadyActiveError()
+        if not result["code_valid"]:
             raise InvalidCodeError()
 
-        await self._codes_repo.mark_used(code_record["id"])
-        await self._users_repo.activate(user["id"])
+        # The verified plaintext is at hand: bring the hash to the current
+        # bcrypt cost without making the client wait for it.
+        if self._rehasher is not None:
+            self._rehasher.schedule(
+                user["id"], credentials.password, user["password_hash"]
+            )
+
+    async def resend_activation_code(
+        self,
+        credentials: HTTPBasicCredentials,
+        cooldown_seconds: float = settings.activation_resend_cooldown_seconds,
+        min_validity_seconds: float = (
+            settings.activation_resend_min_validity_seconds
+        ),
+    ) -> None:
+        """Queue the activation email again, at most once per cooldown.
+
+        Concurrent resends with the same credentials in this process share
+        one execution, so a burst costs one bcrypt check and one email. The
+        latest code is reused while it is still valid for
+        `min_validity_seconds`; otherwise a new one is issued.
+        """
+        if self._coalescer is None:
+            return await self._resend_once(
+                credentials, cooldown_seconds, min_validity_seconds
+            )
+        # Keyed on the password too, so a wrong password never rides on a
+        # correct one's verification.
+        digest = self._coalescer.keyed_digest(
+            credentials.username, credentials.password
+        )
+        await self._coalescer.run(
+            f"resend:{digest}",
+            "",
+            lambda: self._resend_once(
+                credentials, cooldown_seconds, min_validity_seconds
+            ),
+        )
+
+    async def _resend_once(
+        self,
+        credentials: HTTPBasicCredentials,
+        cooldown_seconds: float,
+        min_validity_seconds: float,
+    ) -> None:
+        user = await self._find_user(credentials.username)
+        if user is None:
+            raise InvalidCredentialsError()
+        if not await self._verify_password(credentials, user["password_hash"]):
+            raise InvalidCredentialsError()
+        if user["is_active"]:
+            raise UserAlreadyActiveError()
+
+        # The user row lock serializes resends across workers, including
+        # when the user has no unused code left to lock.
+        async with self._uow.transaction() as conn:
+            is_active = await UserRepository(conn).lock(user["id"])
+            if is_active is None:
+                raise InvalidCredentialsError()
+            if is_active:
+                raise UserAlreadyActiveError()
+
+            if self._email_links:
+                # No stored state to carry a cooldown; the router rate-limits
+                # link resends per email instead.
+                message = self._activation_link_email(user["id"])
+            else:
+                message = render_activation_email(
+                    await self._code_to_resend(
+                        conn, user["id"], cooldown_seconds, min_validity_seconds
+                    )
+                )
+            await OutboxRepository(conn).enqueue(user["email"], *message)
+
+    async def _code_to_resend(
+        self,
+        conn: Connection,
+        user_id: UUID,
+        cooldown_seconds: float,
+        min_validity_seconds: float,
+    ) -> str:
+        codes = CodeRepository(conn)
+        latest = await codes.latest_for_resend(
+            user_id, min_validity_seconds, cooldown_seconds
+        )
+        if latest is not None and latest["cooldown_remaining"] > 0:
+            raise ResendCooldownError(math.ceil(latest["cooldown_remaining"]))
+        if latest is not None and latest["reusable"]:
+            await codes.mark_sent(latest["id"])
+            return latest["code"]
+        return await codes.create_for_user(user_id)
+
+    def _activation_link_email(self, user_id: UUID) -> tuple[str, str]:
+        # Only called in token mode, where __init__ ensured a signer.
+        token = self._activation_tokens.issue(user_id)
+        return render_activation_link_email(
+            f"{settings.activation_link_base_url}/users/activate/{token}",
+            self._activation_tokens.ttl_seconds,
+        )
+
+    async def activate_with_token(self, token: str) -> None:
+        """Activate the user named by a signed activation link.
+
+        The token is checked in memory; the only query is the conditional
+        update, which also makes the link single use.
+        """
+        user_id = None
+        if self._activation_tokens is not None:
+            user_id = self._activation_tokens.verify(token)
+        if user_id is None:
+            raise InvalidCodeError("Invalid or expired activation link")
+
+        async with self._uow.connection() as conn:
+            result = await UserRepository(conn).activate(user_id)
+        if not result["user_found"]:
+            raise InvalidCodeError("Invalid or expired activation link")
+        if not result["activated"]:
+            raise UserAlreadyActiveError()
+
+    async def _find_user(self, email: str) -> Record | None:
+        # The replica may not have received a just-registered user yet, so a
+        # miss is confirmed on the primary. A hit is safe to use as is: the
+        # activation statement re-checks the user under a row lock.
+        async with self._uow.read_connection() as conn:
+            user = await UserRepository(conn).get_by_email(email)
+        if user is None and self._uow.replica is not None:
+            async with self._uow.connection() as conn:
+                user = await UserRepository(conn).get_by_email(email)
+        return user
+
+    async def _verify_password(
+        self, credentials: HTTPBasicCredentials, password_hash: str
+    ) -> bool:
+        cache = self._credential_cache
+        if cache is None:
+            return await self._password_hasher.verify(
+                credentials.password, password_hash
+            )
+
+        key = cache.key(credentials.username, credentials.password, password_hash)
+        if cache.is_verified(key):
+            return True
+        valid = await self._password_hasher.verify(credentials.password, password_hash)
+        if valid:
+            cache.remember(key)
+        return valid
@@ -0,0 +1,194 @@
+"""
+Load test of the registration and activation flows.
+
+Runs the real create_app() in-process, lifespan included: migrations, pool,
+password hasher and email dispatcher all start as in production. Outgoing
+mail goes to a local aiosmtpd sink. Each virtual user registers, reads its
+activation code from the database and activates. Needs a reachable database:
+
+    uv run python -m benchmarks.load_test --users 200 --concurrency 20
+
+Each virtual user connects from its own client address, so per-IP and
+per-email rate limits are exercised without being tripped, and admission
+control is disabled so overload shedding does not replace the latency being
+measured. Any non-2xx response fails the run (exit status 1).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+
+from aiosmtpd.controller import Controller
+from httpx import ASGITransport, AsyncClient
+
+PASSWORD = "Secure@pass123"
+
+
+class _SinkHandler:
+    async def handle_DATA(self, server, session, envelope) -> str:
+        return "250 OK"
+
+
+class _LoopLagMonitor:
+    """Measure how late a periodic timer fires: a proxy for event-loop stalls."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+        self.lags: list[float] = []
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        assert self._task
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self.lags.append(time.perf_counter() - started - self._interval)
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        samples = samples * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(samples, n=100)
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def _client_address(index: int) -> tuple[str, int]:
+    return f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}", 40_000
+
+
+async def _virtual_user(app, run_id: str, index: int, timings: dict) -> None:
+    transport = ASGITransport(app=app, client=_client_address(index))
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        await _register_and_activate(client, app.state.pool, run_id, index, timings)
+
+
+async def _register_and_activate(
+    client: AsyncClient, pool, run_id: str, index: int, timings: dict
+) -> None:
+    email = f"load-{run_id}-{index}@example.com"
+
+    started = time.perf_counter()
+    response = await client.post(
+        "/users", json={"email": email, "password": PASSWORD}
+    )
+    timings["register"].append(time.perf_counter() - started)
+    timings["status"][f"register_{response.status_code}"] += 1
+    if response.status_code != 201:
+        return
+
+    async with pool.acquire() as conn:
+        code = await conn.fetchval(
+            """
+            SELECT ac.code FROM activation_codes ac
+            JOIN users u ON u.id = ac.user_id
+            WHERE u.email = $1
+            """,
+            email,
+        )
+
+    started = time.perf_counter()
+    response = await client.post(
+        "/users/activate", json={"code": code}, auth=(email, PASSWORD)
+    )
+    timings["activate"].append(time.perf_counter() - started)
+    timings["status"][f"activate_{response.status_code}"] += 1
+
+
+async def main(users: int, concurrency: int) -> dict:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        smtp_port = sock.getsockname()[1]
+    controller = Controller(_SinkHandler(), hostname="127.0.0.1", port=smtp_port)
+    controller.start()
+    # Settings are read at import time, so point them at the sink first.
+    os.environ["MAILHOG_SMTP_HOST"] = "127.0.0.1"
+    os.environ["MAILHOG_SMTP_PORT"] = str(smtp_port)
+    os.environ["ADMISSION_ENABLED"] = "false"
+    from app.main import create_app
+
+    app = create_app()
+    timings: dict = {"register": [], "activate": [], "status": Counter()}
+    monitor = _LoopLagMonitor()
+    run_id = uuid.uuid4().hex[:8]
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(index: int) -> None:
+        async with slots:
+            await _virtual_user(app, run_id, index, timings)
+
+    try:
+        async with app.router.lifespan_context(app):
+            monitor.start()
+            started = time.perf_counter()
+            await asyncio.gather(*(limited(i) for i in range(users)))
+            elapsed = time.perf_counter() - started
+            await monitor.stop()
+            wait = app.state.unit_of_work.stats
+            hasher = app.state.password_hasher.stats
+    finally:
+        controller.stop()
+
+    def mean_ms(total: float, count: int) -> float:
+        return round(total / max(count, 1) * 1000, 3)
+
+    requests = len(timings["register"]) + len(timings["activate"])
+    failed = sum(
+        count
+        for key, count in timings["status"].items()
+        if not key.rsplit("_", 1)[1].startswith("2")
+    )
+    return {
+        "users": users,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 1),
+        "status": dict(timings["status"]),
+        "failed_requests": failed,
+        "register": _percentiles(timings["register"]),
+        "activate": _percentiles(timings["activate"]),
+        "pool_wait": {
+            "acquisitions": wait.acquisitions,
+            "mean_ms": mean_ms(wait.total_wait_seconds, wait.acquisitions),
+            "max_ms": round(wait.max_wait_seconds * 1000, 3),
+            "slow": wait.slow_acquisitions,
+        },
+        "password_hasher": {
+            "calls": hasher.calls,
+            "rejected": hasher.rejected,
+            "mean_queue_ms": mean_ms(hasher.wait_seconds, hasher.calls),
+        },
+        "event_loop_lag": _percentiles(monitor.lags),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    results = asyncio.run(main(args.users, args.concurrency))
+    print(json.dumps(results, indent=2))
+    if results["failed_requests"]:
+        sys.exit(f"{results['failed_requests']} requests did not return 2xx")
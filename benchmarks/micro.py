@@ -0,0 +1,95 @@
+"""
+Micro-benchmarks for the pieces of a request that run on the event loop.
+
+Covers UserCreate validation, activation code generation and each repository
+query on a single connection with the app's statement cache. Write queries run
+inside a transaction that is rolled back, so the database is left untouched.
+Needs a migrated database:
+
+    uv run python -m benchmarks.micro --iterations 2000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Awaitable, Callable
+
+import asyncpg
+
+from app.config import settings
+from app.repositories.code_repository import CodeRepository, _generate_code
+from app.repositories.user_repository import UserRepository
+from app.schemas.user import UserCreate
+
+_PAYLOAD = {"email": "user@example.com", "password": "Secure@pass123"}
+
+
+def _time_sync(fn: Callable[[], object], iterations: int) -> float:
+    """Return the mean microseconds per call."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+
+async def _time_async(fn: Callable[[], Awaitable[object]], iterations: int) -> float:
+    for _ in range(min(iterations, 10)):  # warm up
+        await fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return round((time.perf_counter() - started) / iterations * 1e6, 1)
+
+
+async def _queries(iterations: int) -> dict[str, float]:
+    conn = await asyncpg.connect(
+        settings.database_url,
+        statement_cache_size=settings.database_statement_cache_size,
+    )
+    users = UserRepository(conn)
+    codes = CodeRepository(conn)
+    results = {}
+    try:
+        transaction = conn.transaction()
+        await transaction.start()
+        user = await users.create(f"micro-{uuid.uuid4().hex}@example.com", "x")
+        await codes.create_for_user(user["id"])
+        email = user["email"]
+
+        results["users.get_by_email"] = await _time_async(
+            lambda: users.get_by_email(email), iterations
+        )
+        results["users.existing_emails"] = await _time_async(
+            lambda: users.existing_emails([email, "nobody@example.com"]), iterations
+        )
+        results["users.activate_with_code"] = await _time_async(
+            lambda: users.activate_with_code(user["id"], "0000"), iterations
+        )
+        results["codes.create_for_user"] = await _time_async(
+            lambda: codes.create_for_user(user["id"]), iterations
+        )
+        await transaction.rollback()
+    finally:
+        await conn.close()
+    return results
+
+
+async def main(iterations: int) -> dict[str, dict[str, float]]:
+    return {
+        "us_per_call": {
+            "UserCreate.model_validate": _time_sync(
+                lambda: UserCreate.model_validate(_PAYLOAD), iterations
+            ),
+            "_generate_code": _time_sync(_generate_code, iterations),
+            **await _queries(iterations),
+        }
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.iterations)), indent=2))
@@ -0,0 +1,77 @@
+"""
+Parse/plan savings of the prepared-statement registry.
+
+Times the statements a registration and an activation send through
+app.repositories.statements on two kinds of connection: one with asyncpg's
+statement cache disabled (parse and plan on every call) and one configured
+like the app's pool, where each statement is prepared once and reused. Needs
+a migrated database:
+
+    uv run python -m benchmarks.prepared_statements --iterations 2000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import asyncpg
+
+import app.repositories.code_repository  # noqa: F401  (registers statements)
+import app.repositories.user_repository  # noqa: F401
+from app.config import settings
+from app.repositories import statements
+
+# Read-only stand-ins for the per-request statements, so the benchmark can
+# loop without writing: same tables, same lookup shapes.
+_WORKLOAD = [
+    ("users.get_by_email", ("nobody@example.com",)),
+    ("codes.delete_expired", (1e9, 0)),
+]
+
+
+async def _time_calls(conn: asyncpg.Connection, iterations: int) -> float:
+    """Return the mean microseconds per statement."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for name, args in _WORKLOAD:
+            await statements.execute(conn, name, *args)
+    elapsed = time.perf_counter() - started
+    return elapsed / (iterations * len(_WORKLOAD)) * 1e6
+
+
+async def main(iterations: int) -> dict[str, float]:
+    no_cache = await asyncpg.connect(settings.database_url, statement_cache_size=0)
+    prepared = await asyncpg.connect(
+        settings.database_url,
+        statement_cache_size=settings.database_statement_cache_size,
+        max_cached_statement_lifetime=0,
+    )
+
+    results = {}
+    try:
+        for label, conn in [
+            ("no_cache", no_cache),
+            ("registry_prepared", prepared),
+        ]:
+            await _time_calls(conn, 10)  # warm up
+            results[f"{label}_us_per_statement"] = round(
+                await _time_calls(conn, iterations), 1
+            )
+    finally:
+        for conn in (no_cache, prepared):
+            await conn.close()
+
+    results["saved_us_per_statement"] = round(
+        results["no_cache_us_per_statement"]
+        - results["registry_prepared_us_per_statement"],
+        1,
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.iterations)), indent=2))
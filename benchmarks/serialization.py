@@ -0,0 +1,116 @@
+"""
+CPU cost of response encoding: pydantic model + stdlib JSON vs direct orjson.
+
+Measures the pieces the fast path replaces, without the database:
+the 201 body of POST /users (UserResponse validation + JSONResponse vs a
+dict taken from the row + ORJSONResponse), a bulk response of 1,000 rows,
+and the 422 body for a typical invalid registration (the previous
+copy-every-error formatter vs format_validation_errors):
+
+    uv run python -m benchmarks.serialization --iterations 20000
+"""
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable
+
+from asyncpg.pgproto.pgproto import UUID as RecordUUID
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from app.exceptions.handlers import format_validation_errors
+from app.responses import ORJSONResponse
+from app.schemas.user import BulkUserResponse, UserCreate, UserResponse, user_payload
+
+# Shaped like an asyncpg Record from users.create (asyncpg's own UUID type).
+_ROW = {
+    "id": RecordUUID(uuid.uuid4().hex),
+    "email": "user@example.com",
+    "is_active": False,
+    "created_at": datetime.now(timezone.utc),
+}
+
+
+def _time(fn: Callable[[], object], iterations: int) -> float:
+    """Return the mean microseconds of CPU time per call."""
+    for _ in range(min(iterations, 100)):
+        fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return round((time.process_time() - started) / iterations * 1e6, 2)
+
+
+def _old_format(errors: list[dict]) -> list[dict]:
+    formatted = []
+    for error in errors:
+        err = dict(error)
+        if "ctx" in err:
+            err["ctx"] = {
+                k: str(v) if isinstance(v, Exception) else v
+                for k, v in err["ctx"].items()
+            }
+        formatted.append(err)
+    return formatted
+
+
+def main(iterations: int) -> dict[str, dict[str, float]]:
+    try:
+        UserCreate.model_validate({"email": "nope", "password": "short"})
+    except ValidationError as exc:
+        errors = exc.errors()
+
+    bulk = {
+        "created": 1000,
+        "results": [
+            {"index": i, "email": f"u{i}@example.com", "status": "created",
+             "id": uuid.uuid4(), "errors": None}
+            for i in range(1000)
+        ],
+    }  # fmt: skip
+
+    def model_stdlib() -> bytes:
+        user = UserResponse(id=_ROW["id"], email=_ROW["email"], is_active=False)
+        return JSONResponse(jsonable_encoder(user), status_code=201).body
+
+    def direct_orjson() -> bytes:
+        return ORJSONResponse(user_payload(_ROW), status_code=201).body
+
+    def bulk_stdlib() -> bytes:
+        model = BulkUserResponse.model_validate(bulk)
+        return JSONResponse(jsonable_encoder(model)).body
+
+    def bulk_orjson() -> bytes:
+        model = BulkUserResponse.model_validate(bulk)
+        return ORJSONResponse(model.model_dump()).body
+
+    def errors_old() -> bytes:
+        return JSONResponse({"detail": _old_format(errors)}, status_code=422).body
+
+    def errors_new() -> bytes:
+        body = {"detail": format_validation_errors(errors)}
+        return ORJSONResponse(body, status_code=422).body
+
+    assert json.loads(model_stdlib()) == json.loads(direct_orjson())
+    assert json.loads(errors_old()) == json.loads(errors_new())
+    return {
+        "us_cpu_per_response": {
+            "register_201_model_stdlib": _time(model_stdlib, iterations),
+            "register_201_direct_orjson": _time(direct_orjson, iterations),
+            "bulk_1000_rows_stdlib": _time(bulk_stdlib, max(iterations // 1000, 5)),
+            "bulk_1000_rows_orjson": _time(bulk_orjson, max(iterations // 1000, 5)),
+            "validation_422_old": _time(errors_old, iterations),
+            "validation_422_new": _time(errors_new, iterations),
+        }
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10000)
+    args = parser.parse_args()
+    print(json.dumps(main(args.iterations), indent=2))
@@ -0,0 +1,81 @@
+"""
+Per-email SMTP cost: one-shot aiosmtplib.send vs pooled sessions vs send_many.
+
+Runs against a local aiosmtpd stand-in so only client-side protocol overhead
+(connect, greeting, EHLO, QUIT) is measured:
+
+    uv run python -m benchmarks.smtp_send --messages 500
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+from email.mime.text import MIMEText
+
+from aiosmtpd.controller import Controller
+from aiosmtplib import send
+
+from app.services.email_service import EmailService
+from app.services.smtp_pool import SMTPConnectionPool
+
+
+class _SinkHandler:
+    async def handle_DATA(self, server, session, envelope) -> str:
+        return "250 OK"
+
+
+async def _one_shot(host: str, port: int, count: int) -> None:
+    for i in range(count):
+        message = MIMEText("body")
+        message["From"] = "noreply@dailymotion.com"
+        message["To"] = f"user{i}@example.com"
+        message["Subject"] = "subject"
+        await send(message, hostname=host, port=port)
+
+
+async def _pooled(host: str, port: int, count: int) -> None:
+    pool = SMTPConnectionPool(hostname=host, port=port)
+    service = EmailService(pool)
+    for i in range(count):
+        await service.send_many([(f"user{i}@example.com", "subject", "body")])
+    await pool.close()
+
+
+async def _send_many(host: str, port: int, count: int) -> None:
+    pool = SMTPConnectionPool(hostname=host, port=port)
+    service = EmailService(pool)
+    await service.send_many(
+        [(f"user{i}@example.com", "subject", "body") for i in range(count)]
+    )
+    await pool.close()
+
+
+async def main(count: int) -> dict[str, float]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    controller = Controller(_SinkHandler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    results = {}
+    try:
+        for name, scenario in [
+            ("one_shot", _one_shot),
+            ("pooled", _pooled),
+            ("send_many", _send_many),
+        ]:
+            started = time.perf_counter()
+            await scenario(controller.hostname, controller.port, count)
+            elapsed = time.perf_counter() - started
+            results[f"{name}_ms_per_email"] = round(elapsed / count * 1000, 3)
+    finally:
+        controller.stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.messages)), indent=2))
@@ -0,0 +1,17 @@
+-- Transactional outbox: emails are written in the same transaction as the
+-- data that triggers them and delivered asynchronously by EmailDispatcher.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id              UUID         PRIMARY KEY DEFAULT gen_random_uuid(),
+    recipient       VARCHAR(254) NOT NULL,
+    subject         TEXT         NOT NULL,
+    body            TEXT         NOT NULL,
+    attempts        INTEGER      NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+    last_error      TEXT,
+    sent_at         TIMESTAMPTZ,
+    created_at      TIMESTAMPTZ  NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+    ON email_outbox (next_attempt_at)
+    WHERE sent_at IS NULL;
@@ -0,0 +1,18 @@
+-- migrate: no-transaction
+-- Built concurrently so registrations and activations keep writing to the
+-- tables while the indexes are built.
+
+-- Matches the code lookup in UserRepository.activate_with_code: equality on
+-- (user_id, code), newest first, unused codes only. expires_at is included so
+-- the expiry check does not need a heap visit.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_activation_codes_lookup
+    ON activation_codes (user_id, code, created_at DESC)
+    INCLUDE (expires_at)
+    WHERE used_at IS NULL;
+
+-- Range scan used by CodeReaper to find codes past retention.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_activation_codes_expires_at
+    ON activation_codes (expires_at);
+
+-- The UNIQUE constraint on users.email already provides an index.
+DROP INDEX CONCURRENTLY IF EXISTS idx_users_email;
@@ -0,0 +1,20 @@
+-- migrate: no-transaction
+-- Terminal state for messages the dispatcher gave up on. Dead and sent rows
+-- leave the pending index, so claim_batch never scans them again. Indexes are
+-- built concurrently so the outbox keeps taking writes; the new pending index
+-- is in place before the old one is dropped, so claims never lose it.
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS failed_at TIMESTAMPTZ;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_email_outbox_pending_new
+    ON email_outbox (next_attempt_at)
+    WHERE sent_at IS NULL AND failed_at IS NULL;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_email_outbox_pending;
+
+ALTER INDEX IF EXISTS idx_email_outbox_pending_new
+    RENAME TO idx_email_outbox_pending;
+
+-- Range scan used by OutboxReaper to delete finished rows past retention.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_email_outbox_finished_at
+    ON email_outbox ((COALESCE(sent_at, failed_at)))
+    WHERE sent_at IS NOT NULL OR failed_at IS NOT NULL;
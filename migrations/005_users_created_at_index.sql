@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+-- Range scan used by RegisteredEmailFilter to pick up users created since
+-- its last refresh. id makes the key unique, for keyset pagination. Built
+-- concurrently so registrations are not blocked meanwhile.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created_at
+    ON users (created_at, id);
@@ -0,0 +1,14 @@
+-- Responses to POST /users requests sent with an Idempotency-Key. A retry
+-- carrying the same key is answered from here instead of registering again.
+-- fingerprint identifies the request body, so a key reused for a different
+-- request is refused rather than replayed.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key         TEXT        PRIMARY KEY,
+    fingerprint TEXT        NOT NULL,
+    response    JSONB       NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Used by IdempotencyKeyReaper to find keys past their retention.
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at
+    ON idempotency_keys (created_at);
@@ -0,0 +1,5 @@
+-- When the code was last emailed, for the resend cooldown. Existing codes
+-- count as sent when the migration ran; a constant default makes this a
+-- catalog-only change, without rewriting the table.
+ALTER TABLE activation_codes
+    ADD COLUMN IF NOT EXISTS last_sent_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
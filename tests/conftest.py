@@ -1,15 +1,38 @@
-from unittest.mock import AsyncMock, patch
+import socket
+from concurrent.futures import ThreadPoolExecutor
 
 import asyncpg
-import httpx
 import pytest
 import pytest_asyncio
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import Envelope
 from httpx import ASGITransport, AsyncClient
 
-from app.config import settings
-from app.database import run_migrations
-from app.dependencies import get_http_client, get_pool
+from app.database import create_pool, run_migrations
+from app.dependencies import (
+    get_activation_tokens,
+    get_credential_cache,
+    get_email_filter,
+    get_export_service,
+    get_password_hasher,
+    get_password_rehasher,
+    get_pool,
+    get_rate_limiter,
+    get_request_coalescer,
+    get_unit_of_work,
+)
 from app.main import create_app
+from app.repositories.unit_of_work import UnitOfWork
+from app.services.activation_tokens import ActivationTokenSigner
+from app.services.credential_cache import VerifiedCredentialCache
+from app.services.email_filter import RegisteredEmailFilter
+from app.services.email_service import EmailService
+from app.services.export_service import ExportService
+from app.services.idempotency import RequestCoalescer
+from app.services.password_hasher import PasswordHasher
+from app.services.password_rehasher import PasswordRehasher
+from app.services.rate_limiter import InMemoryRateLimitBackend, RateLimiter
+from app.services.smtp_pool import SMTPConnectionPool
 
 
 @pytest_asyncio.fixture
@@ -22,34 +45,130 @@ async def db_pool():
     Migrations are idempotent so re-running them per test is fast after the
     first run.
     """
-    pool = await asyncpg.create_pool(dsn=settings.database_url)
-    await run_migrations(pool)
+    pool = await create_pool()
+    if await run_migrations(pool):
+        await pool.expire_connections()
     async with pool.acquire() as conn:
         await conn.execute(
-            "TRUNCATE TABLE activation_codes, users RESTART IDENTITY CASCADE"
+            "TRUNCATE TABLE idempotency_keys, email_outbox, activation_codes, "
+            "users RESTART IDENTITY CASCADE"
         )
     yield pool
     await pool.close()
 
 
-@pytest.fixture(autouse=True)
-def mock_email():
-    """Prevent any real SMTP connection during tests."""
-    with patch("app.services.email_service.send", new_callable=AsyncMock):
-        yield
+class _RecordingHandler:
+    def __init__(self) -> None:
+        self.messages: list[Envelope] = []
+
+    async def handle_DATA(self, server, session, envelope: Envelope) -> str:
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    """Local SMTP stand-in; received mail is in `smtp_server.handler.messages`."""
+    controller = Controller(
+        _RecordingHandler(), hostname="127.0.0.1", port=_free_port()
+    )
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+@pytest_asyncio.fixture
+async def email_service(smtp_server: Controller):
+    smtp_pool = SMTPConnectionPool(
+        hostname=smtp_server.hostname, port=smtp_server.port
+    )
+    yield EmailService(smtp_pool)
+    await smtp_pool.close()
+
+
+@pytest.fixture
+def password_hasher():
+    hasher = PasswordHasher(ThreadPoolExecutor(max_workers=2), max_pending=16)
+    yield hasher
+    hasher.close()
+
+
+@pytest.fixture
+def unit_of_work(db_pool: asyncpg.Pool) -> UnitOfWork:
+    return UnitOfWork(db_pool)
+
+
+@pytest_asyncio.fixture
+async def password_rehasher(
+    unit_of_work: UnitOfWork, password_hasher: PasswordHasher
+):
+    rehasher = PasswordRehasher(unit_of_work, password_hasher)
+    yield rehasher
+    await rehasher.drain(timeout=5)
+
+
+@pytest.fixture
+def rate_limiter() -> RateLimiter:
+    return RateLimiter(InMemoryRateLimitBackend())
+
+
+@pytest.fixture
+def credential_cache() -> VerifiedCredentialCache:
+    return VerifiedCredentialCache()
+
+
+@pytest_asyncio.fixture
+async def email_filter(db_pool: asyncpg.Pool) -> RegisteredEmailFilter:
+    email_filter = RegisteredEmailFilter(db_pool, capacity=10_000)
+    await email_filter.refresh()
+    return email_filter
+
+
+@pytest.fixture
+def activation_tokens() -> ActivationTokenSigner:
+    return ActivationTokenSigner("test-activation-secret")
 
 
 @pytest_asyncio.fixture
-async def client(db_pool: asyncpg.Pool):
-    """HTTP test client with DB pool and http client dependencies overridden.
+async def client(
+    db_pool: asyncpg.Pool,
+    unit_of_work: UnitOfWork,
+    password_hasher: PasswordHasher,
+    password_rehasher: PasswordRehasher,
+    rate_limiter: RateLimiter,
+    credential_cache: VerifiedCredentialCache,
+    email_filter: RegisteredEmailFilter,
+    activation_tokens: ActivationTokenSigner,
+):
+    """HTTP test client with app.state dependencies overridden.
 
     ASGITransport does not trigger the ASGI lifespan, so app.state is never
-    populated. Both get_pool and get_http_client must be overridden to avoid
-    reading from app.state at request time.
+    populated. Every dependency that reads from app.state (get_pool,
+    get_unit_of_work, get_password_hasher, get_password_rehasher,
+    get_rate_limiter, get_credential_cache, get_email_filter,
+    get_request_coalescer, get_export_service, get_activation_tokens) must
+    be overridden.
     """
     app = create_app()
     app.dependency_overrides[get_pool] = lambda: db_pool
-    app.dependency_overrides[get_http_client] = lambda: httpx.AsyncClient()
+    app.dependency_overrides[get_unit_of_work] = lambda: unit_of_work
+    app.dependency_overrides[get_password_hasher] = lambda: password_hasher
+    app.dependency_overrides[get_password_rehasher] = lambda: password_rehasher
+    app.dependency_overrides[get_rate_limiter] = lambda: rate_limiter
+    app.dependency_overrides[get_credential_cache] = lambda: credential_cache
+    app.dependency_overrides[get_email_filter] = lambda: email_filter
+    app.dependency_overrides[get_activation_tokens] = lambda: activation_tokens
+    coalescer = RequestCoalescer()
+    app.dependency_overrides[get_request_coalescer] = lambda: coalescer
+    app.dependency_overrides[get_export_service] = lambda: ExportService(
+        unit_of_work
+    )
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -1,7 +1,13 @@
+import asyncio
+
 import asyncpg
 import pytest
 from httpx import AsyncClient
 
+from app.repositories.user_repository import UserRepository
+from app.services.password_hasher import PasswordHasher, hash_rounds
+from app.services.password_rehasher import PasswordRehasher
+
 _EMAIL = "user@example.com"
 _PASSWORD = "Secure@pass123"
 _PAYLOAD = {"email": _EMAIL, "password": _PASSWORD}
@@ -134,3 +140,112 @@ async def test_activate_code_cannot_be_reused(
         "/users/activate", json={"code": code}, auth=(_EMAIL, _PASSWORD)
     )
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_concurrent_activations_succeed_once(
+    client: AsyncClient, db_pool: asyncpg.Pool
+):
+    await _register(client)
+    code = await _get_latest_code(db_pool)
+
+    responses = await asyncio.gather(
+        *(
+            client.post(
+                "/users/activate", json={"code": code}, auth=(_EMAIL, _PASSWORD)
+            )
+            for _ in range(3)
+        )
+    )
+
+    # Losers block on the user row lock, then see the committed activation
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200, 409, 409]
+    async with db_pool.acquire() as conn:
+        used = await conn.fetchval(
+            "SELECT COUNT(*) FROM activation_codes WHERE used_at IS NOT NULL"
+        )
+    assert used == 1
+
+
+@pytest.mark.asyncio
+async def test_activate_with_code_loser_sees_already_active(
+    client: AsyncClient, db_pool: asyncpg.Pool
+):
+    await _register(client)
+    code = await _get_latest_code(db_pool)
+    async with db_pool.acquire() as conn:
+        user_id = await conn.fetchval("SELECT id FROM users WHERE email = $1", _EMAIL)
+
+    async with db_pool.acquire() as winner, db_pool.acquire() as loser:
+        async with winner.transaction():
+            won = await UserRepository(winner).activate_with_code(user_id, code)
+            # The loser blocks on the user row lock until the winner commits
+            lost = asyncio.create_task(
+                UserRepository(loser).activate_with_code(user_id, code)
+            )
+            await asyncio.sleep(0.2)
+            assert not lost.done()
+        lost = await lost
+
+    assert (won["user_found"], won["already_active"], won["code_valid"]) == (
+        True,
+        False,
+        True,
+    )
+    assert (lost["user_found"], lost["already_active"], lost["code_valid"]) == (
+        True,
+        True,
+        False,
+    )
+
+
+async def _stored_hash(db_pool: asyncpg.Pool) -> str:
+    async with db_pool.acquire() as conn:
+        return await conn.fetchval(
+            "SELECT password_hash FROM users WHERE email = $1", _EMAIL
+        )
+
+
+@pytest.mark.asyncio
+async def test_activate_rehashes_to_the_configured_cost(
+    client: AsyncClient,
+    db_pool: asyncpg.Pool,
+    password_hasher: PasswordHasher,
+    password_rehasher: PasswordRehasher,
+    monkeypatch,
+):
+    await _register(client)
+    code = await _get_latest_code(db_pool)
+    monkeypatch.setattr(password_hasher, "rounds", 5)
+
+    response = await client.post(
+        "/users/activate", json={"code": code}, auth=(_EMAIL, _PASSWORD)
+    )
+    assert response.status_code == 200
+    await password_rehasher.drain(timeout=5)
+
+    new_hash = await _stored_hash(db_pool)
+    assert hash_rounds(new_hash) == 5
+    assert await password_hasher.verify(_PASSWORD, new_hash)
+
+
+@pytest.mark.asyncio
+async def test_rehash_does_not_overwrite_a_changed_hash(
+    client: AsyncClient,
+    db_pool: asyncpg.Pool,
+    password_hasher: PasswordHasher,
+    password_rehasher: PasswordRehasher,
+    monkeypatch,
+):
+    await _register(client)
+    current = await _stored_hash(db_pool)
+    async with db_pool.acquire() as conn:
+        user_id = await conn.fetchval("SELECT id FROM users WHERE email = $1", _EMAIL)
+    monkeypatch.setattr(password_hasher, "rounds", 5)
+
+    # Scheduled with a hash that is no longer the stored one.
+    stale = current.replace("$12$", "$11$", 1)
+    assert password_rehasher.schedule(user_id, _PASSWORD, stale)
+    await password_rehasher.drain(timeout=5)
+    assert await _stored_hash(db_pool) == current
@@ -0,0 +1,144 @@
+import asyncio
+import re
+import time
+from uuid import uuid4
+
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.services.activation_tokens import ActivationTokenSigner
+
+_EMAIL = "user@example.com"
+_PASSWORD = "Secure@pass123"
+
+
+@pytest.fixture
+def token_mode(monkeypatch):
+    monkeypatch.setattr(settings, "activation_mode", "token")
+
+
+async def _link_token(db_pool: asyncpg.Pool, email: str = _EMAIL) -> str:
+    async with db_pool.acquire() as conn:
+        body = await conn.fetchval(
+            """
+            SELECT body FROM email_outbox
+            WHERE recipient = $1
+            ORDER BY created_at DESC LIMIT 1
+            """,
+            email,
+        )
+    return re.search(r"/users/activate/(\S+)", body).group(1)
+
+
+async def _code_rows(db_pool: asyncpg.Pool) -> int:
+    async with db_pool.acquire() as conn:
+        return await conn.fetchval("SELECT COUNT(*) FROM activation_codes")
+
+
+def test_token_round_trip_and_rejections():
+    signer = ActivationTokenSigner("secret", ttl_seconds=60)
+    user_id = uuid4()
+    token = signer.issue(user_id, now=1_000)
+
+    assert signer.verify(token, now=1_030) == user_id
+    assert signer.verify(token, now=1_061) is None
+    assert ActivationTokenSigner("other").verify(token, now=1_030) is None
+    tampered = token[:5] + ("A" if token[5] != "A" else "B") + token[6:]
+    assert signer.verify(tampered, now=1_030) is None
+    assert signer.verify("not-a-token", now=1_030) is None
+    assert signer.verify("", now=1_030) is None
+
+
+def test_token_mode_requires_a_secret(monkeypatch, token_mode):
+    monkeypatch.setattr(settings, "activation_token_secret", None)
+    with pytest.raises(RuntimeError):
+        ActivationTokenSigner.from_settings()
+
+
+@pytest.mark.asyncio
+async def test_link_activates_once_without_code_rows(
+    client: AsyncClient, db_pool: asyncpg.Pool, token_mode
+):
+    response = await client.post(
+        "/users", json={"email": _EMAIL, "password": _PASSWORD}
+    )
+    assert response.status_code == 201
+    assert await _code_rows(db_pool) == 0
+    token = await _link_token(db_pool)
+
+    response = await client.get(f"/users/activate/{token}")
+    assert response.status_code == 200
+    assert response.json()["message"] == "Account activated successfully"
+    async with db_pool.acquire() as conn:
+        assert await conn.fetchval(
+            "SELECT is_active FROM users WHERE email = $1", _EMAIL
+        )
+
+    response = await client.get(f"/users/activate/{token}")
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_concurrent_link_clicks_activate_once(
+    client: AsyncClient, db_pool: asyncpg.Pool, token_mode
+):
+    await client.post("/users", json={"email": _EMAIL, "password": _PASSWORD})
+    token = await _link_token(db_pool)
+
+    responses = await asyncio.gather(
+        *(client.get(f"/users/activate/{token}") for _ in range(5))
+    )
+    assert sorted(r.status_code for r in responses) == [200, 409, 409, 409, 409]
+
+
+@pytest.mark.asyncio
+async def test_invalid_or_expired_link_returns_422(
+    client: AsyncClient, activation_tokens: ActivationTokenSigner
+):
+    response = await client.get("/users/activate/garbage")
+    assert response.status_code == 422
+
+    expired = activation_tokens.issue(uuid4(), now=time.time() - 3600)
+    response = await client.get(f"/users/activate/{expired}")
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_link_for_unknown_user_returns_422(
+    client: AsyncClient, activation_tokens: ActivationTokenSigner
+):
+    response = await client.get(f"/users/activate/{activation_tokens.issue(uuid4())}")
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_bulk_registration_emails_links(
+    client: AsyncClient, db_pool: asyncpg.Pool, token_mode
+):
+    users = [{"email": f"user{i}@example.com", "password": _PASSWORD} for i in range(3)]
+    response = await client.post("/users/bulk", json={"users": users})
+    assert response.json()["created"] == 3
+    assert await _code_rows(db_pool) == 0
+
+    token = await _link_token(db_pool, "user1@example.com")
+    response = await client.get(f"/users/activate/{token}")
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_link_resend_is_limited_per_email(
+    client: AsyncClient, db_pool: asyncpg.Pool, token_mode
+):
+    await client.post("/users", json={"email": _EMAIL, "password": _PASSWORD})
+    auth = (_EMAIL, _PASSWORD)
+
+    response = await client.post("/users/activate/resend", auth=auth)
+    assert response.status_code == 202
+    response = await client.post("/users/activate/resend", auth=auth)
+    assert response.status_code == 429
+    assert await _code_rows(db_pool) == 0
+
+    response = await client.get(f"/users/activate/{await _link_token(db_pool)}")
+    assert response.status_code == 200
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.admission import AdmissionControlMiddleware, AdmissionController
+
+
+class SlowApp:
+    """Answers 200 once `release` is set; counts requests it handled."""
+
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.handled = 0
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["path"] != "/fast":
+            await self.release.wait()
+        self.handled += 1
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _client(app, controller, exempt=("/metrics",)) -> AsyncClient:
+    middleware = AdmissionControlMiddleware(app, controller, list(exempt))
+    return AsyncClient(transport=ASGITransport(app=middleware), base_url="http://t")
+
+
+async def _started(controller: AdmissionController, in_flight: int) -> None:
+    while controller.in_flight < in_flight:
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_route_limit_sheds_after_queue_timeout():
+    app = SlowApp()
+    controller = AdmissionController(
+        route_limits={"POST /users": 1}, queue_timeout=0.05, retry_after=3
+    )
+    async with _client(app, controller) as client:
+        first = asyncio.create_task(client.post("/users"))
+        await _started(controller, 1)
+
+        shed = await client.post("/users")
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "3"
+        # Other routes are only bound by the total limit.
+        assert (await client.get("/fast")).status_code == 200
+
+        app.release.set()
+        assert (await first).status_code == 200
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_request_runs_when_a_slot_frees():
+    app = SlowApp()
+    controller = AdmissionController(max_in_flight=1, queue_timeout=1.0)
+    async with _client(app, controller) as client:
+        first = asyncio.create_task(client.get("/slow"))
+        await _started(controller, 1)
+        queued = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.01)
+        assert not queued.done()
+
+        app.release.set()
+        assert (await first).status_code == 200
+        assert (await queued).status_code == 200
+    assert app.handled == 2
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_refused_immediately():
+    app = SlowApp()
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=10)
+    async with _client(app, controller) as client:
+        first = asyncio.create_task(client.get("/slow"))
+        await _started(controller, 1)
+
+        response = await asyncio.wait_for(client.get("/slow"), timeout=1)
+        assert response.status_code == 503
+
+        app.release.set()
+        await first
+
+
+@pytest.mark.asyncio
+async def test_exempt_paths_bypass_the_limits():
+    app = SlowApp()
+    app.release.set()
+    controller = AdmissionController(max_in_flight=0, queue_timeout=0)
+    async with _client(app, controller) as client:
+        assert (await client.get("/metrics")).status_code == 200
+        assert (await client.get("/users")).status_code == 503
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.credential_cache import VerifiedCredentialCache
+
+
+def test_remembered_key_is_verified_until_ttl():
+    cache = VerifiedCredentialCache(ttl_seconds=0.05)
+    key = cache.key("user@example.com", "Secure@pass123", "$2b$hash")
+    assert not cache.is_verified(key)
+    cache.remember(key)
+    assert cache.is_verified(key)
+    time.sleep(0.06)
+    assert not cache.is_verified(key)
+    assert len(cache) == 0
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_key_changes_with_stored_hash_and_password():
+    cache = VerifiedCredentialCache()
+    key = cache.key("user@example.com", "Secure@pass123", "$2b$old")
+    assert key != cache.key("user@example.com", "Secure@pass123", "$2b$new")
+    assert key != cache.key("user@example.com", "Other@pass1234", "$2b$old")
+    # Per-process secret: keys are not reproducible elsewhere.
+    assert key != VerifiedCredentialCache().key(
+        "user@example.com", "Secure@pass123", "$2b$old"
+    )
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = VerifiedCredentialCache(max_entries=2)
+    a, b, c = (cache.key(name, "pw", "hash") for name in "abc")
+    cache.remember(a)
+    cache.remember(b)
+    assert cache.is_verified(a)
+    cache.remember(c)
+    assert cache.is_verified(a)
+    assert not cache.is_verified(b)
+
+
+@pytest.mark.asyncio
+async def test_activation_retry_skips_bcrypt(
+    client: AsyncClient, password_hasher, credential_cache
+):
+    await client.post(
+        "/users", json={"email": "user@example.com", "password": "Secure@pass123"}
+    )
+    auth = ("user@example.com", "Secure@pass123")
+    await client.post("/users/activate", json={"code": "0000"}, auth=auth)
+    calls_after_first = password_hasher.stats.calls
+
+    await client.post("/users/activate", json={"code": "0001"}, auth=auth)
+    assert password_hasher.stats.calls == calls_after_first
+    assert credential_cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_wrong_password_is_not_cached(
+    client: AsyncClient, password_hasher, credential_cache
+):
+    await client.post(
+        "/users", json={"email": "user@example.com", "password": "Secure@pass123"}
+    )
+    auth = ("user@example.com", "Wrong@pass1234")
+    for _ in range(2):
+        response = await client.post(
+            "/users/activate", json={"code": "0000"}, auth=auth
+        )
+        assert response.status_code == 401
+    assert len(credential_cache) == 0
+    assert credential_cache.stats.hits == 0
@@ -0,0 +1,136 @@
+import asyncpg
+import pytest
+import pytest_asyncio
+from aiosmtpd.controller import Controller
+
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.email_dispatcher import EmailDispatcher
+from app.services.email_service import EmailService
+from app.services.smtp_pool import SMTPConnectionPool
+
+
+async def _enqueue(db_pool: asyncpg.Pool, count: int = 1) -> None:
+    async with db_pool.acquire() as conn:
+        for i in range(count):
+            await OutboxRepository(conn).enqueue(
+                f"user{i}@example.com", "subject", "body"
+            )
+
+
+@pytest_asyncio.fixture
+async def unreachable_email_service():
+    # Nothing listens on port 1 locally: every connection attempt fails.
+    smtp_pool = SMTPConnectionPool(hostname="127.0.0.1", port=1, timeout=1)
+    yield EmailService(smtp_pool)
+    await smtp_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_sends_and_marks_sent(
+    db_pool: asyncpg.Pool, email_service: EmailService, smtp_server: Controller
+):
+    await _enqueue(db_pool, 3)
+    dispatcher = EmailDispatcher(db_pool, email_service)
+
+    assert await dispatcher.run_once() == 3
+    assert await dispatcher.run_once() == 0
+
+    assert len(smtp_server.handler.messages) == 3
+    async with db_pool.acquire() as conn:
+        pending = await conn.fetchval(
+            "SELECT COUNT(*) FROM email_outbox WHERE sent_at IS NULL"
+        )
+    assert pending == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_retries_with_backoff(
+    db_pool: asyncpg.Pool, unreachable_email_service: EmailService
+):
+    await _enqueue(db_pool)
+    dispatcher = EmailDispatcher(db_pool, unreachable_email_service, backoff_base=60)
+
+    assert await dispatcher.run_once() == 1
+    # Rescheduled into the future: nothing is due right now
+    assert await dispatcher.run_once() == 0
+
+    async with db_pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT attempts, last_error, sent_at,
+                   next_attempt_at > NOW() + INTERVAL '50 seconds' AS backed_off
+            FROM email_outbox
+            """
+        )
+    assert row["attempts"] == 1
+    assert row["last_error"]
+    assert row["sent_at"] is None
+    assert row["backed_off"] is True
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_gives_up_after_max_attempts(
+    db_pool: asyncpg.Pool, unreachable_email_service: EmailService
+):
+    await _enqueue(db_pool)
+    dispatcher = EmailDispatcher(
+        db_pool, unreachable_email_service, max_attempts=2, backoff_base=0
+    )
+
+    assert await dispatcher.run_once() == 1
+    assert await dispatcher.run_once() == 1
+    assert await dispatcher.run_once() == 0
+
+    async with db_pool.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT attempts, failed_at, last_error FROM email_outbox"
+        )
+    assert row["attempts"] == 2
+    assert row["failed_at"] is not None
+    assert row["last_error"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_fails_messages_abandoned_on_final_attempt(
+    db_pool: asyncpg.Pool, email_service: EmailService, smtp_server: Controller
+):
+    await _enqueue(db_pool, 2)
+    # Simulate dispatchers that claimed the last attempt and then died: one
+    # lease has expired, the other is still held.
+    async with db_pool.acquire() as conn:
+        outbox = OutboxRepository(conn)
+        [expired] = await outbox.claim_batch(1, max_attempts=1, lease_seconds=0)
+        [leased] = await outbox.claim_batch(1, max_attempts=1, lease_seconds=60)
+
+    dispatcher = EmailDispatcher(db_pool, email_service, max_attempts=1)
+    assert await dispatcher.run_once() == 0
+
+    async with db_pool.acquire() as conn:
+        rows = {
+            row["id"]: row
+            for row in await conn.fetch(
+                "SELECT id, failed_at, last_error FROM email_outbox"
+            )
+        }
+    assert rows[expired["id"]]["failed_at"] is not None
+    assert rows[expired["id"]]["last_error"]
+    assert rows[leased["id"]]["failed_at"] is None
+    assert not smtp_server.handler.messages
+
+
+@pytest.mark.asyncio
+async def test_drain_stops_polling_and_sends_everything_due(
+    db_pool: asyncpg.Pool, email_service: EmailService, smtp_server: Controller
+):
+    dispatcher = EmailDispatcher(db_pool, email_service, batch_size=2)
+    dispatcher.start()
+    await _enqueue(db_pool, 5)
+
+    await dispatcher.drain(timeout=10)
+    assert dispatcher._task is None
+    assert len(smtp_server.handler.messages) == 5
+    async with db_pool.acquire() as conn:
+        pending = await conn.fetchval(
+            "SELECT COUNT(*) FROM email_outbox WHERE sent_at IS NULL"
+        )
+    assert pending == 0
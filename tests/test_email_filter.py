@@ -0,0 +1,76 @@
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from app.metrics import DB_QUERY_DURATION
+from app.services.email_filter import BloomFilter, RegisteredEmailFilter
+
+PASSWORD = "Secure@pass123"
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=1_000, error_rate=0.01)
+    for i in range(1_000):
+        bloom.add(f"user{i}@example.com")
+    assert all(f"user{i}@example.com" in bloom for i in range(1_000))
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_refresh_picks_up_users_created_elsewhere(db_pool: asyncpg.Pool):
+    email_filter = RegisteredEmailFilter(db_pool, capacity=1_000)
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES ('a@example.com', 'x')"
+        )
+    assert await email_filter.refresh() == 1
+    assert email_filter.might_contain("a@example.com")
+
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES ('b@example.com', 'x')"
+        )
+    await email_filter.refresh()
+    assert email_filter.might_contain("b@example.com")
+
+
+@pytest.mark.asyncio
+async def test_availability_of_unknown_email_needs_no_query(client: AsyncClient):
+    lookups = DB_QUERY_DURATION.count("users.get_by_email")
+    response = await client.get(
+        "/users/availability", params={"email": "new@example.com"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"email": "new@example.com", "available": True}
+    assert DB_QUERY_DURATION.count("users.get_by_email") == lookups
+
+
+@pytest.mark.asyncio
+async def test_availability_after_registration(client: AsyncClient):
+    await client.post(
+        "/users", json={"email": "user@example.com", "password": PASSWORD}
+    )
+    response = await client.get(
+        "/users/availability", params={"email": "user@example.com"}
+    )
+    assert response.json()["available"] is False
+
+
+@pytest.mark.asyncio
+async def test_availability_rejects_invalid_email(client: AsyncClient):
+    response = await client.get("/users/availability", params={"email": "nope"})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_duplicate_registration_is_rejected_before_bcrypt(
+    client: AsyncClient, password_hasher
+):
+    payload = {"email": "user@example.com", "password": PASSWORD}
+    await client.post("/users", json=payload)
+    calls = password_hasher.stats.calls
+
+    response = await client.post("/users", json=payload)
+    assert response.status_code == 409
+    assert password_hasher.stats.calls == calls
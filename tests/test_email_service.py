@@ -0,0 +1,84 @@
+import pytest
+import pytest_asyncio
+from aiosmtpd.controller import Controller
+
+from app.services.email_service import EmailService
+from app.services.smtp_pool import SMTPConnectionPool
+
+
+@pytest_asyncio.fixture
+async def smtp_pool(smtp_server: Controller):
+    pool = SMTPConnectionPool(
+        hostname=smtp_server.hostname, port=smtp_server.port, max_size=2
+    )
+    yield pool
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_reused_across_calls(
+    smtp_pool: SMTPConnectionPool, smtp_server: Controller
+):
+    service = EmailService(smtp_pool)
+    for i in range(5):
+        assert await service.send_many(
+            [(f"user{i}@example.com", "subject", "body")]
+        ) == [None]
+
+    assert len(smtp_server.handler.messages) == 5
+    assert smtp_pool.connections_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_send_many_uses_one_session(
+    smtp_pool: SMTPConnectionPool, smtp_server: Controller
+):
+    service = EmailService(smtp_pool)
+    errors = await service.send_many(
+        [(f"user{i}@example.com", "subject", f"body {i}") for i in range(10)]
+    )
+
+    assert errors == [None] * 10
+    assert len(smtp_server.handler.messages) == 10
+    assert smtp_pool.connections_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_dropped_session_is_replaced(
+    smtp_pool: SMTPConnectionPool, smtp_server: Controller
+):
+    service = EmailService(smtp_pool)
+    await service.send_many([("user@example.com", "subject", "body")])
+    async with smtp_pool.acquire() as session:
+        session.close()  # simulate the server hanging up on an idle session
+
+    await service.send_many([("user@example.com", "subject", "body")])
+
+    assert len(smtp_server.handler.messages) == 2
+    assert smtp_pool.connections_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_idle_session_is_health_checked(smtp_server: Controller):
+    pool = SMTPConnectionPool(
+        hostname=smtp_server.hostname,
+        port=smtp_server.port,
+        health_check_interval=0,
+    )
+    service = EmailService(pool)
+    try:
+        await service.send_many([("user@example.com", "subject", "body")])
+        await service.send_many([("user@example.com", "subject", "body")])
+    finally:
+        await pool.close()
+
+    assert pool.connections_opened == 1
+    assert len(smtp_server.handler.messages) == 2
+
+
+@pytest.mark.asyncio
+async def test_session_returned_after_close_is_quit(smtp_pool: SMTPConnectionPool):
+    async with smtp_pool.acquire() as session:
+        await smtp_pool.close()
+
+    assert not session.is_connected
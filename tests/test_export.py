@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+
+from app.config import settings
+from app.exceptions.base import ServiceOverloadedError
+from app.services.export_service import ExportService
+
+TOKEN = "export-admin-token"
+HEADERS = {"X-Admin-Token": TOKEN}
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_api_token", TOKEN)
+
+
+@pytest_asyncio.fixture
+async def users(db_pool: asyncpg.Pool) -> list[str]:
+    """Five users a day apart: two active, the rest with pending, expired
+    and no activation codes."""
+    async with db_pool.acquire() as conn:
+        ids = []
+        for day, active in enumerate([True, False, True, False, False]):
+            ids.append(
+                await conn.fetchval(
+                    """
+                    INSERT INTO users (email, password_hash, is_active, created_at)
+                    VALUES ($1, 'x', $2, $3) RETURNING id
+                    """,
+                    f"user{day}@example.com",
+                    active,
+                    T0 + timedelta(days=day),
+                )
+            )
+        await conn.execute(
+            """
+            INSERT INTO activation_codes (user_id, code, expires_at, used_at)
+            VALUES ($1, '1111', NOW(), NOW()),
+                   ($2, '2222', NOW() + INTERVAL '1 minute', NULL),
+                   ($3, '3333', NOW() - INTERVAL '1 minute', NULL)
+            """,
+            ids[0],
+            ids[1],
+            ids[3],
+        )
+    return [f"user{day}@example.com" for day in range(5)]
+
+
+def ndjson(body: str) -> list[dict]:
+    return [json.loads(line) for line in body.splitlines()]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+async def test_export_requires_admin_token(client: AsyncClient, headers):
+    response = await client.get("/users/export", headers=headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_export_disabled_without_configured_token(
+    client: AsyncClient, monkeypatch
+):
+    monkeypatch.setattr(settings, "admin_api_token", None)
+    response = await client.get("/users/export", headers=HEADERS)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_in_keyset_order(client: AsyncClient, users):
+    response = await client.get("/users/export", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = ndjson(response.text)
+    assert [row["email"] for row in rows] == users
+    assert [row["code_status"] for row in rows] == [
+        "used",
+        "pending",
+        "none",
+        "expired",
+        "none",
+    ]
+    assert "password_hash" not in rows[0]
+
+
+@pytest.mark.asyncio
+async def test_export_filters(client: AsyncClient, users):
+    response = await client.get(
+        "/users/export", headers=HEADERS, params={"is_active": "false"}
+    )
+    assert [row["email"] for row in ndjson(response.text)] == [
+        users[1],
+        users[3],
+        users[4],
+    ]
+
+    response = await client.get(
+        "/users/export",
+        headers=HEADERS,
+        params={
+            "created_from": (T0 + timedelta(days=1)).isoformat(),
+            "created_to": (T0 + timedelta(days=3)).isoformat(),
+        },
+    )
+    assert [row["email"] for row in ndjson(response.text)] == users[1:3]
+
+
+@pytest.mark.asyncio
+async def test_export_keyset_pagination(client: AsyncClient, users):
+    seen: list[str] = []
+    params: dict = {"limit": 2}
+    while True:
+        response = await client.get("/users/export", headers=HEADERS, params=params)
+        rows = ndjson(response.text)
+        if not rows:
+            break
+        seen.extend(row["email"] for row in rows)
+        params = {
+            "limit": 2,
+            "after_created_at": rows[-1]["created_at"],
+            "after_id": rows[-1]["id"],
+        }
+    assert seen == users
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_half_a_cursor(client: AsyncClient):
+    response = await client.get(
+        "/users/export",
+        headers=HEADERS,
+        params={"after_created_at": T0.isoformat()},
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_export_csv(client: AsyncClient, users):
+    response = await client.get(
+        "/users/export", headers=HEADERS, params={"format": "csv", "limit": 2}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["email"] for row in rows] == users[:2]
+    assert rows[0]["is_active"] == "true"
+    assert rows[0]["created_at"] == T0.isoformat()
+    assert rows[1]["code_used_at"] == ""
+
+
+@pytest.mark.asyncio
+async def test_export_streams_in_batches(unit_of_work, users):
+    exporter = ExportService(unit_of_work, batch_size=2)
+    chunks = [chunk async for chunk in exporter.stream("ndjson")]
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+
+
+def test_export_refused_when_slots_are_taken(unit_of_work):
+    exporter = ExportService(unit_of_work, max_concurrent=0)
+    with pytest.raises(ServiceOverloadedError):
+        exporter.stream("ndjson")
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from app.exceptions.base import IdempotencyKeyReusedError
+from app.services.idempotency import RequestCoalescer
+from app.services.password_hasher import PasswordHasher
+from app.services.user_service import UserService
+
+PAYLOAD = {"email": "user@example.com", "password": "Secure@pass123"}
+KEY = {"Idempotency-Key": "3f0c9a52-retry-key"}
+
+
+async def _counts(db_pool: asyncpg.Pool) -> tuple[int, int, int]:
+    async with db_pool.acquire() as conn:
+        return tuple(
+            [
+                await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+                for table in ("users", "activation_codes", "email_outbox")
+            ]
+        )
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_stored_response(
+    client: AsyncClient, db_pool: asyncpg.Pool, password_hasher: PasswordHasher
+):
+    first = await client.post("/users", json=PAYLOAD, headers=KEY)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+    calls = password_hasher.stats.calls
+
+    retry = await client.post("/users", json=PAYLOAD, headers=KEY)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert password_hasher.stats.calls == calls
+    assert await _counts(db_pool) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_key_reused_for_another_email_is_rejected(client: AsyncClient):
+    await client.post("/users", json=PAYLOAD, headers=KEY)
+    response = await client.post(
+        "/users",
+        json={**PAYLOAD, "email": "other@example.com"},
+        headers=KEY,
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_without_key_a_retry_is_a_conflict(client: AsyncClient):
+    await client.post("/users", json=PAYLOAD)
+    response = await client.post("/users", json=PAYLOAD)
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_not_stored(client: AsyncClient):
+    await client.post("/users", json=PAYLOAD)
+    response = await client.post("/users", json=PAYLOAD, headers=KEY)
+    assert response.status_code == 409
+    response = await client.post("/users", json=PAYLOAD, headers=KEY)
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_coalesce(
+    client: AsyncClient, db_pool: asyncpg.Pool, password_hasher: PasswordHasher
+):
+    responses = await asyncio.gather(
+        *(client.post("/users", json=PAYLOAD, headers=KEY) for _ in range(5))
+    )
+    assert [r.status_code for r in responses] == [201] * 5
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sum("Idempotent-Replayed" in r.headers for r in responses) == 4
+    assert password_hasher.stats.calls == 1
+    assert await _counts(db_pool) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_duplicates_on_separate_workers_converge(
+    unit_of_work, password_hasher: PasswordHasher, db_pool: asyncpg.Pool
+):
+    # No shared coalescer, as with two processes: both executions run and
+    # the one that loses the insert replays the winner's response.
+    services = [UserService(unit_of_work, password_hasher) for _ in range(2)]
+    results = await asyncio.gather(
+        *(
+            service.register_idempotent(
+                "key", PAYLOAD["email"], PAYLOAD["password"]
+            )
+            for service in services
+        )
+    )
+    assert len({str(payload["id"]) for payload, _ in results}) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+    assert await _counts(db_pool) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_coalescer_rejects_a_different_request_in_flight():
+    coalescer = RequestCoalescer()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(coalescer.run("key", "a", slow))
+    await asyncio.sleep(0)
+    with pytest.raises(IdempotencyKeyReusedError):
+        await coalescer.run("key", "b", slow)
+
+    release.set()
+    assert await first == ("done", False)
+    assert len(coalescer) == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_callers_share_the_error():
+    coalescer = RequestCoalescer()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(coalescer.run("key", "a", failing) for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(coalescer) == 0
+
+
+def test_keyed_digest_is_stable_per_process_and_unpredictable():
+    coalescer = RequestCoalescer()
+    digest = coalescer.keyed_digest("user@example.com", "Secure@pass123")
+
+    assert coalescer.keyed_digest("user@example.com", "Secure@pass123") == digest
+    assert coalescer.keyed_digest("user@example.com", "Other@pass1234") != digest
+    assert RequestCoalescer().keyed_digest(
+        "user@example.com", "Secure@pass123"
+    ) != digest
+    assert digest != hashlib.sha256(
+        b"user@example.com\0Secure@pass123"
+    ).hexdigest()
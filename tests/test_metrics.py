@@ -0,0 +1,61 @@
+import pytest
+from httpx import AsyncClient
+
+from app.metrics import REGISTRY, Counter, Histogram, Registry
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    REGISTRY.reset()
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry(enabled=True)
+    histogram = Histogram(
+        "job_seconds",
+        "Job time.",
+        labels=("kind",),
+        buckets=(0.1, 1.0),
+        registry=registry,
+    )
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5.0, "a")
+
+    assert registry.render().splitlines() == [
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{kind="a",le="0.1"} 1',
+        'job_seconds_bucket{kind="a",le="1.0"} 2',
+        'job_seconds_bucket{kind="a",le="+Inf"} 3',
+        'job_seconds_sum{kind="a"} 5.55',
+        'job_seconds_count{kind="a"} 3',
+    ]
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry(enabled=False)
+    counter = Counter("events_total", "Events.", registry=registry)
+    counter.inc()
+    assert registry.render().splitlines()[2:] == []
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_hot_paths(client: AsyncClient):
+    await client.post(
+        "/users", json={"email": "user@example.com", "password": "Secure@pass123"}
+    )
+    await client.get("/nowhere")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="POST",handler="register_user",'
+        'status="201"} 1'
+    ) in body
+    assert 'handler="unmatched",status="404"' in body
+    assert 'db_query_duration_seconds_count{statement="users.create"} 1' in body
+    assert 'password_hash_duration_seconds_count{operation="hash"} 1' in body
+    assert 'db_pool_connections{state="max"}' in body
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import re
+
+import asyncpg
+import pytest
+
+from app import migrate
+from app.config import settings
+from app.database import (
+    pending_migrations,
+    run_migrations,
+    run_migrations_standalone,
+    split_statements,
+)
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    (tmp_path / "900_test_a.sql").write_text(
+        "CREATE TABLE migrate_test_a (id INTEGER); SELECT pg_sleep(0.2);"
+    )
+    (tmp_path / "901_test_b.sql").write_text(
+        "CREATE TABLE migrate_test_b (id INTEGER);"
+    )
+    return str(tmp_path)
+
+
+@pytest.fixture(autouse=True)
+async def cleanup(db_pool: asyncpg.Pool):
+    yield
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            "DROP TABLE IF EXISTS migrate_test_a, migrate_test_b, migrate_test_c"
+        )
+        await conn.execute(
+            "DELETE FROM schema_migrations WHERE version LIKE '90%_test_%'"
+        )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_runners_apply_each_migration_once(migrations_dir):
+    pools = [
+        await asyncpg.create_pool(settings.database_url, min_size=1, max_size=1)
+        for _ in range(3)
+    ]
+    try:
+        results = await asyncio.gather(
+            *(run_migrations(pool, migrations_dir) for pool in pools)
+        )
+    finally:
+        for pool in pools:
+            await pool.close()
+
+    assert sorted(results) == [[], [], ["900_test_a.sql", "901_test_b.sql"]]
+
+
+@pytest.mark.asyncio
+async def test_up_to_date_schema_returns_without_locking(
+    db_pool: asyncpg.Pool, migrations_dir
+):
+    await run_migrations(db_pool, migrations_dir)
+
+    async with db_pool.acquire() as holder:
+        # Another process holding the lock must not delay a no-op startup.
+        await holder.execute("SELECT pg_advisory_lock(7246118539120001)")
+        try:
+            applied = await asyncio.wait_for(
+                run_migrations(db_pool, migrations_dir), timeout=1
+            )
+        finally:
+            await holder.execute("SELECT pg_advisory_unlock(7246118539120001)")
+    assert applied == []
+
+
+@pytest.mark.asyncio
+async def test_migrate_command_check_and_apply(
+    db_pool: asyncpg.Pool, migrations_dir, capsys
+):
+    assert await migrate.main(migrations_dir, check=True) == 1
+    assert "pending: 900_test_a.sql" in capsys.readouterr().out
+
+    assert await migrate.main(migrations_dir) == 0
+    async with db_pool.acquire() as conn:
+        assert await pending_migrations(conn, migrations_dir) == []
+    assert await migrate.main(migrations_dir, check=True) == 0
+
+
+@pytest.mark.asyncio
+async def test_standalone_runner_uses_its_own_connection(migrations_dir):
+    assert await run_migrations_standalone(migrations_dir=migrations_dir) == [
+        "900_test_a.sql",
+        "901_test_b.sql",
+    ]
+    assert await run_migrations_standalone(migrations_dir=migrations_dir) == []
+
+
+def test_split_statements_ignores_quoted_and_commented_semicolons():
+    sql = """
+    -- migrate: no-transaction
+    CREATE INDEX CONCURRENTLY a ON t (x);
+    /* ; */ SELECT 'a;''b', "c;d";
+    CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;
+    -- trailing comment;
+    """
+    assert split_statements(sql) == [
+        "CREATE INDEX CONCURRENTLY a ON t (x)",
+        "SELECT 'a;''b', \"c;d\"",
+        "CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql",
+    ]
+
+
+_CREATE_TABLE = re.compile(
+    r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)", re.I
+)
+_BLOCKING_INDEX = re.compile(
+    r"^\s*(?:CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?!CONCURRENTLY\b)"
+    r"(?:IF\s+NOT\s+EXISTS\s+)?[\w.]+\s+ON\s+(?:ONLY\s+)?([\w.]+)"
+    r"|DROP\s+INDEX\s+(?!CONCURRENTLY\b))",
+    re.I,
+)
+
+
+def test_index_changes_on_existing_tables_do_not_block_writes():
+    # A plain CREATE/DROP INDEX locks writes out of the table for the whole
+    # build; only a table created by the same file is known to be empty.
+    blocking = []
+    for name in sorted(os.listdir("migrations")):
+        with open(os.path.join("migrations", name)) as f:
+            statements = split_statements(f.read())
+        created = {
+            match[1] for match in map(_CREATE_TABLE.match, statements) if match
+        }
+        for statement in statements:
+            match = _BLOCKING_INDEX.match(statement)
+            if match and match[1] not in created:
+                blocking.append((name, statement.splitlines()[0]))
+    assert blocking == []
+
+
+@pytest.fixture
+def online_migration(tmp_path, db_pool: asyncpg.Pool):
+    (tmp_path / "902_test_online.sql").write_text(
+        "-- migrate: no-transaction\n"
+        "CREATE TABLE IF NOT EXISTS migrate_test_c (id INTEGER);\n"
+        "INSERT INTO migrate_test_c VALUES (1), (1);\n"
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_c_id\n"
+        "    ON migrate_test_c (id);\n"
+    )
+    return str(tmp_path)
+
+
+async def _progress(conn: asyncpg.Connection) -> asyncpg.Record:
+    return await conn.fetchrow(
+        """
+        SELECT applied_at IS NOT NULL AS applied, statements_done
+        FROM schema_migrations WHERE version = '902_test_online.sql'
+        """
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_concurrent_index_is_dropped_and_resumed(
+    db_pool: asyncpg.Pool, online_migration, monkeypatch
+):
+    monkeypatch.setattr(settings, "database_migration_index_retries", 1)
+    with pytest.raises(asyncpg.UniqueViolationError):
+        await run_migrations(db_pool, online_migration)
+
+    async with db_pool.acquire() as conn:
+        progress = await _progress(conn)
+        assert not progress["applied"]
+        assert progress["statements_done"] == 2
+        assert await conn.fetchval("SELECT to_regclass('migrate_test_c_id')") is None
+        assert await pending_migrations(conn, online_migration) == [
+            "902_test_online.sql"
+        ]
+        # Fix the data; the rerun must not insert the duplicate again.
+        await conn.execute("DELETE FROM migrate_test_c")
+        await conn.execute("INSERT INTO migrate_test_c VALUES (1)")
+
+    assert await run_migrations(db_pool, online_migration) == [
+        "902_test_online.sql"
+    ]
+    async with db_pool.acquire() as conn:
+        progress = await _progress(conn)
+        assert progress["applied"]
+        assert progress["statements_done"] == 3
+        assert await conn.fetchval(
+            "SELECT indisvalid FROM pg_index"
+            " WHERE indexrelid = to_regclass('migrate_test_c_id')"
+        )
+        assert await conn.fetchval("SELECT COUNT(*) FROM migrate_test_c") == 1
+
+
+@pytest.mark.asyncio
+async def test_lock_waiters_do_not_block_a_concurrent_index_build(tmp_path):
+    # The other runners wait for the lock meanwhile; they must not hold a
+    # snapshot the index build would wait for.
+    (tmp_path / "902_test_online.sql").write_text(
+        "-- migrate: no-transaction\n"
+        "CREATE TABLE IF NOT EXISTS migrate_test_c (id INTEGER);\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_c_id\n"
+        "    ON migrate_test_c (id);\n"
+    )
+    pools = [
+        await asyncpg.create_pool(settings.database_url, min_size=1, max_size=1)
+        for _ in range(3)
+    ]
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                *(run_migrations(pool, str(tmp_path)) for pool in pools)
+            ),
+            timeout=10,
+        )
+    finally:
+        for pool in pools:
+            await pool.close()
+    assert sorted(results) == [[], [], ["902_test_online.sql"]]
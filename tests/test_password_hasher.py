@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.exceptions.base import ServiceOverloadedError
+from app.services.password_hasher import (
+    PasswordHasher,
+    calibrate_rounds,
+    hash_rounds,
+)
+
+
+@pytest.mark.asyncio
+async def test_hash_then_verify(password_hasher: PasswordHasher):
+    password_hash = await password_hasher.hash("Secure@pass123")
+    assert await password_hasher.verify("Secure@pass123", password_hash) is True
+    assert await password_hasher.verify("WrongPass@999", password_hash) is False
+    assert password_hasher.stats.calls == 3
+    assert password_hasher.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_saturated_hasher_rejects_fast():
+    hasher = PasswordHasher(ThreadPoolExecutor(max_workers=1), max_pending=1)
+    try:
+        results = await asyncio.gather(
+            hasher.hash("Secure@pass123"),
+            hasher.hash("Secure@pass123"),
+            return_exceptions=True,
+        )
+    finally:
+        hasher.close()
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], ServiceOverloadedError)
+    assert hasher.stats.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_register_returns_503_with_retry_after_when_saturated(
+    client, password_hasher: PasswordHasher, monkeypatch
+):
+    monkeypatch.setattr(password_hasher, "_max_pending", 0)
+    response = await client.post(
+        "/users",
+        json={"email": "user@example.com", "password": "Secure@pass123"},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_keeps_slot_until_job_finishes():
+    hasher = PasswordHasher(ThreadPoolExecutor(max_workers=1), max_pending=1)
+    try:
+        task = asyncio.create_task(hasher.hash("Secure@pass123"))
+        await asyncio.sleep(0.01)  # let bcrypt start in the worker
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # bcrypt is still running: the slot is not free yet
+        assert hasher.pending == 1
+        with pytest.raises(ServiceOverloadedError):
+            await hasher.hash("Secure@pass123")
+
+        while hasher.pending:
+            await asyncio.sleep(0.01)
+        assert isinstance(await hasher.hash("Secure@pass123"), str)
+    finally:
+        hasher.close()
+
+
+@pytest.mark.asyncio
+async def test_hashes_use_the_configured_cost():
+    hasher = PasswordHasher(ThreadPoolExecutor(max_workers=1), 4, rounds=5)
+    try:
+        password_hash = await hasher.hash("Secure@pass123")
+    finally:
+        hasher.close()
+    assert password_hash.startswith("$2b$05$")
+    assert hash_rounds(password_hash) == 5
+    assert not hasher.needs_rehash(password_hash)
+    assert hasher.needs_rehash(password_hash.replace("$05$", "$12$", 1))
+
+
+def test_rejects_cost_outside_bcrypt_limits():
+    with pytest.raises(ValueError):
+        PasswordHasher(ThreadPoolExecutor(max_workers=1), 4, rounds=3)
+
+
+def test_calibration_stops_past_the_target():
+    best, measurements = calibrate_rounds(target_seconds=0.02, max_rounds=10)
+    costs = [rounds for rounds, _ in measurements]
+    assert costs == list(range(4, len(costs) + 4))
+    assert all(seconds <= 0.02 for rounds, seconds in measurements if rounds <= best)
+    if costs[-1] != best:
+        assert measurements[-1][1] > 0.02
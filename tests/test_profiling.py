@@ -0,0 +1,42 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from app.profiling import PhaseTimer, import_times
+
+
+@pytest.mark.asyncio
+async def test_phase_timer_records_overlapping_phases():
+    timer = PhaseTimer()
+    await asyncio.gather(
+        timer.measure("slow", asyncio.sleep(0.05)),
+        timer.measure("fast", asyncio.sleep(0.01)),
+    )
+    with timer.phase("sync"):
+        pass
+
+    assert [phase.name for phase in timer.phases] == ["fast", "slow", "sync"]
+    fast, slow, _ = timer.phases
+    assert slow.duration >= 0.05
+    assert fast.started < slow.started + slow.duration
+    assert timer.elapsed < 0.05 + 0.01 + 0.5
+
+
+def test_import_times_groups_by_package():
+    times = import_times("app.config")
+    assert {"app", "pydantic_settings"} <= times.keys()
+    assert list(times.values()) == sorted(times.values(), reverse=True)
+
+
+def test_app_main_defers_rarely_used_imports():
+    code = (
+        "import sys, app.main; "
+        "print([m for m in ('httpx', 'aiosmtplib', 'multiprocessing') "
+        "if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
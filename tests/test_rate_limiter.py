@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.exceptions.base import TooManyRequestsError
+from app.services.rate_limiter import InMemoryRateLimitBackend, RateLimit, RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_then_reports_wait():
+    backend = InMemoryRateLimitBackend()
+    limit = RateLimit(capacity=2, per_second=0.5)
+    assert await backend.take("k", limit) == 0
+    assert await backend.take("k", limit) == 0
+    assert await backend.take("k", limit) == pytest.approx(2.0, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_bucket_refills_over_time():
+    backend = InMemoryRateLimitBackend()
+    limit = RateLimit(capacity=1, per_second=50)
+    assert await backend.take("k", limit) == 0
+    assert await backend.take("k", limit) > 0
+    await asyncio.sleep(0.05)
+    assert await backend.take("k", limit) == 0
+
+
+@pytest.mark.asyncio
+async def test_backend_evicts_refilled_and_coldest_buckets():
+    backend = InMemoryRateLimitBackend(max_keys=2)
+    slow = RateLimit(capacity=5, per_second=0.001)
+    for key in ("a", "b", "c"):
+        await backend.take(key, slow)
+    assert len(backend) == 2
+
+    fast = RateLimit(capacity=1, per_second=1000)
+    backend = InMemoryRateLimitBackend()
+    await backend.take("x", fast)
+    await asyncio.sleep(0.01)
+    await backend.take("y", slow)
+    assert len(backend) == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_raises_with_retry_after():
+    limiter = RateLimiter(InMemoryRateLimitBackend())
+    limit = RateLimit(capacity=1, per_second=0.1)
+    await limiter.check("scope", "id", limit)
+    with pytest.raises(TooManyRequestsError) as exc_info:
+        await limiter.check("scope", "id", limit)
+    assert exc_info.value.retry_after == 10
+    # Other identities and scopes have their own buckets.
+    await limiter.check("scope", "other", limit)
+    await limiter.check("other-scope", "id", limit)
+
+
+@pytest.mark.asyncio
+async def test_disabled_limiter_allows_everything():
+    limiter = RateLimiter(InMemoryRateLimitBackend(), enabled=False)
+    limit = RateLimit(capacity=1, per_second=0.1)
+    for _ in range(3):
+        await limiter.check("scope", "id", limit)
+
+
+@pytest.mark.asyncio
+async def test_activation_guessing_is_throttled_before_bcrypt(
+    client: AsyncClient, password_hasher
+):
+    await client.post(
+        "/users", json={"email": "user@example.com", "password": "Secure@pass123"}
+    )
+    for _ in range(5):
+        response = await client.post(
+            "/users/activate",
+            json={"code": "0000"},
+            auth=("user@example.com", "Secure@pass123"),
+        )
+        assert response.status_code in (422, 200)
+
+    calls_before = password_hasher.stats.calls
+    response = await client.post(
+        "/users/activate",
+        json={"code": "0000"},
+        auth=("USER@example.com", "Secure@pass123"),
+    )
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert password_hasher.stats.calls == calls_before
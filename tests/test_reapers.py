@@ -0,0 +1,83 @@
+import asyncpg
+import pytest
+
+from app.services.reapers import CodeReaper, IdempotencyKeyReaper, OutboxReaper
+
+
+async def _create_codes(db_pool: asyncpg.Pool, expired: int, fresh: int) -> None:
+    async with db_pool.acquire() as conn:
+        user_id = await conn.fetchval(
+            "INSERT INTO users (email, password_hash) VALUES ($1, 'x') RETURNING id",
+            "user@example.com",
+        )
+        await conn.executemany(
+            """
+            INSERT INTO activation_codes (user_id, code, expires_at)
+            VALUES ($1, '0000', NOW() + make_interval(secs => $2))
+            """,
+            [(user_id, -7200.0)] * expired + [(user_id, 60.0)] * fresh,
+        )
+
+
+@pytest.mark.asyncio
+async def test_reaper_deletes_codes_past_retention_in_batches(db_pool: asyncpg.Pool):
+    await _create_codes(db_pool, expired=7, fresh=2)
+    reaper = CodeReaper(db_pool, retention_seconds=3600, batch_size=3)
+
+    assert await reaper.run_once() == 7
+    assert await reaper.run_once() == 0
+
+    async with db_pool.acquire() as conn:
+        remaining = await conn.fetchval("SELECT COUNT(*) FROM activation_codes")
+    assert remaining == 2
+
+
+@pytest.mark.asyncio
+async def test_reaper_keeps_codes_within_retention(db_pool: asyncpg.Pool):
+    await _create_codes(db_pool, expired=3, fresh=0)
+    reaper = CodeReaper(db_pool, retention_seconds=86_400)
+
+    assert await reaper.run_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_reaper_deletes_only_finished_messages(db_pool: asyncpg.Pool):
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO email_outbox (recipient, subject, body, sent_at, failed_at)
+            VALUES ('a@example.com', 's', 'b', NOW() - INTERVAL '2 hours', NULL),
+                   ('b@example.com', 's', 'b', NULL, NOW() - INTERVAL '2 hours'),
+                   ('c@example.com', 's', 'b', NOW(), NULL),
+                   ('d@example.com', 's', 'b', NULL, NULL)
+            """
+        )
+    reaper = OutboxReaper(db_pool, retention_seconds=3600, batch_size=1)
+
+    assert await reaper.run_once() == 2
+
+    async with db_pool.acquire() as conn:
+        remaining = await conn.fetch("SELECT recipient FROM email_outbox")
+    assert sorted(r["recipient"] for r in remaining) == [
+        "c@example.com",
+        "d@example.com",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_idempotency_reaper_deletes_keys_past_ttl(db_pool: asyncpg.Pool):
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO idempotency_keys (key, fingerprint, response, created_at)
+            VALUES ('old', 'f', '{}', NOW() - INTERVAL '2 hours'),
+                   ('new', 'f', '{}', NOW())
+            """
+        )
+    reaper = IdempotencyKeyReaper(db_pool, retention_seconds=3600)
+
+    assert await reaper.run_once() == 1
+
+    async with db_pool.acquire() as conn:
+        remaining = await conn.fetch("SELECT key FROM idempotency_keys")
+    assert [r["key"] for r in remaining] == ["new"]
@@ -1,9 +1,10 @@
-from unittest.mock import AsyncMock, patch
-
+import asyncpg
 import pytest
-from aiosmtplib import SMTPException
+from asyncpg import Connection
 from httpx import AsyncClient
 
+from app.repositories.unit_of_work import UnitOfWork
+
 
 @pytest.mark.asyncio
 async def test_register_returns_201(client: AsyncClient):
@@ -19,18 +20,23 @@ async def test_register_returns_201(client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_register_returns_503_on_sending_email_error(client: AsyncClient):
-
-    with patch(
-        "app.services.email_service.send", new_callable=AsyncMock
-    ) as mock_email_send:
-        mock_email_send.side_effect = SMTPException("")
-        response = await client.post(
-            "/users",
-            json={"email": "user@example.com", "password": "Secure@pass123"},
+async def test_register_queues_activation_email(
+    client: AsyncClient, db_pool: asyncpg.Pool
+):
+    response = await client.post(
+        "/users",
+        json={"email": "user@example.com", "password": "Secure@pass123"},
+    )
+    assert response.status_code == 201
+
+    async with db_pool.acquire() as conn:
+        code = await conn.fetchval("SELECT code FROM activation_codes")
+        message = await conn.fetchrow(
+            "SELECT recipient, body, sent_at FROM email_outbox"
         )
-    assert response.status_code == 503
-    assert response.json()["detail"] == "Failed to send email, please try again later"
+    assert message["recipient"] == "user@example.com"
+    assert code in message["body"]
+    assert message["sent_at"] is None
 
 
 @pytest.mark.asyncio
@@ -68,3 +74,48 @@ async def test_register_weak_password_returns_422(client: AsyncClient, password,
     )
     assert response.status_code == 422
     assert error in response.json()["detail"][0]["ctx"]["error"]
+
+
+@pytest.mark.asyncio
+async def test_register_hashes_before_opening_transaction(
+    client: AsyncClient,
+    db_pool: asyncpg.Pool,
+    unit_of_work: UnitOfWork,
+    password_hasher,
+    monkeypatch,
+):
+    # Only look at sessions this request checked out, so other databases
+    # and other clients of the same database can't make the test flaky.
+    request_pids = []
+    original_acquire = unit_of_work._acquire
+
+    async def tracking_acquire(pool: asyncpg.Pool) -> Connection:
+        conn = await original_acquire(pool)
+        request_pids.append(conn.get_server_pid())
+        return conn
+
+    open_transactions = []
+    original_hash = password_hasher.hash
+
+    async def spy_hash(password: str) -> str:
+        async with db_pool.acquire() as conn:
+            open_transactions.append(
+                await conn.fetchval(
+                    """
+                    SELECT COUNT(*) FROM pg_stat_activity
+                    WHERE pid = ANY($1::int[])
+                      AND state = 'idle in transaction'
+                    """,
+                    request_pids,
+                )
+            )
+        return await original_hash(password)
+
+    monkeypatch.setattr(unit_of_work, "_acquire", tracking_acquire)
+    monkeypatch.setattr(password_hasher, "hash", spy_hash)
+    response = await client.post(
+        "/users",
+        json={"email": "user@example.com", "password": "Secure@pass123"},
+    )
+    assert response.status_code == 201
+    assert open_transactions == [0]
@@ -0,0 +1,104 @@
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from app.services.user_service import UserService
+
+PASSWORD = "Secure@pass123"
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_creates_users_codes_and_emails(
+    client: AsyncClient, db_pool: asyncpg.Pool
+):
+    users = [{"email": f"user{i}@example.com", "password": PASSWORD} for i in range(5)]
+    response = await client.post("/users/bulk", json={"users": users})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 5
+    assert [r["status"] for r in data["results"]] == ["created"] * 5
+    assert [r["index"] for r in data["results"]] == list(range(5))
+
+    async with db_pool.acquire() as conn:
+        codes = await conn.fetch(
+            """
+            SELECT u.email, ac.code FROM activation_codes ac
+            JOIN users u ON u.id = ac.user_id
+            """
+        )
+        bodies = {
+            r["recipient"]: r["body"]
+            for r in await conn.fetch("SELECT recipient, body FROM email_outbox")
+        }
+    assert len(codes) == 5
+    for row in codes:
+        assert row["code"] in bodies[row["email"]]
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_reports_rows_individually(client: AsyncClient):
+    await client.post(
+        "/users", json={"email": "taken@example.com", "password": PASSWORD}
+    )
+
+    response = await client.post(
+        "/users/bulk",
+        json={
+            "users": [
+                {"email": "new@example.com", "password": PASSWORD},
+                {"email": "taken@example.com", "password": PASSWORD},
+                {"email": "not-an-email", "password": PASSWORD},
+                {"email": "weak@example.com", "password": "short"},
+                {"email": "new@example.com", "password": PASSWORD},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == [
+        "created",
+        "duplicate",
+        "invalid",
+        "invalid",
+        "duplicate",
+    ]
+    assert results[0]["id"] is not None
+    assert results[1]["id"] is None
+    assert "12 characters" in results[3]["errors"][0]
+    assert response.json()["created"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_skips_hashing_known_emails(
+    client: AsyncClient, password_hasher
+):
+    await client.post(
+        "/users", json={"email": "taken@example.com", "password": PASSWORD}
+    )
+    calls_before = password_hasher.stats.calls
+
+    response = await client.post(
+        "/users/bulk",
+        json={"users": [{"email": "taken@example.com", "password": PASSWORD}]},
+    )
+    assert response.json()["results"][0]["status"] == "duplicate"
+    assert password_hasher.stats.calls == calls_before
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_commits_in_batches(
+    unit_of_work, password_hasher, db_pool: asyncpg.Pool
+):
+    service = UserService(unit_of_work, password_hasher)
+    users = [(f"user{i}@example.com", PASSWORD) for i in range(7)]
+    created = await service.register_many(users, batch_size=3)
+    assert [user["email"] for user in created] == [email for email, _ in users]
+
+    async with db_pool.acquire() as conn:
+        assert await conn.fetchval("SELECT COUNT(*) FROM email_outbox") == 7
+
+
+@pytest.mark.asyncio
+async def test_bulk_register_rejects_empty_list(client: AsyncClient):
+    response = await client.post("/users/bulk", json={"users": []})
+    assert response.status_code == 422
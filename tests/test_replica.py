@@ -0,0 +1,92 @@
+import asyncpg
+import pytest
+import pytest_asyncio
+from fastapi.security import HTTPBasicCredentials
+
+from app.config import settings
+from app.repositories.replica import ReplicaMonitor
+from app.repositories.unit_of_work import UnitOfWork
+from app.services.user_service import UserService
+
+PASSWORD = "Secure@pass123"
+
+
+@pytest_asyncio.fixture
+async def lagging_replica(db_pool: asyncpg.Pool):
+    """A pool that behaves like a replica which has not caught up yet.
+
+    Its connections resolve `users` to an empty copy of the table in another
+    schema, so every lookup misses rows written through the primary.
+    """
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            """
+            DROP SCHEMA IF EXISTS lagging_replica CASCADE;
+            CREATE SCHEMA lagging_replica;
+            CREATE TABLE lagging_replica.users (LIKE public.users INCLUDING ALL);
+            """
+        )
+    pool = await asyncpg.create_pool(
+        settings.database_url,
+        min_size=1,
+        max_size=2,
+        server_settings={"search_path": "lagging_replica, public"},
+    )
+    yield pool
+    await pool.close()
+    async with db_pool.acquire() as conn:
+        await conn.execute("DROP SCHEMA lagging_replica CASCADE")
+
+
+@pytest.mark.asyncio
+async def test_monitor_reports_healthy_within_lag_threshold(lagging_replica):
+    monitor = ReplicaMonitor(lagging_replica, max_lag_seconds=5)
+    assert await monitor.check() is True
+    assert monitor.lag_seconds == 0
+
+
+@pytest.mark.asyncio
+async def test_monitor_reports_unreachable_replica():
+    pool = await asyncpg.create_pool(settings.database_url, min_size=0, max_size=1)
+    await pool.close()
+    monitor = ReplicaMonitor(pool, interval=0.5)
+    assert await monitor.check() is False
+    assert monitor.lag_seconds is None
+
+
+@pytest.mark.asyncio
+async def test_read_connection_routes_by_replica_health(
+    db_pool: asyncpg.Pool, lagging_replica
+):
+    monitor = ReplicaMonitor(lagging_replica)
+    uow = UnitOfWork(db_pool, replica=monitor)
+
+    async def search_path() -> str:
+        async with uow.read_connection() as conn:
+            return await conn.fetchval("SHOW search_path")
+
+    assert await search_path() != "lagging_replica, public"
+    await monitor.check()
+    assert await search_path() == "lagging_replica, public"
+    monitor.mark_down("test")
+    assert await search_path() != "lagging_replica, public"
+
+
+@pytest.mark.asyncio
+async def test_activation_confirms_replica_miss_on_primary(
+    db_pool: asyncpg.Pool, lagging_replica, password_hasher
+):
+    monitor = ReplicaMonitor(lagging_replica)
+    await monitor.check()
+    service = UserService(UnitOfWork(db_pool, replica=monitor), password_hasher)
+    user = await service.register("user@example.com", PASSWORD)
+
+    async with db_pool.acquire() as conn:
+        code = await conn.fetchval(
+            "SELECT code FROM activation_codes WHERE user_id = $1", user["id"]
+        )
+    credentials = HTTPBasicCredentials(username=user["email"], password=PASSWORD)
+    await service.activate(credentials, code)
+
+    async with db_pool.acquire() as conn:
+        assert await conn.fetchval("SELECT is_active FROM users") is True
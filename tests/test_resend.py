@@ -0,0 +1,131 @@
+import asyncio
+
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from app.routers.users import _resend_link_limit
+from app.services.password_hasher import PasswordHasher
+
+_EMAIL = "user@example.com"
+_PASSWORD = "Secure@pass123"
+_AUTH = (_EMAIL, _PASSWORD)
+
+
+async def _register(client: AsyncClient) -> None:
+    await client.post("/users", json={"email": _EMAIL, "password": _PASSWORD})
+
+
+async def _age_codes(
+    db_pool: asyncpg.Pool, sent_ago: float, expires_in: float = 60
+) -> None:
+    """Pretend the user's codes were sent `sent_ago` seconds ago."""
+    async with db_pool.acquire() as conn:
+        await conn.execute(
+            """
+            UPDATE activation_codes
+            SET last_sent_at = NOW() - make_interval(secs => $1),
+                expires_at = NOW() + make_interval(secs => $2)
+            """,
+            sent_ago,
+            expires_in,
+        )
+
+
+async def _codes_and_emails(db_pool: asyncpg.Pool) -> tuple[list[str], list[str]]:
+    async with db_pool.acquire() as conn:
+        codes = await conn.fetch(
+            "SELECT code FROM activation_codes ORDER BY created_at"
+        )
+        emails = await conn.fetch("SELECT body FROM email_outbox ORDER BY created_at")
+    return [row["code"] for row in codes], [row["body"] for row in emails]
+
+
+@pytest.mark.asyncio
+async def test_resend_reuses_a_valid_code(client: AsyncClient, db_pool: asyncpg.Pool):
+    await _register(client)
+    await _age_codes(db_pool, sent_ago=60)
+
+    response = await client.post("/users/activate/resend", auth=_AUTH)
+    assert response.status_code == 202
+    codes, emails = await _codes_and_emails(db_pool)
+    assert len(codes) == 1
+    assert len(emails) == 2
+    assert codes[0] in emails[1]
+
+
+@pytest.mark.asyncio
+async def test_resend_issues_a_new_code_near_expiry(
+    client: AsyncClient, db_pool: asyncpg.Pool
+):
+    await _register(client)
+    await _age_codes(db_pool, sent_ago=60, expires_in=5)
+
+    response = await client.post("/users/activate/resend", auth=_AUTH)
+    assert response.status_code == 202
+    codes, emails = await _codes_and_emails(db_pool)
+    assert len(codes) == 2
+    assert codes[1] in emails[1]
+
+    response = await client.post(
+        "/users/activate", json={"code": codes[1]}, auth=_AUTH
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_resend_within_cooldown_returns_429(
+    client: AsyncClient, db_pool: asyncpg.Pool
+):
+    await _register(client)
+    response = await client.post("/users/activate/resend", auth=_AUTH)
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 30
+    _, emails = await _codes_and_emails(db_pool)
+    assert len(emails) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_resends_coalesce(
+    client: AsyncClient, db_pool: asyncpg.Pool, password_hasher: PasswordHasher
+):
+    await _register(client)
+    await _age_codes(db_pool, sent_ago=60)
+    calls = password_hasher.stats.calls
+
+    responses = await asyncio.gather(
+        *(client.post("/users/activate/resend", auth=_AUTH) for _ in range(5))
+    )
+    assert [r.status_code for r in responses] == [202] * 5
+    assert password_hasher.stats.calls == calls + 1
+    _, emails = await _codes_and_emails(db_pool)
+    assert len(emails) == 2
+
+
+@pytest.mark.asyncio
+async def test_resend_wrong_password_returns_401(client: AsyncClient):
+    await _register(client)
+    response = await client.post(
+        "/users/activate/resend", auth=(_EMAIL, "Wrong@pass123")
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_resend_for_active_user_returns_409(
+    client: AsyncClient, db_pool: asyncpg.Pool
+):
+    await _register(client)
+    codes, _ = await _codes_and_emails(db_pool)
+    await client.post("/users/activate", json={"code": codes[0]}, auth=_AUTH)
+
+    response = await client.post("/users/activate/resend", auth=_AUTH)
+    assert response.status_code == 409
+
+
+def test_link_resend_limit_is_disabled_without_cooldown():
+    assert _resend_link_limit(0) is None
+    limit = _resend_link_limit(30)
+    assert limit is not None
+    assert limit.capacity == 1
+    assert limit.per_second == 1 / 30
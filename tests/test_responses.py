@@ -0,0 +1,35 @@
+import json
+import uuid
+
+import pytest
+from asyncpg.pgproto.pgproto import UUID as RecordUUID
+from pydantic import ValidationError
+
+from app.exceptions.handlers import format_validation_errors
+from app.responses import ORJSONResponse, StdlibJSONResponse
+from app.schemas.user import UserCreate
+
+
+@pytest.mark.parametrize("response_class", [ORJSONResponse, StdlibJSONResponse])
+@pytest.mark.parametrize("user_id", [uuid.uuid4(), RecordUUID(uuid.uuid4().hex)])
+def test_response_classes_encode_uuid(response_class, user_id):
+    response = response_class({"id": user_id, "is_active": False}, status_code=201)
+    assert json.loads(response.body) == {"id": str(user_id), "is_active": False}
+
+
+def test_validation_errors_stringify_exceptions_only():
+    with pytest.raises(ValidationError) as exc_info:
+        UserCreate.model_validate({"email": "user@example.com", "password": "short"})
+    errors = exc_info.value.errors()
+
+    formatted = format_validation_errors(errors)
+    assert isinstance(formatted[0]["ctx"]["error"], str)
+    assert "12 characters" in formatted[0]["ctx"]["error"]
+    # The input list is left untouched.
+    assert isinstance(errors[0]["ctx"]["error"], Exception)
+    json.dumps(formatted)
+
+
+def test_validation_errors_without_ctx_pass_through():
+    errors = [{"type": "missing", "loc": ("body", "email"), "msg": "Field required"}]
+    assert format_validation_errors(errors)[0] is errors[0]
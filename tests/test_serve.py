@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from app.config import settings
+from app.serve import (
+    _Slot,
+    available_cpus,
+    plan_workers,
+    server_connection_budget,
+)
+
+
+def test_pool_budget_is_split_across_workers(monkeypatch):
+    monkeypatch.setattr(settings, "database_run_migrations_on_startup", False)
+    plan = plan_workers(cpus=4, connection_budget=20, workers=None, pool_max_size=50)
+    assert (plan.workers, plan.pool_max_size, plan.hasher_workers) == (4, 5, 1)
+    assert plan.workers * plan.pool_max_size <= 20
+
+    # Never more than the configured pool size.
+    plan = plan_workers(cpus=2, connection_budget=100, workers=None, pool_max_size=10)
+    assert plan.pool_max_size == 10
+
+
+def test_startup_migration_connection_is_reserved(monkeypatch):
+    monkeypatch.setattr(settings, "database_run_migrations_on_startup", True)
+    plan = plan_workers(cpus=1, connection_budget=20, workers=4, pool_max_size=50)
+    assert plan.pool_max_size == 4
+    with pytest.raises(SystemExit):
+        plan_workers(cpus=1, connection_budget=7, workers=4, pool_max_size=50)
+
+
+def test_environment_keeps_an_explicit_hasher_size(monkeypatch):
+    plan = plan_workers(cpus=8, connection_budget=100, workers=2, pool_max_size=10)
+    assert plan.environment()["PASSWORD_HASHER_WORKERS"] == "4"
+    monkeypatch.setattr(settings, "password_hasher_workers", 2)
+    assert "PASSWORD_HASHER_WORKERS" not in plan.environment()
+
+
+def test_available_cpus_is_within_affinity():
+    assert 1 <= available_cpus() <= (os.cpu_count() or 1)
+
+
+@pytest.mark.asyncio
+async def test_server_connection_budget():
+    budget = await server_connection_budget()
+    assert 0 < budget < 100_000
+
+
+def test_restart_delay_backs_off_and_resets():
+    slot = _Slot(multiprocessing.get_context("spawn"))
+    slot.started_at = time.monotonic()
+    delays = [slot.schedule_restart() for _ in range(8)]
+    assert delays == [0.5, 1, 2, 4, 8, 16, 30, 30]
+
+    # A worker that stayed up long enough starts the sequence over.
+    slot.started_at = time.monotonic() - 120
+    assert slot.schedule_restart() == 0.5
+
+
+def _get(url: str) -> int:
+    with urllib.request.urlopen(url, timeout=2) as response:
+        return response.status
+
+
+def test_serve_runs_workers_and_stops_on_sigterm():
+    env = {
+        **os.environ,
+        "SERVE_WORKERS": "2",
+        "SERVE_PORT": "18765",
+        "SERVE_HOST": "127.0.0.1",
+        "EMAIL_DISPATCHER_ENABLED": "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = "http://127.0.0.1:18765/users/availability?email=a@example.com"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                assert _get(url) == 200
+                break
+            except OSError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise
+                time.sleep(0.2)
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+
+def _serve(**env: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.serve"],
+        env={
+            **os.environ,
+            "SERVE_WORKERS": "2",
+            "SERVE_HOST": "127.0.0.1",
+            "EMAIL_DISPATCHER_ENABLED": "false",
+            **env,
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize("reuse_port", ["true", "false"])
+def test_serve_exits_when_the_port_is_taken(reuse_port):
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        server = _serve(SERVE_PORT=str(port), SERVE_REUSE_PORT=reuse_port)
+        try:
+            _, stderr = server.communicate(timeout=30)
+        finally:
+            if server.poll() is None:
+                server.kill()
+    assert server.returncode == 1
+    assert "Cannot listen" in stderr
+
+
+def test_serve_exits_when_workers_fail_to_start():
+    dsn = settings.database_url.replace("/userdb", "/no_such_database")
+    server = _serve(
+        SERVE_PORT="18766",
+        DATABASE_URL=dsn,
+        DATABASE_CONNECTION_BUDGET="20",
+    )
+    try:
+        _, stderr = server.communicate(timeout=60)
+    finally:
+        if server.poll() is None:
+            server.kill()
+    assert server.returncode == 1
+    assert "before it started serving" in stderr
+    assert "restarting" not in stderr
@@ -0,0 +1,58 @@
+import asyncpg
+import pytest
+
+from app.config import settings
+from app.database import create_pool
+from app.repositories import statements
+
+
+def test_register_rejects_same_name_with_different_sql(monkeypatch):
+    monkeypatch.setattr(statements, "_STATEMENTS", {})
+    assert statements.register("tests.one", "SELECT 1") == "tests.one"
+    # Re-registering identical SQL (e.g. a module reload) is harmless
+    assert statements.register("tests.one", "SELECT 1") == "tests.one"
+
+    with pytest.raises(ValueError):
+        statements.register("tests.one", "SELECT 2")
+
+
+@pytest.mark.asyncio
+async def test_statements_stay_prepared_across_checkouts():
+    pool = await create_pool(max_size=1)
+    sql = statements._STATEMENTS["users.get_by_email"]
+    try:
+        for _ in range(3):
+            async with pool.acquire() as conn:
+                assert await statements.fetchrow(
+                    conn, "users.get_by_email", "nobody@example.com"
+                ) is None
+        # Same connection every time: one server-side statement, reused
+        async with pool.acquire() as conn:
+            prepared = await conn.fetchval(
+                "SELECT COUNT(*) FROM pg_prepared_statements WHERE statement = $1",
+                sql,
+            )
+        assert prepared == 1
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_helpers_return_results_and_status(monkeypatch):
+    monkeypatch.setitem(statements._STATEMENTS, "tests.add", "SELECT $1::int + 1")
+    conn = await asyncpg.connect(settings.database_url)
+    try:
+        assert await statements.fetchval(conn, "tests.add", 41) == 42
+        assert await statements.execute(conn, "tests.add", 1) == "SELECT 1"
+    finally:
+        await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_create_pool_warns_when_cache_cannot_hold_registry(
+    monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, "database_statement_cache_size", 1)
+    pool = await create_pool(max_size=1)
+    await pool.close()
+    assert "registered statements" in caplog.text
@@ -0,0 +1,74 @@
+import asyncio
+
+import asyncpg
+import pytest
+from httpx import AsyncClient
+
+from app.repositories.unit_of_work import UnitOfWork
+
+
+@pytest.mark.asyncio
+async def test_connection_records_pool_wait(db_pool: asyncpg.Pool):
+    uow = UnitOfWork(db_pool, slow_wait_seconds=0.05)
+    held = await db_pool.acquire()
+    others = [await db_pool.acquire() for _ in range(db_pool.get_max_size() - 1)]
+
+    async def wait_for_connection():
+        async with uow.connection() as conn:
+            return await conn.fetchval("SELECT 1")
+
+    waiter = asyncio.create_task(wait_for_connection())
+    await asyncio.sleep(0.1)
+    assert uow.stats.waiting == 1
+    await db_pool.release(held)
+    assert await waiter == 1
+
+    for conn in others:
+        await db_pool.release(conn)
+    assert uow.stats.acquisitions == 1
+    assert uow.stats.waiting == 0
+    assert uow.stats.max_wait_seconds >= 0.1
+    assert uow.stats.slow_acquisitions == 1
+
+
+@pytest.mark.asyncio
+async def test_transaction_rolls_back_on_error(db_pool: asyncpg.Pool):
+    uow = UnitOfWork(db_pool)
+    with pytest.raises(RuntimeError):
+        async with uow.transaction() as conn:
+            await conn.execute(
+                "INSERT INTO users (email, password_hash) VALUES ($1, $2)",
+                "user@example.com",
+                "x",
+            )
+            raise RuntimeError()
+
+    async with db_pool.acquire() as conn:
+        assert await conn.fetchval("SELECT COUNT(*) FROM users") == 0
+
+
+@pytest.mark.asyncio
+async def test_activate_holds_no_connection_while_verifying(
+    client: AsyncClient, db_pool: asyncpg.Pool, password_hasher, monkeypatch
+):
+    await client.post(
+        "/users", json={"email": "user@example.com", "password": "Secure@pass123"}
+    )
+    async with db_pool.acquire() as conn:
+        code = await conn.fetchval("SELECT code FROM activation_codes")
+
+    in_use = []
+    original_verify = password_hasher.verify
+
+    async def spy_verify(password: str, password_hash: str) -> bool:
+        in_use.append(db_pool.get_size() - db_pool.get_idle_size())
+        return await original_verify(password, password_hash)
+
+    monkeypatch.setattr(password_hasher, "verify", spy_verify)
+    response = await client.post(
+        "/users/activate",
+        json={"code": code},
+        auth=("user@example.com", "Secure@pass123"),
+    )
+    assert response.status_code == 200
+    assert in_use == [0]